@@ -0,0 +1,11 @@
+# conftest.py
+# Тести запускаються з кореня репозиторію: python -m pytest ComputerSide
+# Модулі дрона (utils.*) імпортуються з RaspberrySide, модулі станції (src.*) — з ComputerSide.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for side in ("ComputerSide", "RaspberrySide"):
+    path = os.path.join(ROOT, side)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -1,10 +1,42 @@
 # computer_side.py
 import sys
+import argparse
 from PyQt5 import QtWidgets
 from src.drone_visualizer import DroneVisualizer
+from src import log_tools
+from src.metrics import MetricsReporter, start_http_server
+from src.tracing import TRACE
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
-    vis = DroneVisualizer()
+    parser = argparse.ArgumentParser(description="Underwater drone ground station")
+    parser.add_argument("--map", dest="map_path", default=None,
+                        help="Map file (.udmap, .csv) or tiled map directory (.tiles)")
+    parser.add_argument("--per-packet-log", action="store_true",
+                        help="Log every packet instead of periodic summaries")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve pipeline metrics as JSON at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Dump pipeline metrics as JSON to this file every 5 s")
+    parser.add_argument("--metrics-overlay", action="store_true",
+                        help="Show the metrics overlay on start")
+    parser.add_argument("--trace-file", default=None,
+                        help="Append per-frame latency traces (JSON lines) to this file")
+    args, qt_args = parser.parse_known_args()
+    log_tools.set_per_packet(args.per_packet_log)
+    # Запис логів у фоновому потоці: GUI та потік мережі лише ставлять записи в чергу
+    log_listener = log_tools.start_queue_logging()
+    metrics_server = start_http_server(args.metrics_port) if args.metrics_port else None
+    metrics_reporter = MetricsReporter(args.metrics_file).start() if args.metrics_file else None
+    if args.trace_file:
+        TRACE.open(args.trace_file)
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    vis = DroneVisualizer(args.map_path, metrics_overlay=args.metrics_overlay)
     vis.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    if metrics_server:
+        metrics_server.shutdown()
+    if metrics_reporter:
+        metrics_reporter.stop()
+    TRACE.close()
+    log_listener.stop()
+    sys.exit(code)
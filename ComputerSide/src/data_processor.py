@@ -1,110 +1,171 @@
 # data_processor.py
-import cv2
-import base64
 import numpy as np
-import socket
 import time
-from PyQt5 import QtGui, QtCore
+from PyQt5 import QtGui
 import threading
 import logging
+from src.frame_decoder import FrameDecoder
+from src.log_tools import PacketLog
+from src.metrics import REGISTRY
+from src.tracing import TRACE
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Крок інтегрування швидкості (с), поки немає двох послідовних міток часу
+DEFAULT_DT = 0.05
+# Довший проміжок між пакетами (втрата зв'язку) не інтегрується повністю
+MAX_DT = 1.0
+
 class DataProcessor:
     def __init__(self, parent):
         self.parent = parent
         self.latest_frame = None
         self.lock = threading.Lock()
+        # Частота опитування сенсорів на дроні адаптивна, тож крок інтегрування береться з міток часу
+        self.last_sample_time = None
+        self.dt = DEFAULT_DT
+        # Декодування кадрів у фоновому потоці; GUI лише показує готовий кадр
+        self.frame_decoder = FrameDecoder()
+        self.frame_decoder.start()
+        self.parent.network.frame_sink = self.frame_decoder.submit
+        self.packet_log = PacketLog(logger)
+        # Затримки від моменту захоплення/вимірювання на дроні (за оцінкою зсуву годинника)
+        self.glass_to_glass = REGISTRY.histogram("trace.glass_to_glass_us")
+        self.sonar_to_map = REGISTRY.histogram("trace.sonar_to_map_us")
+        self.update_time = REGISTRY.histogram("gui.update_us")
 
     def update_data(self):
-        """Оновлення даних з мережі (камера або сенсори)."""
+        """Оновлення даних з мережі (камера та сенсори), прийнятих потоком NetworkHandler."""
+        start = time.perf_counter()
         try:
-            data = self.parent.network.receive_data()
-            
-            if not data or "type" not in data:
-                logger.warning("Invalid or empty data received")
-                return
-
-            data_type = data["type"]
-            if data_type == "camera":
-                try:
-                    camera_data = data.get("data")
-                    if not isinstance(camera_data, str):
-                        logger.error("Invalid camera data format")
-                        return
-                    # Декодування зображення
-                    img_data = base64.b64decode(camera_data)
-                    frame = cv2.imdecode(np.frombuffer(img_data, np.uint8), cv2.IMREAD_COLOR)
-                    if frame is None:
-                        logger.error("Failed to decode camera frame")
-                        return
-                    
-                    # Конвертація BGR в RGB
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    self.latest_frame = frame_rgb
-                    height, width, channels = frame_rgb.shape
-                    qimage = QtGui.QImage(frame_rgb.data, width, height, width * channels, QtGui.QImage.Format_RGB888)
-                    # Масштабування з урахуванням розміру віджета
-                    if self.parent.display_mode == "camera":
-                        pixmap = QtGui.QPixmap.fromImage(qimage).scaled(
-                            self.parent.camera_label.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation
-                        )
-                        self.parent.camera_label.setPixmap(pixmap)
-                    elif self.parent.display_mode == "both":
-                        pixmap = QtGui.QPixmap.fromImage(qimage).scaled(
-                            self.parent.both_camera_label.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation
-                        )
-                        self.parent.both_camera_label.setPixmap(pixmap)
-                    logger.info(f"Updated camera frame: {width}x{height}")
-                except cv2.error as e:
-                    logger.error(f"OpenCV error: {e}")
-                except Exception as e:
-                    logger.error(f"Camera processing error: {e}")
-
-            elif data_type == "sensor":
-                sensor_data = data.get("data", {})
-                required_keys = ["imu", "sonar", "thruster_speeds"]
-                if not all(isinstance(sensor_data.get(key), (dict, list)) for key in required_keys):
-                    logger.error(f"Incomplete sensor data: {sensor_data}")
-                    return
-                if all(key in sensor_data for key in required_keys):
-                    with self.lock:
-                        dt = 0.05
-                        velocity = np.array([sensor_data["thruster_speeds"][0], sensor_data["thruster_speeds"][1], sensor_data["thruster_speeds"][4]])
-                        if not np.allclose(velocity, [0.0, 0.0, 0.0]):
-                            self.parent.drone_position += velocity * dt
-                            logger.info(f"Updated drone position: {self.parent.drone_position}")
-                        if sensor_data["thruster_speeds"] != self.parent.last_thruster_speeds:
-                            logger.info(f"Thruster speeds: {sensor_data['thruster_speeds']}, Velocity: {velocity}, New position: {self.parent.drone_position}")
-                            self.parent.last_thruster_speeds = sensor_data["thruster_speeds"].copy()
-                    
-                    if self.parent.display_mode in ["sonar", "both"]:
-                        current_time = time.time()
-                        if current_time - self.parent.last_update_time >= 0.5:
-                            logger.info(f"Sonar distance: {sensor_data['sonar']['distance']}, Quaternion: {sensor_data['imu']['quaternion']}, Drone position: {self.parent.drone_position}")
-                            logger.debug(f"Received thruster_speeds: {sensor_data['thruster_speeds']}")
-                            self.parent.map_utils.update_3d_map(self.parent, sensor_data["sonar"], sensor_data["imu"])
-                            if self.parent.display_mode == "sonar":
-                                self.parent.visualization.update_open3d_image(self.parent.sonar_label)
-                            else:
-                                self.parent.visualization.update_open3d_image(self.parent.both_sonar_label)
-                            self.parent.last_update_time = current_time
-                    logger.info(f"Processed sensor data: imu={sensor_data['imu']}, sonar={sensor_data['sonar']}")
-                else:
-                    logger.error(f"Incomplete sensor data: {sensor_data}")
-
-        except socket.timeout:
-            if self.latest_frame is not None and self.parent.display_mode in ["camera", "both"]:
-                height, width, channels = self.latest_frame.shape
-                qimage = QtGui.QImage(self.latest_frame.data, width, height, width * channels, QtGui.QImage.Format_RGB888)
-                pixmap = QtGui.QPixmap.fromImage(qimage).scaled(
-                    self.parent.camera_label.size() if self.parent.display_mode == "camera" else self.parent.both_camera_label.size(),
-                    QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation
-                )
-                if self.parent.display_mode == "camera":
-                    self.parent.camera_label.setPixmap(pixmap)
-                else:
-                    self.parent.both_camera_label.setPixmap(pixmap)
+            self.show_camera_frame()
+            self.process_sensors(self.parent.network.take_sensor_packets())
+            self.parent.map_utils.poll_tiles(self.parent)
+            self.parent.map_utils.poll_mesh(self.parent)
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            logger.error("Unexpected error: %s", e)
+        self.update_time.record_seconds(time.perf_counter() - start)
+
+    def camera_label(self):
+        """Мітка камери для поточного режиму відображення або None."""
+        if self.parent.display_mode == "camera":
+            return self.parent.camera_label
+        if self.parent.display_mode == "both":
+            return self.parent.both_camera_label
+        return None
+
+    def show_camera_frame(self):
+        """Відображення нового кадру, якщо декодер його підготував."""
+        label = self.camera_label()
+        if label is not None:
+            self.frame_decoder.set_target_size(label.width(), label.height())
+        frame_rgb = self.frame_decoder.take_ready()
+        if frame_rgb is None:
+            return
+        self.latest_frame = frame_rgb
+        if label is None:
+            return
+        height, width, channels = frame_rgb.shape
+        qimage = QtGui.QImage(frame_rgb.data, width, height, width * channels, QtGui.QImage.Format_RGB888)
+        label.setPixmap(QtGui.QPixmap.fromImage(qimage))
+        logger.debug("Updated camera frame: %dx%d", width, height)
+        self.trace_frame(self.frame_decoder.take_trace())
+
+    def trace_frame(self, trace):
+        """Запис трасування показаного кадру: від захоплення на дроні до виводу на екран."""
+        if trace is None:
+            return
+        clock = self.parent.network.clock
+        trace["displayed"] = time.time()
+        capture = clock.to_local(trace["capture"])
+        if capture is not None:
+            self.glass_to_glass.record_seconds(trace["displayed"] - capture)
+        TRACE.record("camera", trace.pop("id"), offset=clock.offset, **trace)
+
+    def close(self):
+        """Зупинка фонового декодера."""
+        self.parent.network.frame_sink = None
+        self.frame_decoder.stop()
+        self.packet_log.flush()
+        logger.info("Camera frames: %s", self.frame_decoder.stats)
+
+    def process_sensors(self, packets):
+        """Оновлення позиції дрона за кожним пакетом і додавання всіх вимірів сонара в карту однією пачкою."""
+        processed = time.time()
+        samples = []
+        sampled = []
+        for sensor_data in packets:
+            sample = self.process_sensor(sensor_data)
+            sampled.append(sample is not None)
+            if sample is not None:
+                samples.append(sample)
+        mapped = None
+        if samples:
+            distances, quaternions, positions, object_types = zip(*samples)
+            # Рендер запланує Visualization: оновлення карти лише позначає сцену зміненою
+            self.parent.map_utils.ingest_batch(self.parent, distances, quaternions, positions, object_types)
+            mapped = time.time()
+            self.packet_log.event("sonar_batch", "Ingested %d sonar samples", len(samples), size=len(samples))
+        for sensor_data, has_sample in zip(packets, sampled):
+            self.trace_sensor(sensor_data, processed, mapped if has_sample else None)
+
+    def process_sensor(self, sensor_data):
+        """Оновлення позиції дрона за пакетом сенсорів; повертає вимір сонара для карти або None.
+
+        Вимір — (відстань, кватерніон, позиція дрона, тип об'єкта).
+        """
+        required_keys = ["imu", "sonar", "thruster_speeds"]
+        if not all(isinstance(sensor_data.get(key), (dict, list)) for key in required_keys):
+            self.packet_log.limited("incomplete", 5.0, logging.ERROR, "Incomplete sensor data: %s", sensor_data)
+            return None
+        with self.lock:
+            dt = self.sample_dt(sensor_data.get("timestamp"))
+            velocity = np.array([sensor_data["thruster_speeds"][0], sensor_data["thruster_speeds"][1], sensor_data["thruster_speeds"][4]])
+            if dt > 0 and not np.allclose(velocity, [0.0, 0.0, 0.0]):
+                self.parent.drone_position += velocity * dt
+                logger.debug("Updated drone position: %s", self.parent.drone_position.copy())
+            if sensor_data["thruster_speeds"] != self.parent.last_thruster_speeds:
+                logger.info("Thruster speeds: %s, Velocity: %s, New position: %s",
+                            sensor_data["thruster_speeds"], velocity, self.parent.drone_position)
+                self.parent.last_thruster_speeds = sensor_data["thruster_speeds"].copy()
+
+            position = self.parent.drone_position.copy()
+
+        self.packet_log.event("sensor_processed", "Processed sensor data: imu=%s, sonar=%s",
+                              sensor_data["imu"], sensor_data["sonar"])
+        distance = sensor_data["sonar"].get("distance", 0.0)
+        quaternion = sensor_data["imu"].get("quaternion", [1.0, 0.0, 0.0, 0.0])
+        if (not isinstance(distance, (int, float)) or len(quaternion) != 4
+                or not all(isinstance(q, (int, float)) for q in quaternion)):
+            self.packet_log.limited("invalid", 5.0, logging.ERROR, "Invalid sonar/imu data: distance=%s, quaternion=%s",
+                                    distance, quaternion)
+            return None
+        return distance, quaternion, position, sensor_data["sonar"].get("object_type", "empty")
+
+    def sample_dt(self, timestamp):
+        """Проміжок (с) від попереднього пакета сенсорів за мітками часу дрона.
+
+        Без мітки — попередній крок; повторений або застарілий пакет — 0; довга перерва обмежується MAX_DT.
+        """
+        if not isinstance(timestamp, (int, float)):
+            return self.dt
+        if self.last_sample_time is None:
+            self.last_sample_time = timestamp
+            return self.dt
+        dt = timestamp - self.last_sample_time
+        if dt <= 0:
+            return 0.0
+        self.last_sample_time = timestamp
+        self.dt = min(dt, MAX_DT)
+        return self.dt
+
+    def trace_sensor(self, sensor_data, processed, mapped):
+        """Запис трасування пакета сенсорів: від вимірювання на дроні до додавання в карту."""
+        clock = self.parent.network.clock
+        if mapped is not None:
+            measured = clock.to_local(sensor_data.get("timestamp"))
+            if measured is not None:
+                self.sonar_to_map.record_seconds(mapped - measured)
+        TRACE.record("sensor", sensor_data.get("frame_id"), sent=sensor_data.get("timestamp"), offset=clock.offset,
+                     received=sensor_data.get("received_at"), processed=processed, mapped=mapped)
@@ -0,0 +1,238 @@
+# dem_grid.py
+# Інкрементальна 2.5D-сітка глибин (DEM) поверх точок сонара.
+#
+# Для кожної комірки cell_size × cell_size метрів зберігаються кількість влучань, сума,
+# мінімум і максимум глибини та голоси за типи об'єктів; середня глибина та домінантний
+# тип обчислюються з них. Пам'ять залежить від площі зйомки, а не від кількості точок.
+#
+# Експорт: python -m src.dem_grid terrain_map.udmap dem.png|dem.npy|dem.raw [cell_size]
+import os
+import sys
+import logging
+import cv2
+import numpy as np
+from src.point_store import OBJECT_TYPES, EMPTY_CODE
+from src import map_format
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Шари для експорту в .npy (у такому порядку)
+LAYERS = ("count", "mean", "min", "max", "type")
+# Розмір блоку (у комірках) для відстеження змінених ділянок
+BLOCK_CELLS = 64
+# Пачки до стількох точок позначають блоки без np.unique (його накладні витрати більші за виграш)
+SMALL_BATCH = 64
+
+
+class DepthGrid:
+    """Сітка глибин, що розширюється під нові точки.
+
+    Оновлення — векторизованими scatter-операціями (np.add.at / np.minimum.at / np.maximum.at)
+    лише по комірках нової пачки. Рядки сітки відповідають осі Y, стовпці — осі X.
+    Блоки BLOCK_CELLS×BLOCK_CELLS, яких торкнулися нові точки, накопичуються в dirty_blocks
+    (наприклад, для перебудови поверхні лише там, де змінилися дані).
+    """
+
+    def __init__(self, cell_size=0.5, margin_cells=64):
+        self.cell_size = cell_size
+        self.margin_cells = margin_cells
+        self.origin = None  # Індекс комірки (ix, iy) для [0, 0] масивів
+        self.generation = 0  # Збільшується при очищенні сітки
+        self.dirty_blocks = set()
+        self._allocate((0, 0))
+
+    def _allocate(self, shape):
+        self.count = np.zeros(shape, dtype=np.uint32)
+        self.depth_sum = np.zeros(shape, dtype=np.float64)
+        self.depth_min = np.full(shape, np.inf, dtype=np.float32)
+        self.depth_max = np.full(shape, -np.inf, dtype=np.float32)
+        self.votes = np.zeros(shape + (len(OBJECT_TYPES),), dtype=np.uint32)
+
+    @property
+    def shape(self):
+        return self.count.shape
+
+    def clear(self):
+        self.origin = None
+        self.generation += 1
+        self.dirty_blocks = set()
+        self._allocate((0, 0))
+
+    def add(self, points, codes, hits=None, votes=None):
+        """Додавання пачки точок (k×3: x, y, глибина) з кодами типів (k,).
+
+        hits і votes — кількість влучань і голоси за типи вже злитих (воксельних) точок.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        codes = np.asarray(codes, dtype=np.int64).reshape(-1)
+        if len(points) == 0:
+            return
+        cells = np.floor(points[:, :2] / self.cell_size).astype(np.int64)
+        self._fit(cells.min(axis=0), cells.max(axis=0))
+        columns = cells[:, 0] - self.origin[0]
+        rows = cells[:, 1] - self.origin[1]
+        flat = rows * self.shape[1] + columns
+        depth = points[:, 2]
+
+        if hits is None:
+            np.add.at(self.count.reshape(-1), flat, 1)
+            np.add.at(self.depth_sum.reshape(-1), flat, depth)
+            np.add.at(self.votes.reshape(-1), flat * len(OBJECT_TYPES) + codes, 1)
+        else:
+            hits = np.asarray(hits, dtype=np.uint32).reshape(-1)
+            np.add.at(self.count.reshape(-1), flat, hits)
+            np.add.at(self.depth_sum.reshape(-1), flat, depth * hits)
+            np.add.at(self.votes.reshape(-1, len(OBJECT_TYPES)), flat,
+                      np.asarray(votes, dtype=np.uint32).reshape(-1, len(OBJECT_TYPES)))
+        np.minimum.at(self.depth_min.reshape(-1), flat, depth.astype(np.float32))
+        np.maximum.at(self.depth_max.reshape(-1), flat, depth.astype(np.float32))
+        self._mark_dirty(cells)
+
+    def _mark_dirty(self, cells):
+        # Блок містить ще й перший рядок/стовпець сусідніх блоків (для зшивання), тож
+        # комірка на початку блоку змінює також блоки зліва/знизу
+        keys = np.concatenate([(cells - offset) // BLOCK_CELLS for offset in ((0, 0), (1, 0), (0, 1), (1, 1))])
+        if len(cells) > SMALL_BATCH:
+            # Для великих пачок дешевше спершу прибрати повтори в NumPy, ніж будувати всі кортежі
+            keys = np.unique(keys, axis=0)
+        self.dirty_blocks.update(map(tuple, keys.tolist()))
+
+    def take_dirty_blocks(self):
+        """Змінені блоки (ключі (bx, by)) з моменту попереднього виклику."""
+        keys, self.dirty_blocks = sorted(self.dirty_blocks), set()
+        return keys
+
+    def block_arrays(self, key):
+        """(depth, types, x0, y0) блоку з одним рядком/стовпцем перекриття; NaN поза сіткою."""
+        size = BLOCK_CELLS + 1
+        start = np.array(key) * BLOCK_CELLS
+        depth = np.full((size, size), np.nan)
+        types = np.full((size, size), EMPTY_CODE, dtype=np.uint8)
+        if self.origin is not None:
+            low = np.maximum(start - self.origin, 0)
+            high = np.minimum(start + size - self.origin, np.array(self.shape[::-1]))
+            if np.all(high > low):
+                window = (slice(low[1], high[1]), slice(low[0], high[0]))
+                offset = low + self.origin - start
+                target = (slice(offset[1], offset[1] + high[1] - low[1]), slice(offset[0], offset[0] + high[0] - low[0]))
+                count = self.count[window]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    depth[target] = np.where(count > 0, self.depth_sum[window] / count, np.nan)
+                block_types = np.argmax(self.votes[window], axis=2).astype(np.uint8)
+                block_types[count == 0] = EMPTY_CODE
+                types[target] = block_types
+        x0, y0 = start * self.cell_size
+        return depth, types, x0, y0
+
+    def _fit(self, low, high):
+        """Розширення сітки, щоб комірки [low, high] (ix, iy) вмістилися, з запасом margin_cells."""
+        if self.origin is not None:
+            end = self.origin + np.array(self.shape[::-1])
+            if np.all(low >= self.origin) and np.all(high < end):
+                return
+            low = np.minimum(low, self.origin)
+            high = np.maximum(high, end - 1)
+        # Запас щонайменше в половину поточного розміру — копіювань при рості O(log) разів
+        margin = np.maximum(self.margin_cells, np.array(self.shape[::-1]) // 2)
+        new_origin = low - margin
+        new_shape = tuple((high - new_origin + 1 + margin)[::-1])
+        old = (self.count, self.depth_sum, self.depth_min, self.depth_max, self.votes)
+        old_origin = self.origin
+        self._allocate(new_shape)
+        if old_origin is not None:
+            dx, dy = old_origin - new_origin
+            height, width = old[0].shape
+            window = (slice(dy, dy + height), slice(dx, dx + width))
+            for target, source in zip((self.count, self.depth_sum, self.depth_min, self.depth_max, self.votes), old):
+                target[window] = source
+        self.origin = new_origin
+        logger.debug("DEM grid resized to %dx%d cells, origin=%s", new_shape[1], new_shape[0], new_origin)
+
+    def mean_depth(self):
+        """Середня глибина по комірках (NaN для порожніх)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.depth_sum / self.count, np.nan)
+
+    def dominant_type(self):
+        """Код домінантного типу по комірках (EMPTY_CODE для порожніх)."""
+        types = np.argmax(self.votes, axis=2).astype(np.uint8)
+        types[self.count == 0] = EMPTY_CODE
+        return types
+
+    def bounds(self):
+        """(x_min, y_min, x_max, y_max) сітки в метрах."""
+        if self.origin is None:
+            return None
+        x_min, y_min = self.origin * self.cell_size
+        height, width = self.shape
+        return x_min, y_min, x_min + width * self.cell_size, y_min + height * self.cell_size
+
+    def layers(self):
+        """Усі шари сітки як масив float32 (len(LAYERS)×H×W)."""
+        empty = self.count == 0
+        return np.stack([
+            self.count.astype(np.float32),
+            self.mean_depth().astype(np.float32),
+            np.where(empty, np.nan, self.depth_min),
+            np.where(empty, np.nan, self.depth_max),
+            self.dominant_type().astype(np.float32)
+        ])
+
+    def save_npy(self, path):
+        """Збереження шарів LAYERS у .npy."""
+        np.save(path, self.layers())
+
+    def save_raw(self, path):
+        """Середня глибина як сирий float32 (little-endian, NaN — немає даних) з ENVI-заголовком path.hdr.
+
+        Рядки записуються з півночі на південь, як у GeoTIFF; опорна точка — лівий верхній кут.
+        """
+        height, width = self.shape
+        np.ascontiguousarray(self.mean_depth()[::-1], dtype='<f4').tofile(path)
+        x_min, _, _, y_max = self.bounds() or (0.0, 0.0, 0.0, 0.0)
+        with open(os.path.splitext(path)[0] + ".hdr", 'w') as f:
+            f.write("ENVI\n")
+            f.write(f"samples = {width}\nlines = {height}\nbands = 1\nheader offset = 0\n")
+            f.write("data type = 4\ninterleave = bsq\nbyte order = 0\n")
+            f.write("band names = {mean depth}\ndata ignore value = nan\n")
+            f.write(f"map info = {{Arbitrary, 1, 1, {x_min}, {y_max}, {self.cell_size}, {self.cell_size}}}\n")
+
+    def render(self, colormap=cv2.COLORMAP_JET, empty_color=(204, 204, 204)):
+        """Кольорове зображення глибин (RGB uint8, H×W×3); порожні комірки — empty_color."""
+        depth = self.mean_depth()
+        filled = ~np.isnan(depth)
+        image = np.empty(self.shape + (3,), dtype=np.uint8)
+        image[:] = empty_color
+        if filled.any():
+            low, high = depth[filled].min(), depth[filled].max()
+            scaled = np.zeros(self.shape, dtype=np.uint8)
+            scaled[filled] = ((depth[filled] - low) / max(high - low, 1e-6) * 255).astype(np.uint8)
+            colored = cv2.cvtColor(cv2.applyColorMap(scaled, colormap), cv2.COLOR_BGR2RGB)
+            image[filled] = colored[filled]
+        # Рядок 0 — найменший Y; на зображенні північ (більший Y) має бути згори
+        return image[::-1]
+
+
+def export(source, destination, cell_size=0.5):
+    """Побудова DEM з файлу карти та збереження як .png, .npy або .raw (+ .hdr)."""
+    grid = DepthGrid(cell_size)
+    for points, codes in map_format.read_chunks(source):
+        grid.add(points, codes)
+    extension = os.path.splitext(destination)[1].lower()
+    if extension == ".npy":
+        grid.save_npy(destination)
+    elif extension == ".raw":
+        grid.save_raw(destination)
+    else:
+        cv2.imwrite(destination, cv2.cvtColor(grid.render(), cv2.COLOR_RGB2BGR))
+    return grid
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python -m src.dem_grid <map.udmap> <dem.png|dem.npy|dem.raw> [cell_size]")
+        sys.exit(1)
+    size = float(sys.argv[3]) if len(sys.argv) == 4 else 0.5
+    dem = export(sys.argv[1], sys.argv[2], size)
+    print(f"DEM {dem.shape[1]}x{dem.shape[0]} cells ({size} m), {int(dem.count.sum())} points -> {sys.argv[2]}")
@@ -8,22 +8,21 @@ from src.visualization import Visualization
 from src.input_handler import InputHandler
 from src.route_manager import RouteManager
 from src.data_processor import DataProcessor
-import tempfile
-import os
-import pandas as pd  # Додано імпорт pandas
+from src.point_store import PointStore
+from src.metrics_overlay import MetricsOverlay
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class DroneVisualizer(QtWidgets.QMainWindow):
-    def __init__(self):
+    def __init__(self, map_path=None, metrics_overlay=False):
         super().__init__()
         self.setWindowTitle("Underwater Drone Visualizer")
         self.resize(1200, 800)
 
         self.network = NetworkHandler()
-        self.map_utils = MapUtils()
+        self.map_utils = MapUtils(map_path)
         self.navigation = Navigation(self.network)
         self.visualization = Visualization(self)
         self.input_handler = InputHandler(self)
@@ -31,14 +30,11 @@ class DroneVisualizer(QtWidgets.QMainWindow):
         self.data_processor = DataProcessor(self)
 
         self.drone_position = np.array([0.0, 0.0, 0.0])
-        self.points = []
-        self.object_types = []
+        self.point_store = PointStore(max_points=1000000)
         self.thruster_speeds = [0.0] * 6
         self.last_thruster_speeds = [0.0] * 6
         self.display_mode = "both"
         self.control_mode = "manual"
-        self.temp_image_path = os.path.join(tempfile.gettempdir(), "open3d_temp.png")
-        self.last_update_time = 0.0
         self.is_processing = False
 
         self.central_widget = QtWidgets.QWidget()
@@ -84,6 +80,12 @@ class DroneVisualizer(QtWidgets.QMainWindow):
         self.mode_combo.currentTextChanged.connect(self.change_display_mode)
         self.control_layout.addWidget(QtWidgets.QLabel("Display Mode:"))
         self.control_layout.addWidget(self.mode_combo)
+        self.geometry_combo = QtWidgets.QComboBox()
+        self.geometry_combo.addItems(["Points", "Mesh", "Both"])
+        self.geometry_combo.setCurrentText("Points")
+        self.geometry_combo.currentTextChanged.connect(self.visualization.set_geometry_mode)
+        self.control_layout.addWidget(QtWidgets.QLabel("3D View:"))
+        self.control_layout.addWidget(self.geometry_combo)
         self.toggle_mode_button = QtWidgets.QPushButton("Manual Mode")
         self.toggle_mode_button.setCheckable(True)
         self.toggle_mode_button.clicked.connect(self.toggle_control_mode)
@@ -95,12 +97,19 @@ class DroneVisualizer(QtWidgets.QMainWindow):
         self.add_point_button = QtWidgets.QPushButton("Add Point")
         self.add_point_button.clicked.connect(self.add_route_point)
         self.control_layout.addWidget(self.add_point_button)
+        self.metrics_checkbox = QtWidgets.QCheckBox("Metrics")
+        self.control_layout.addWidget(self.metrics_checkbox)
         self.control_layout.addStretch()
         self.main_layout.addLayout(self.control_layout)
 
+        # Панель метрик поверх вікна; вмикається прапорцем "Metrics"
+        self.metrics_overlay = MetricsOverlay(self.central_widget)
+        self.metrics_checkbox.toggled.connect(self.metrics_overlay.set_enabled)
+        self.metrics_checkbox.setChecked(metrics_overlay)
+
         self.timer = QtCore.QTimer()
         self.timer.timeout.connect(self.process_data)
-        self.timer.start(100)
+        self.timer.start(30)
 
         self.route_timer = QtCore.QTimer()
         self.route_timer.timeout.connect(self.update_auto_route)
@@ -109,6 +118,7 @@ class DroneVisualizer(QtWidgets.QMainWindow):
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
         self.map_utils.load_map(self)
         self.change_display_mode("both")
+        self.network.start()
 
     def process_data(self):
         """Обробка даних з таймера."""
@@ -124,7 +134,7 @@ class DroneVisualizer(QtWidgets.QMainWindow):
     def change_display_mode(self, mode):
         """Зміна режиму відображення."""
         self.display_mode = mode.lower()
-        logger.info(f"Changing display mode to: {self.display_mode}")
+        logger.info("Changing display mode to: %s", self.display_mode)
         if self.display_mode == "camera":
             self.stack.setCurrentWidget(self.camera_widget)
             self.visualization.cleanup()
@@ -165,7 +175,7 @@ class DroneVisualizer(QtWidgets.QMainWindow):
                 point = np.array([x, y, z])
                 self.navigation.add_route_point(self, point)
                 self.route_input.clear()
-                logger.info(f"Added route point: {point}")
+                logger.info("Added route point: %s", point)
             except ValueError:
                 logger.error("Invalid route point format. Use x,y,z (e.g., 1,2,-1.5)")
 
@@ -173,24 +183,12 @@ class DroneVisualizer(QtWidgets.QMainWindow):
         """Обробка закриття вікна."""
         self.timer.stop()
         self.route_timer.stop()
+        self.metrics_overlay.set_enabled(False)
+        self.data_processor.close()
         self.network.close()
         self.visualization.cleanup()
-        if os.path.exists(self.temp_image_path):
-            os.remove(self.temp_image_path)
-        map_path = os.path.join(os.getcwd(), "terrain_map.csv")
-        with self.map_utils.lock:
-            terrain_data = {
-                "x": [p[0] for p in self.points],
-                "y": [p[1] for p in self.points],
-                "depth": [p[2] for p in self.points],
-                "object_type": self.object_types
-            }
-            if self.points:  # Зберігаємо лише, якщо є точки
-                df = pd.DataFrame(terrain_data)
-                df.to_csv(map_path, index=False)
-                logger.info(f"Saved terrain_map.csv at: {map_path}")
-            else:
-                logger.info("No points to save, skipping terrain_map.csv")
+        # Нові точки вже дописуються у файл карти; лишається скинути буфер
+        self.map_utils.close()
         event.accept()
 
     def keyPressEvent(self, event):
@@ -0,0 +1,120 @@
+# frame_decoder.py
+import cv2
+import numpy as np
+import time
+import threading
+import logging
+from src.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class FrameDecoder:
+    """Фоновий декодер кадрів камери: JPEG → RGB, масштабований під розмір віджета.
+
+    Зберігає лише найновіший кадр на вході та на виході; застарілі кадри відкидаються.
+    """
+
+    def __init__(self, target_size=(400, 300)):
+        self.cond = threading.Condition()
+        self.pending = None
+        self.ready = None
+        # Трасування (dict з часами етапів або None) кадру на вході, на виході та останнього показаного
+        self.pending_trace = None
+        self.ready_trace = None
+        self.taken_trace = None
+        self.target_size = target_size
+        self.stats = {"received": 0, "decoded": 0, "dropped": 0, "displayed": 0, "errors": 0}
+        self.decode_time = REGISTRY.histogram("camera.decode_us")
+        self.displayed = REGISTRY.counter("camera.displayed")
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Запуск потоку декодування."""
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="FrameDecoder", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Зупинка потоку декодування."""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def set_target_size(self, width, height):
+        """Розмір, до якого масштабуються наступні кадри (зі збереженням пропорцій)."""
+        self.target_size = (max(1, width), max(1, height))
+
+    def submit(self, jpeg_bytes, trace=None):
+        """Передача нового кадру; ще не декодований попередній кадр відкидається."""
+        with self.cond:
+            self.stats["received"] += 1
+            if self.pending is not None:
+                self.stats["dropped"] += 1
+            self.pending = jpeg_bytes
+            self.pending_trace = trace
+            self.cond.notify()
+
+    def take_ready(self):
+        """Найновіший готовий RGB-кадр або None, якщо нового кадру немає."""
+        with self.cond:
+            frame, self.ready = self.ready, None
+            if frame is not None:
+                self.taken_trace, self.ready_trace = self.ready_trace, None
+                self.stats["displayed"] += 1
+                self.displayed.inc()
+        return frame
+
+    def take_trace(self):
+        """Трасування кадру, востаннє взятого take_ready(), або None."""
+        trace, self.taken_trace = self.taken_trace, None
+        return trace
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and self.pending is None:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                jpeg_bytes, self.pending = self.pending, None
+                trace, self.pending_trace = self.pending_trace, None
+            with self.decode_time.time():
+                frame = self.decode(jpeg_bytes)
+            if trace is not None:
+                trace["decoded"] = time.time()
+            with self.cond:
+                if frame is None:
+                    self.stats["errors"] += 1
+                    continue
+                self.stats["decoded"] += 1
+                if self.ready is not None:
+                    self.stats["dropped"] += 1
+                self.ready = frame
+                self.ready_trace = trace
+
+    def decode(self, jpeg_bytes):
+        """Декодування та масштабування одного кадру."""
+        try:
+            frame = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                logger.error("Failed to decode camera frame")
+                return None
+            height, width = frame.shape[:2]
+            target_width, target_height = self.target_size
+            scale = min(target_width / width, target_height / height)
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            if size != (width, height):
+                interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+                frame = cv2.resize(frame, size, interpolation=interpolation)
+            # Конвертація BGR в RGB
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        except cv2.error as e:
+            logger.error("OpenCV error: %s", e)
+            return None
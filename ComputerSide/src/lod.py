@@ -0,0 +1,72 @@
+# lod.py
+import threading
+import logging
+import numpy as np
+from src.voxel_map import voxel_representatives
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class LevelOfDetail:
+    """Рівні деталізації хмари точок для інтерактивного рендерингу.
+
+    Тримає кілька воксельно проріджених копій хмари (від найдетальнішої до найгрубішої,
+    розмір вокселя подвоюється між рівнями). Під час обертання/масштабування вибирається
+    найдетальніший рівень, що вкладається в бюджет точок; рівні перебудовуються у фоновому
+    потоці, коли хмара виросла більше ніж на rebuild_growth.
+    """
+
+    def __init__(self, interaction_budget=150000, max_levels=6, rebuild_growth=0.1):
+        self.interaction_budget = interaction_budget
+        self.max_levels = max_levels
+        self.rebuild_growth = rebuild_growth
+        self.levels = []  # [(voxel_size, points, colors)], від детального до грубого
+        self.source_count = 0
+        self.lock = threading.Lock()
+        self.build_thread = None
+
+    def update(self, points, colors):
+        """Запуск фонової перебудови рівнів, якщо хмара суттєво змінилась."""
+        count = len(points)
+        if count <= self.interaction_budget:
+            with self.lock:
+                self.levels = []
+                self.source_count = count
+            return
+        if abs(count - self.source_count) <= self.rebuild_growth * max(self.source_count, 1):
+            return
+        if self.build_thread is not None and self.build_thread.is_alive():
+            return
+        self.source_count = count
+        self.build_thread = threading.Thread(target=self._build, args=(points.copy(), colors.copy()),
+                                             name="LodBuilder", daemon=True)
+        self.build_thread.start()
+
+    def _build(self, points, colors):
+        levels = []
+        extent = points.max(axis=0) - points.min(axis=0)
+        # Для рельєфу (поверхні) кількість точок рівня ≈ площа / voxel²
+        area = max(float(np.sort(extent)[1:].prod()), 1e-6)
+        voxel = np.sqrt(area / (4 * self.interaction_budget))
+        level_points, level_colors = points, colors
+        while len(levels) < self.max_levels:
+            index = voxel_representatives(level_points, voxel)
+            level_points, level_colors = level_points[index], level_colors[index]
+            levels.append((voxel, level_points, level_colors))
+            if len(level_points) <= self.interaction_budget // 16:
+                break
+            voxel *= 2
+        with self.lock:
+            self.levels = levels
+        logger.info("LOD levels for %d points: %s", len(points), [len(p) for _, p, _ in levels])
+
+    def select(self, zoom_factor=1.0):
+        """Найдетальніший рівень у межах бюджету (з урахуванням масштабу) або None."""
+        # Менший zoom_factor — ближча камера: видно менше точок, тож бюджет на рівень більший
+        budget = self.interaction_budget / max(zoom_factor, 1e-3)
+        with self.lock:
+            levels = self.levels
+        for voxel, points, colors in levels:
+            if len(points) <= budget:
+                return points, colors
+        return (levels[-1][1], levels[-1][2]) if levels else None
@@ -0,0 +1,122 @@
+# log_tools.py
+# Неблокуюче логування для гарячих шляхів обробки пакетів, спільне для дрона й наземної станції.
+# Дзеркальна копія: RaspberrySide/utils/log_tools.py — зміни вносити в обидві.
+#
+# start_queue_logging() ховає обробники логера за QueueHandler: викликач лише ставить запис у
+# чергу, а форматує й записує його потік QueueListener. Записи стоять у черзі неформатованими:
+# передавайте аргументи в %-стилі (logger.info("x=%s", x)), а не f-рядки, і повідомлення буде
+# зібране, лише якщо його справді записують. PacketLog замінює рядки на кожен пакет періодичними
+# зведеннями за ключами (якщо не ввімкнено логування кожного пакета) і обмежує частоту повторних
+# попереджень з одного місця виклику.
+import time
+import queue
+import logging
+import threading
+import logging.handlers
+
+# Типове значення для всіх PacketLog, створених без явного per_packet
+PER_PACKET = False
+
+
+def set_per_packet(enabled):
+    """Перемикання всіх PacketLog без власного налаштування між рядками на кожен пакет і зведеннями."""
+    global PER_PACKET
+    PER_PACKET = bool(enabled)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, що ніколи не блокує викликача: коли запис відстає, записи відкидаються."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Форматування лишається потоку запису; зараз треба відтворити лише traceback
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_queue_logging(logger=None, max_queue=10000):
+    """Перенесення обробників logger (типово кореневого) у фоновий потік запису; повертає QueueListener."""
+    logger = logger if logger is not None else logging.getLogger()
+    handlers = [h for h in logger.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+    log_queue = queue.Queue(max_queue)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class PacketLog:
+    """Логування на кожен пакет, що згортається в один рядок зведення на ключ кожні summary_interval."""
+
+    def __init__(self, logger, per_packet=None, summary_interval=10.0):
+        """
+        :param per_packet: логувати кожну подію (True) чи лише зведення (False); None — за PER_PACKET
+        """
+        self.logger = logger
+        self._per_packet = per_packet
+        self.summary_interval = summary_interval
+        self.lock = threading.Lock()
+        self.counts = {}  # ключ -> [подій, байтів]
+        self.limits = {}  # ключ -> [наступний дозволений час, пропущено]
+        self.window_start = time.monotonic()
+
+    @property
+    def per_packet(self):
+        return PER_PACKET if self._per_packet is None else self._per_packet
+
+    def event(self, key, msg=None, *args, size=0):
+        """Одна подія рівня пакета; msg (форматується ліниво) логується лише в режимі per-packet."""
+        if msg is not None and self.per_packet:
+            self.logger.info(msg, *args)
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0, 0]
+            counts[0] += 1
+            counts[1] += size
+        self.tick()
+
+    def limited(self, key, interval, level, msg, *args):
+        """Не частіше разу на interval секунд для key; кількість пропущених додається до наступного рядка."""
+        now = time.monotonic()
+        with self.lock:
+            limit = self.limits.get(key)
+            if limit is not None and now < limit[0]:
+                limit[1] += 1
+                return
+            suppressed = limit[1] if limit is not None else 0
+            self.limits[key] = [now + interval, 0]
+        if suppressed:
+            self.logger.log(level, msg + " (%d similar suppressed)", *args, suppressed)
+        else:
+            self.logger.log(level, msg, *args)
+
+    def tick(self):
+        """Запис зведення, якщо минув summary_interval; досить дешево, щоб викликати на кожен пакет."""
+        if time.monotonic() - self.window_start >= self.summary_interval:
+            self.flush()
+
+    def flush(self):
+        """Запис зведення за ключами для поточного вікна й початок нового."""
+        now = time.monotonic()
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            elapsed, self.window_start = now - self.window_start, now
+        if not counts or self.per_packet:
+            return
+        parts = [f"{key} {events} ({events / elapsed:.1f}/s" + (f", {size} B)" if size else ")")
+                 for key, (events, size) in sorted(counts.items())]
+        self.logger.info("Last %.1f s: %s", elapsed, ", ".join(parts))
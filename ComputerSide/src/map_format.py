@@ -0,0 +1,221 @@
+# map_format.py
+# Бінарний формат карти (.udmap).
+#
+# Файл: заголовок (magic b"UDMAP\0", версія uint16), далі послідовність чанків.
+# Чанк: заголовок (b"PTS\0", кількість точок uint32), xyz float32 (N×3), типи uint8 (N),
+# вирівнювання до 4 байт. Нові точки дописуються окремими чанками; compact() зливає їх в один.
+# Чанк b"VOX\0" (версія 2) — точки після воксельного злиття: після типів і вирівнювання
+# ще кількість влучань uint32 (N) та голоси за типи uint32 (N×len(OBJECT_TYPES)).
+# Усі числа little-endian.
+#
+# Конвертація: python -m src.map_format import terrain_map.csv terrain_map.udmap
+#              python -m src.map_format export terrain_map.udmap terrain_map.csv
+import os
+import struct
+import sys
+import numpy as np
+import pandas as pd
+from src.point_store import OBJECT_TYPES, encode_object_types
+from src import voxel_map
+
+MAGIC = b"UDMAP\x00"
+VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+FILE_HEADER = struct.Struct("<6sH")
+CHUNK_MAGIC = b"PTS\x00"
+VOXEL_CHUNK_MAGIC = b"VOX\x00"
+CHUNK_HEADER = struct.Struct("<4sI")
+EXTENSION = ".udmap"
+
+
+def is_binary_map(path):
+    return path.endswith(EXTENSION)
+
+
+def _padding(count):
+    return (-count) % 4
+
+
+def write_header(f):
+    f.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+
+def create(path):
+    """Створення порожнього файлу карти."""
+    with open(path, 'wb') as f:
+        write_header(f)
+
+
+def write_chunk(f, points, codes, hits=None, votes=None):
+    """Запис одного чанку у відкритий (бінарний) файл; з hits і votes — воксельний чанк."""
+    points = np.ascontiguousarray(points, dtype='<f4').reshape(-1, 3)
+    codes = np.ascontiguousarray(codes, dtype=np.uint8).reshape(-1)
+    if len(points) != len(codes):
+        raise ValueError(f"Points ({len(points)}) and codes ({len(codes)}) mismatch")
+    if hits is not None:
+        hits = np.ascontiguousarray(hits, dtype='<u4').reshape(-1)
+        votes = np.ascontiguousarray(votes, dtype='<u4').reshape(-1, len(OBJECT_TYPES))
+        if len(hits) != len(points) or len(votes) != len(points):
+            raise ValueError(f"Points ({len(points)}), hits ({len(hits)}) and votes ({len(votes)}) mismatch")
+    f.write(CHUNK_HEADER.pack(CHUNK_MAGIC if hits is None else VOXEL_CHUNK_MAGIC, len(points)))
+    f.write(points.tobytes())
+    f.write(codes.tobytes())
+    f.write(b"\x00" * _padding(len(codes)))
+    if hits is not None:
+        f.write(hits.tobytes())
+        f.write(votes.tobytes())
+
+
+def _chunk_size(magic, count):
+    size = count * 13 + _padding(count)
+    if magic == VOXEL_CHUNK_MAGIC:
+        size += count * 4 * (1 + len(OBJECT_TYPES))
+    return size
+
+
+def read_weighted_chunks(path):
+    """Список чанків карти як memmap-масивів (xyz float32 N×3, типи uint8 N, влучання uint32 N,
+    голоси uint32 N×len(OBJECT_TYPES)); для звичайних чанків влучання та голоси — None.
+
+    Обрізаний останній чанк (наприклад, після аварійного завершення) ігнорується.
+    """
+    size = os.path.getsize(path)
+    chunks = []
+    with open(path, 'rb') as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f"{path}: file too short")
+        magic, version = FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a map file")
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"{path}: unsupported map version {version}")
+        offset = FILE_HEADER.size
+        while offset + CHUNK_HEADER.size <= size:
+            f.seek(offset)
+            magic, count = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+            if magic not in (CHUNK_MAGIC, VOXEL_CHUNK_MAGIC):
+                raise ValueError(f"{path}: corrupt chunk at offset {offset}")
+            data_offset = offset + CHUNK_HEADER.size
+            end = data_offset + _chunk_size(magic, count)
+            if end > size:
+                break
+            if count:
+                points = np.memmap(path, dtype='<f4', mode='r', offset=data_offset, shape=(count, 3))
+                codes = np.memmap(path, dtype=np.uint8, mode='r', offset=data_offset + count * 12, shape=(count,))
+                hits = votes = None
+                if magic == VOXEL_CHUNK_MAGIC:
+                    weights_offset = data_offset + count * 13 + _padding(count)
+                    hits = np.memmap(path, dtype='<u4', mode='r', offset=weights_offset, shape=(count,))
+                    votes = np.memmap(path, dtype='<u4', mode='r', offset=weights_offset + count * 4,
+                                      shape=(count, len(OBJECT_TYPES)))
+                chunks.append((points, codes, hits, votes))
+            offset = end
+    return chunks
+
+
+def read_chunks(path):
+    """Список чанків карти як пар memmap-масивів (xyz float32 N×3, типи uint8 N)."""
+    return [(points, codes) for points, codes, _, _ in read_weighted_chunks(path)]
+
+
+def load(path):
+    """Точки (float32 N×3) та коди типів (uint8 N) з файлу карти.
+
+    Для файлу з одним чанком повертаються memmap без копіювання.
+    """
+    chunks = read_chunks(path)
+    if not chunks:
+        return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.uint8)
+    if len(chunks) == 1:
+        return chunks[0]
+    return np.concatenate([p for p, _ in chunks]), np.concatenate([c for _, c in chunks])
+
+
+def load_weighted(path):
+    """(points, codes, hits, votes) з файлу карти; точка зі звичайного чанку — одне влучання
+    з голосом за власний тип."""
+    chunks = read_weighted_chunks(path)
+    if not chunks:
+        return (np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.uint8),
+                np.empty(0, dtype=np.uint32), np.empty((0, len(OBJECT_TYPES)), dtype=np.uint32))
+    hits, votes = [], []
+    for points, codes, chunk_hits, chunk_votes in chunks:
+        if chunk_hits is None:
+            chunk_hits = np.ones(len(points), dtype=np.uint32)
+            chunk_votes = np.zeros((len(points), len(OBJECT_TYPES)), dtype=np.uint32)
+            chunk_votes[np.arange(len(points)), codes] = 1
+        hits.append(chunk_hits)
+        votes.append(chunk_votes)
+    return (np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks]),
+            np.concatenate(hits), np.concatenate(votes))
+
+
+def save(path, points, codes, hits=None, votes=None):
+    """Атомарний запис карти одним чанком."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        write_header(f)
+        write_chunk(f, points, codes, hits, votes)
+    os.replace(tmp_path, path)
+
+
+def compact(path, voxel_size=None):
+    """Злиття всіх чанків файлу в один; повертає кількість чанків до злиття.
+
+    З voxel_size точки ще й зливаються по вокселях (сумарні влучання та голоси зберігаються
+    у воксельному чанку), тож файл росте з площею зйомки, а не з кількістю вимірів.
+    """
+    weighted = [hits is not None for _, _, hits, _ in read_weighted_chunks(path)]
+    if voxel_size:
+        # Один воксельний чанк уже ущільнено
+        if weighted and weighted != [True]:
+            points, codes, hits, votes = load_weighted(path)
+            save(path, *voxel_map.compact(points, codes, voxel_size, hits, votes))
+    elif len(weighted) > 1:
+        if all(weighted):
+            save(path, *load_weighted(path))
+        else:
+            points, codes = load(path)
+            save(path, np.array(points), np.array(codes))
+    return len(weighted)
+
+
+def csv_to_binary(csv_path, bin_path, chunk_rows=1000000):
+    """Імпорт terrain_map.csv у бінарний формат."""
+    tmp_path = bin_path + ".tmp"
+    total = 0
+    with open(tmp_path, 'wb') as f:
+        write_header(f)
+        for df in pd.read_csv(csv_path, chunksize=chunk_rows):
+            df = df.dropna()
+            write_chunk(f, df[["x", "y", "depth"]].to_numpy(dtype=np.float32),
+                        encode_object_types(df["object_type"].to_numpy()))
+            total += len(df)
+    os.replace(tmp_path, bin_path)
+    compact(bin_path)
+    return total
+
+
+def binary_to_csv(bin_path, csv_path):
+    """Експорт бінарної карти у формат terrain_map.csv."""
+    points, codes = load(bin_path)
+    pd.DataFrame({
+        "x": points[:, 0],
+        "y": points[:, 1],
+        "depth": points[:, 2],
+        "object_type": pd.Categorical.from_codes(codes, categories=OBJECT_TYPES)
+    }).to_csv(csv_path, index=False)
+    return len(points)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python -m src.map_format import|export <source> <destination>")
+        sys.exit(1)
+    command, source, destination = sys.argv[1:]
+    if command == "import":
+        count = csv_to_binary(source, destination)
+    else:
+        count = binary_to_csv(source, destination)
+    print(f"Converted {count} points: {source} -> {destination}")
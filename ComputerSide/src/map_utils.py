@@ -1,215 +1,325 @@
 # map_utils.py
 import numpy as np
-import open3d as o3d
 import os
 import pandas as pd
 import threading
+import time
 import logging
+from src.point_store import OBJECT_TYPES, EMPTY_CODE, PALETTE, encode_object_types
+from src.utils import quaternion_to_rotation_matrix
+from src.map_writer import MapWriter
+from src import map_format
+from src import voxel_map
+from src import tile_map
+from src.voxel_map import VoxelIndex
+from src.dem_grid import DepthGrid
+from src.surface_mesh import SurfaceMesher
+from src.log_tools import PacketLog
+from src.metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Кожне скидання MapWriter дописує окремий чанк; при завантаженні їх надто багато — зливаємо
+MAX_MAP_CHUNKS = 256
+
 class MapUtils:
-    def __init__(self):
-        self.color_map = {
-            "sand": [0.957, 0.894, 0.678],
-            "rock": [0.502, 0.502, 0.502],
-            "coral": [1.0, 0.412, 0.706],
-            "reef": [0.0, 0.502, 0.0],
-            "empty": [0.0, 0.0, 0.0]
-        }
+    def __init__(self, map_path=None, writer_options=None, voxel_size=0.05, dem_cell_size=0.5):
+        self.color_map = {name: PALETTE[code].tolist() for code, name in enumerate(OBJECT_TYPES)}
         self.lock = threading.Lock()
+        self.packet_log = PacketLog(logger)
+        self.metrics = {
+            "ingest": REGISTRY.histogram("map.ingest_us"),
+            "points": REGISTRY.counter("map.points"),
+            "samples": REGISTRY.counter("map.samples"),
+        }
         self.last_point = None  # Для перевірки дублювання
+        # Воксельна дедуплікація (розмір вокселя в метрах); None — лише порівняння з попередньою точкою
+        self.voxel_index = VoxelIndex(voxel_size) if voxel_size else None
+        # Сітка глибин (DEM), що оновлюється разом із хмарою точок
+        self.dem = DepthGrid(dem_cell_size)
+        # Поверхня за сіткою глибин будується в окремому процесі (лише в режимах mesh/both)
+        self.mesher = SurfaceMesher()
+        self.mesh_interval = 1.0
+        self.last_mesh_submit = 0.0
+        self.map_path = map_path or os.path.join(os.getcwd(), "terrain_map" + map_format.EXTENSION)
+        # Тайлова карта (шлях *.tiles): у пам'яті лише тайли навколо дрона
+        self.tiles = None
+        self.tile_ids = {}  # (tx, ty) -> id першої точки тайла у сховищі
+        self.dem_tiles = set()  # Тайли, точки яких уже додано в сітку глибин
+        if tile_map.is_tiled_map(self.map_path):
+            self.tiles = tile_map.TiledMap(self.map_path, voxel_size=voxel_size)
+            self.tiles.start()
+        # Дозапис нових точок у файл карти виконується у фоновому потоці
+        self.writer = MapWriter(self.map_path, tiles=self.tiles, **(writer_options or {}))
+        self.writer.start()
 
     def load_map(self, visualizer):
-        """Завантаження карти з terrain_map.csv."""
+        """Завантаження карти з файлу map_path."""
         with self.lock:
-            map_path = os.path.join(os.getcwd(), "terrain_map.csv")
-            logger.info(f"Looking for terrain_map.csv at: {map_path}")
+            map_path = self.map_path
+            logger.info("Looking for map at: %s", map_path)
             try:
-                data_df = pd.read_csv(map_path)
-                required_columns = ["x", "y", "depth", "object_type"]
-                if not all(col in data_df.columns for col in required_columns):
-                    raise ValueError(f"CSV missing required columns: {required_columns}")
-                
-                data_df = data_df.dropna()
-                points = data_df[["x", "y", "depth"]].to_numpy()
-                object_types = data_df["object_type"].to_numpy()
-
-                if len(points) != len(object_types):
-                    logger.error(f"Mismatch in CSV: {len(points)} points, {len(object_types)} object types")
-                    visualizer.points = []
-                    visualizer.object_types = []
-                    visualizer.visualization.pcd.points = o3d.utility.Vector3dVector([])
-                    visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector([])
-                    return
-                
-                visualizer.points = points.tolist()
-                visualizer.object_types = object_types.tolist()
-                colors = np.array([self.color_map.get(obj, [0.0, 0.0, 0.0]) for obj in object_types])
-                
-                if len(colors) != len(points):
-                    logger.error(f"Colors ({len(colors)}) and points ({len(points)}) mismatch")
-                    visualizer.points = []
-                    visualizer.object_types = []
-                    visualizer.visualization.pcd.points = o3d.utility.Vector3dVector([])
-                    visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector([])
-                    return
-                
-                visualizer.visualization.pcd.points = o3d.utility.Vector3dVector(points)
-                visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector(colors)
-
-                max_coords = np.max(np.abs(points), axis=0) if len(points) > 0 else np.array([1.0, 1.0, 1.0])
-                max_coords = np.maximum(max_coords * 1.2, [1.0, 1.0, 1.0])
-                visualizer.visualization.axes.points = o3d.utility.Vector3dVector([
-                    [0, 0, 0], [max_coords[0], 0, 0], [0, max_coords[1], 0], [0, 0, max_coords[2]]
-                ])
-                visualizer.visualization.axes.lines = o3d.utility.Vector2iVector([
-                    [0, 1], [0, 2], [0, 3]
-                ])
-                visualizer.visualization.axes.colors = o3d.utility.Vector3dVector([
-                    [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-                logger.info(f"Loaded map with {len(points)} points, axis lengths: X={max_coords[0]}, Y={max_coords[1]}, Z={max_coords[2]}")
-            
+                if self.tiles is not None:
+                    self.load_tiles(visualizer.point_store, visualizer.drone_position)
+                else:
+                    self.fill_store(visualizer.point_store, *self.read_map())
+                store = visualizer.point_store
+                points = store.points
+                visualizer.visualization.set_cloud(points, store.colors)
+
+                max_coords = np.max(np.abs(points), axis=0) * 1.2 if len(points) > 0 else None
+                visualizer.visualization.reset_axes(max_coords)
+                logger.info("Loaded map with %d points, axis lengths: %s", len(points), visualizer.visualization.axis_extent)
+
             except FileNotFoundError:
-                logger.warning("No terrain_map.csv found, creating empty map")
-                visualizer.points = []
-                visualizer.object_types = []
-                visualizer.visualization.pcd.points = o3d.utility.Vector3dVector([])
-                visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector([])
-
-                visualizer.visualization.axes.points = o3d.utility.Vector3dVector([
-                    [0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-                visualizer.visualization.axes.lines = o3d.utility.Vector2iVector([
-                    [0, 1], [0, 2], [0, 3]
-                ])
-                visualizer.visualization.axes.colors = o3d.utility.Vector3dVector([
-                    [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-
-                with open(map_path, 'w') as f:
-                    f.write("x,y,depth,object_type\n")
-                logger.info(f"Created empty terrain_map.csv at: {map_path}")
+                logger.warning("No map found at %s, creating empty map", map_path)
+                visualizer.point_store.clear()
+                visualizer.visualization.set_cloud(visualizer.point_store.points, visualizer.point_store.colors)
+                visualizer.visualization.reset_axes()
+
+                if map_format.is_binary_map(map_path):
+                    map_format.create(map_path)
+                else:
+                    with open(map_path, 'w') as f:
+                        f.write("x,y,depth,object_type\n")
+                logger.info("Created empty map at: %s", map_path)
 
             except ValueError as e:
-                logger.error(f"Error loading CSV: {e}")
-                visualizer.points = []
-                visualizer.object_types = []
-                visualizer.visualization.pcd.points = o3d.utility.Vector3dVector([])
-                visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector([])
-
-                visualizer.visualization.axes.points = o3d.utility.Vector3dVector([
-                    [0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-                visualizer.visualization.axes.lines = o3d.utility.Vector2iVector([
-                    [0, 1], [0, 2], [0, 3]
-                ])
-                visualizer.visualization.axes.colors = o3d.utility.Vector3dVector([
-                    [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
+                logger.error("Error loading map: %s", e)
+                visualizer.point_store.clear()
+                visualizer.visualization.set_cloud(visualizer.point_store.points, visualizer.point_store.colors)
+                visualizer.visualization.reset_axes()
                 logger.info("Initialized empty map due to error")
 
+    def fill_store(self, store, points, codes, hits=None, votes=None):
+        """Заміна вмісту сховища точками карти (з воксельним ущільненням, якщо воно ввімкнене).
+
+        hits і votes — влучання та голоси вже злитих точок (з воксельних чанків файлу карти).
+        """
+        self.dem.clear()
+        self.dem.add(points, codes, hits, votes)
+        if self.voxel_index is not None:
+            loaded = len(points)
+            points, codes, hits, votes = voxel_map.compact(points, codes, self.voxel_index.voxel_size, hits, votes)
+            store.replace(points, codes, hits, votes)
+            self.voxel_index.rebuild(store)
+            logger.info("Voxel compaction: %d -> %d points", loaded, len(store))
+        else:
+            store.replace(points, codes, hits, votes)
+
+    def load_tiles(self, store, position):
+        """Заповнення сховища тайлами навколо position (завантаження в поточному потоці)."""
+        store.clear()
+        self.dem.clear()
+        self.tile_ids = {}
+        self.dem_tiles = set()
+        if self.voxel_index is not None:
+            self.voxel_index.rebuild(store)
+        self.tiles.drop_cache()
+        self.tiles.focus(position, block=True)
+        self.add_tiles(store, self.tiles.take_loaded())
+
+    def add_tiles(self, store, tiles):
+        """Дописування в сховище прочитаних тайлів, яких у ньому ще немає; повертає кількість нових точок."""
+        added = 0
+        for key, points, codes, hits, votes in tiles:
+            first_id = self.tile_ids.get(key)
+            # Тайл знову прочитано після вивантаження з кешу, але його точки ще у сховищі
+            if first_id is not None and store.alive([first_id])[0]:
+                continue
+            if key not in self.dem_tiles:
+                self.dem.add(points, codes, hits, votes)
+                self.dem_tiles.add(key)
+            self.tile_ids[key] = store.next_id
+            if self.voxel_index is not None:
+                # Вокселі, в які вже потрапили точки цієї сесії, не дублюються
+                added += self.voxel_index.insert(store, points, codes, hits, votes)
+            else:
+                store.append(points, codes)
+                added += len(points)
+        return added
+
+    def read_map(self):
+        """(points, codes, hits, votes) з файлу карти (бінарного .udmap або CSV); hits і votes —
+        None, якщо джерело зберігає лише окремі виміри."""
+        if map_format.is_binary_map(self.map_path):
+            # Перший запуск після переходу на бінарний формат: імпорт наявного terrain_map.csv
+            legacy_csv = os.path.splitext(self.map_path)[0] + ".csv"
+            if not os.path.exists(self.map_path) and os.path.exists(legacy_csv):
+                count = map_format.csv_to_binary(legacy_csv, self.map_path)
+                logger.info("Imported %d points from %s into %s", count, legacy_csv, self.map_path)
+            if self.voxel_index is not None:
+                # Виміри попередніх сесій зливаються по вокселях і на диску
+                self.compact_map()
+                return map_format.load_weighted(self.map_path)
+            if len(map_format.read_chunks(self.map_path)) > MAX_MAP_CHUNKS:
+                map_format.compact(self.map_path)
+            return map_format.load(self.map_path) + (None, None)
+
+        data_df = pd.read_csv(self.map_path)
+        required_columns = ["x", "y", "depth", "object_type"]
+        if not all(col in data_df.columns for col in required_columns):
+            raise ValueError(f"CSV missing required columns: {required_columns}")
+        data_df = data_df.dropna()
+        points = data_df[["x", "y", "depth"]].to_numpy(dtype=np.float64)
+        codes = encode_object_types(data_df["object_type"].to_numpy())
+        return points, codes, None, None
+
+    def compact_map(self):
+        """Воксельне ущільнення бінарного файлу карти: один чанк з влучаннями та голосами на воксель."""
+        if self.voxel_index is None or self.tiles is not None or not map_format.is_binary_map(self.map_path):
+            return
+        if not os.path.exists(self.map_path):
+            return
+        start = time.perf_counter()
+        size = os.path.getsize(self.map_path)
+        chunks = map_format.compact(self.map_path, self.voxel_index.voxel_size)
+        logger.info("Compacted %s: %d chunks, %d -> %d bytes in %.1f ms", self.map_path, chunks, size,
+                    os.path.getsize(self.map_path), (time.perf_counter() - start) * 1000)
+
     def update_3d_map(self, visualizer, sonar_data, imu_data):
         """Оновлення 3D карти з даними сонара та IMU."""
+        distance = sonar_data.get("distance", 0.0)
+        object_type = sonar_data.get("object_type", "empty")
+        quaternion = imu_data.get("quaternion", [1.0, 0.0, 0.0, 0.0])
+
+        if not isinstance(distance, (int, float)) or not all(isinstance(q, (int, float)) for q in quaternion):
+            self.packet_log.limited("invalid", 5.0, logging.ERROR, "Invalid sonar/imu data: distance=%s, quaternion=%s",
+                                    distance, quaternion)
+            return
+
+        self.ingest_batch(visualizer, [distance], [quaternion], [visualizer.drone_position], [object_type])
+
+    def ingest_batch(self, visualizer, distances, quaternions, positions, object_types):
+        """Пакетне додавання N вимірів сонара: відстані (N,), кватерніони (N×4), позиції дрона (N×3), типи (N,).
+
+        Повертає кількість доданих точок.
+        """
+        start = time.perf_counter()
+        try:
+            distances = np.asarray(distances, dtype=np.float64).reshape(-1)
+            quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+            positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        except (TypeError, ValueError) as e:
+            logger.error("Invalid sonar/imu batch: %s", e)
+            return 0
+        count = len(distances)
+        if len(quaternions) != count or len(positions) != count or len(object_types) != count:
+            logger.error("Batch size mismatch: distances=%d, quaternions=%d, positions=%d, object_types=%d",
+                         count, len(quaternions), len(positions), len(object_types))
+            return 0
+        if count == 0:
+            return 0
+        self.metrics["samples"].inc(count)
+
+        # Валідація типів: невідомі типи стають 'empty'
+        codes = encode_object_types(object_types)
+        empty = codes == EMPTY_CODE
+        if empty.any():
+            invalid_types = int((np.asarray(object_types, dtype=str).reshape(-1)[empty] != "empty").sum())
+            if invalid_types:
+                self.packet_log.limited("object_type", 5.0, logging.WARNING,
+                                        "Invalid object_type in %d samples, using 'empty'", invalid_types)
+
+        # Поворот вектора [0, 0, -distance]: це -distance, помножене на третій стовпець матриці
+        rotations = quaternion_to_rotation_matrix(quaternions)
+        global_points = positions - distances[:, None] * rotations[:, :, 2]
+        valid = np.isfinite(global_points).all(axis=1)
+        if not valid.all():
+            self.packet_log.limited("invalid", 5.0, logging.ERROR, "Skipping %d samples with invalid sonar/imu data",
+                                    int((~valid).sum()))
+
         with self.lock:
-            distance = sonar_data.get("distance", 0.0)
-            object_type = sonar_data.get("object_type", "empty")
-            quaternion = imu_data.get("quaternion", [1.0, 0.0, 0.0, 0.0])
-            
-            if not isinstance(distance, (int, float)) or not all(isinstance(q, (int, float)) for q in quaternion):
-                logger.error(f"Invalid sonar/imu data: distance={distance}, quaternion={quaternion}")
-                return
-            
-            if object_type not in self.color_map:
-                logger.warning(f"Invalid object_type: {object_type}, using 'empty'")
-                object_type = "empty"
-            
-            q0, q1, q2, q3 = quaternion
-            R = np.array([
-                [1 - 2*q2**2 - 2*q3**2, 2*q1*q2 - 2*q0*q3, 2*q1*q3 + 2*q0*q2],
-                [2*q1*q2 + 2*q0*q3, 1 - 2*q1**2 - 2*q3**2, 2*q2*q3 - 2*q0*q1],
-                [2*q1*q3 - 2*q0*q2, 2*q2*q3 + 2*q0*q1, 1 - 2*q1**2 - 2*q2**2]
-            ])
-            
-            depth_vector = np.array([0, 0, -distance])
-            global_point = visualizer.drone_position + R @ depth_vector
-            
-            if not isinstance(global_point, np.ndarray) or len(global_point) != 3:
-                logger.error(f"Invalid global_point: {global_point}")
-                return
-            
-            # Перевірка на дублювання
-            if self.last_point is not None and np.allclose(self.last_point, global_point, atol=0.01):
-                logger.debug("Duplicate point detected, skipping")
-                return
-            
-            self.last_point = global_point.copy()
-            logger.info(f"Adding point with distance={distance}, position={visualizer.drone_position}, object_type={object_type}")
-            
-            logger.debug(f"Before adding: points={len(visualizer.points)}, object_types={len(visualizer.object_types)}")
-            visualizer.points.append(global_point.tolist())
-            visualizer.object_types.append(object_type)
-            logger.debug(f"After adding: points={len(visualizer.points)}, object_types={len(visualizer.object_types)}")
-            
-            if len(visualizer.points) != len(visualizer.object_types):
-                logger.error(f"Points ({len(visualizer.points)}) and object_types ({len(visualizer.object_types)}) mismatch before truncation")
-                visualizer.points.pop()
-                visualizer.object_types.pop()
-                return
-            
-            if len(visualizer.points) > 1000000:
-                visualizer.points.pop(0)
-                visualizer.object_types.pop(0)
-            
-            points_array = np.array(visualizer.points)
-            colors = np.array([self.color_map.get(obj, [0.0, 0.0, 0.0]) for obj in visualizer.object_types])
-            
-            if len(points_array) != len(colors):
-                logger.error(f"Points ({len(points_array)}) and colors ({len(colors)}) mismatch")
-                visualizer.points.pop()
-                visualizer.object_types.pop()
-                return
-            
-            visualizer.visualization.pcd.points = o3d.utility.Vector3dVector(points_array)
-            visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector(colors)
-            
-            if len(points_array) > 0:
-                max_coords = np.max(np.abs(points_array), axis=0)
-                max_coords = np.maximum(max_coords * 1.1, [1.0, 1.0, 1.0])
-                visualizer.visualization.axes.points = o3d.utility.Vector3dVector([
-                    [0, 0, 0], [max_coords[0], 0, 0], [0, max_coords[1], 0], [0, 0, max_coords[2]]
-                ])
-                visualizer.visualization.axes.lines = o3d.utility.Vector2iVector([
-                    [0, 1], [0, 2], [0, 3]
-                ])
-                visualizer.visualization.axes.colors = o3d.utility.Vector3dVector([
-                    [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-                logger.info(f"Axis lengths: X={max_coords[0]}, Y={max_coords[1]}, Z={max_coords[2]}, Point: {global_point}")
+            self.dem.add(global_points[valid], codes[valid])
+            if self.voxel_index is not None:
+                if not valid.any():
+                    return 0
+                # Точки в зайнятих вокселях зливаються з наявними; повертаються лише нові вокселі
+                new_points, new_codes = self.voxel_index.ingest(
+                    visualizer.point_store, global_points[valid], codes[valid])
+                added = len(new_points)
+                # На диск ідуть усі виміри, а не лише перші точки нових вокселів: при завантаженні
+                # compact() відновлює з них середні положення, влучання та голоси за типи
+                saved_points, saved_codes = global_points[valid], codes[valid]
+                self.packet_log.event("ingest", "Added %d/%d points, merged %d, last position=%s",
+                                      added, count, int(valid.sum()) - added, positions[-1], size=added)
             else:
-                visualizer.visualization.axes.points = o3d.utility.Vector3dVector([
-                    [0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-                visualizer.visualization.axes.lines = o3d.utility.Vector2iVector([
-                    [0, 1], [0, 2], [0, 3]
-                ])
-                visualizer.visualization.axes.colors = o3d.utility.Vector3dVector([
-                    [1, 0, 0], [0, 1, 0], [0, 0, 1]
-                ])
-            
+                # Перевірка на дублювання: кожна точка порівнюється з попередньою
+                previous = np.empty_like(global_points)
+                previous[1:] = global_points[:-1]
+                if self.last_point is not None:
+                    previous[0] = self.last_point
+                else:
+                    previous[0] = np.nan
+                duplicate = np.all(np.abs(global_points - previous) <= 0.01 + 1e-5 * np.abs(previous), axis=1)
+
+                keep = valid & ~duplicate
+                added = int(keep.sum())
+                if added == 0:
+                    self.packet_log.event("ingest", "Only duplicate points in batch, skipping")
+                    return 0
+
+                new_points = global_points[keep]
+                new_codes = codes[keep]
+                self.last_point = new_points[-1].copy()
+                visualizer.point_store.append(new_points, new_codes)
+                saved_points, saved_codes = new_points, new_codes
+                self.packet_log.event("ingest", "Added %d/%d points, last position=%s",
+                                      added, count, positions[-1], size=added)
+
+            self.refresh_geometry(visualizer, new_points)
+
             # Інкрементальне збереження
-            map_path = "/home/miha/Projects/UnderWaterDron/ComputerSide/terrain_map.csv"
-            with open(map_path, 'a') as f:
-                f.write(f"{global_point[0]},{global_point[1]},{global_point[2]},{object_type}\n")
-            logger.info(f"Appended to terrain_map.csv at: {map_path}")
-            
-            if visualizer.visualization.vis and visualizer.visualization.vis_initialized:
-                visualizer.visualization.pcd.points = o3d.utility.Vector3dVector(points_array)
-                visualizer.visualization.pcd.colors = o3d.utility.Vector3dVector(colors)
-                visualizer.visualization.vis.clear_geometries()
-                visualizer.visualization.vis.add_geometry(visualizer.visualization.pcd)
-                visualizer.visualization.vis.add_geometry(visualizer.visualization.axes)
-                visualizer.visualization.vis.poll_events()
-                visualizer.visualization.vis.update_renderer()
+            if len(saved_points):
+                self.writer.submit(saved_points, saved_codes)
+            self.metrics["ingest"].record_seconds(time.perf_counter() - start)
+            self.metrics["points"].inc(added)
+            return added
+
+    def poll_tiles(self, visualizer):
+        """Зміщення кешу тайлів за дроном; тайли, прочитані фоновим потоком, дописуються в сховище."""
+        if self.tiles is None:
+            return
+        self.tiles.focus(visualizer.drone_position)
+        loaded = self.tiles.take_loaded()
+        if not loaded:
+            return
+        with self.lock:
+            store = visualizer.point_store
+            added = self.add_tiles(store, loaded)
+            if added:
+                self.refresh_geometry(visualizer, store.points[-added:])
+        logger.info("Loaded %d tiles, added %d points", len(loaded), added)
+
+    def poll_mesh(self, visualizer):
+        """Підстановка готової поверхні та запуск перебудови змінених блоків не частіше mesh_interval."""
+        visualization = visualizer.visualization
+        if visualization.geometry_mode == "points":
+            return
+        mesh = self.mesher.poll()
+        if mesh is not None:
+            visualization.set_mesh(*mesh)
+        now = time.monotonic()
+        if not self.mesher.busy and now - self.last_mesh_submit >= self.mesh_interval:
+            with self.lock:
+                if self.mesher.submit(self.dem):
+                    self.last_mesh_submit = now
+
+    def close(self):
+        """Дозапис решти буфера карти на диск."""
+        self.packet_log.flush()
+        self.mesher.close()
+        self.writer.close()
+        try:
+            self.compact_map()
+        except (OSError, ValueError) as e:
+            logger.error("Error compacting %s: %s", self.map_path, e)
+        if self.tiles is not None:
+            self.tiles.close()
+
+    def refresh_geometry(self, visualizer, new_points=None):
+        """Позначення хмари точок застарілою (перебудова — у кадрі рендерингу); осі подовжуються лише за новими точками."""
+        store = visualizer.point_store
+        visualizer.visualization.invalidate_cloud(store)
+        visualizer.visualization.grow_axes(store.points if new_points is None else new_points)
@@ -0,0 +1,174 @@
+# map_writer.py
+import os
+import time
+import threading
+import logging
+from collections import deque
+import numpy as np
+from src.point_store import OBJECT_TYPES
+from src import map_format
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("never", "flush", "interval")
+
+class MapWriter:
+    """Фоновий дозапис точок карти у файл (бінарний .udmap або CSV — за розширенням шляху)
+    або в тайлову карту tiles (TiledMap).
+
+    Точки накопичуються в обмеженому буфері та скидаються на диск, коли набирається
+    flush_rows рядків або минає flush_interval секунд. fsync виконується згідно з політикою:
+    "never", "flush" (після кожного скидання) або "interval" (не частіше ніж раз на fsync_interval).
+    """
+
+    def __init__(self, path, flush_rows=1000, flush_interval=1.0, max_buffered_rows=200000,
+                 fsync="interval", fsync_interval=5.0, tiles=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}, expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.binary = map_format.is_binary_map(path)
+        self.tiles = tiles
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_buffered_rows = max_buffered_rows
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.cond = threading.Condition()
+        # Утримується на все скидання: синхронний flush() чекає, доки пачки, вже взяті потоком
+        # запису, потраплять на диск, і два потоки не пишуть у файл одночасно
+        self.write_lock = threading.Lock()
+        self.buffer = deque()
+        self.buffered_rows = 0
+        self.file = None
+        self.last_fsync = time.monotonic()
+        self.unsynced = False  # У файлі є записані, але ще не синхронізовані fsync дані
+        self.stats = {"rows_written": 0, "rows_dropped": 0, "flushes": 0,
+                      "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Запуск потоку запису."""
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="MapWriter", daemon=True)
+        self.thread.start()
+
+    def submit(self, points, codes):
+        """Постановка точок (k×3) з кодами типів (k,) у чергу запису; не блокує виклик."""
+        points = np.array(points, dtype=np.float64).reshape(-1, 3)
+        codes = np.array(codes, dtype=np.uint8).reshape(-1)
+        with self.cond:
+            self.buffer.append((points, codes))
+            self.buffered_rows += len(points)
+            # Буфер переповнений (диск не встигає) — відкидаємо найстаріші пачки
+            while self.buffered_rows > self.max_buffered_rows and len(self.buffer) > 1:
+                dropped, _ = self.buffer.popleft()
+                self.buffered_rows -= len(dropped)
+                self.stats["rows_dropped"] += len(dropped)
+                logger.warning("Map write buffer full, dropped %d points", len(dropped))
+            if self.buffered_rows >= self.flush_rows:
+                self.cond.notify()
+
+    def metrics(self):
+        """Знімок метрик: глибина черги та затримка скидань."""
+        with self.cond:
+            metrics = dict(self.stats)
+            metrics["queue_depth"] = self.buffered_rows
+        flushes = metrics["flushes"]
+        metrics["mean_flush_ms"] = metrics.pop("total_flush_ms") / flushes if flushes else 0.0
+        return metrics
+
+    def flush(self):
+        """Синхронне скидання буфера (наприклад, перед перечитуванням тайлів з диска)."""
+        self._flush()
+
+    def close(self):
+        """Зупинка потоку з остаточним скиданням буфера на диск."""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self._flush(force_fsync=True)
+        if self.file is not None:
+            # Буфер міг бути порожнім, а попередні скидання — без fsync
+            if self.unsynced:
+                try:
+                    os.fsync(self.file.fileno())
+                except OSError as e:
+                    logger.error("Error syncing %s: %s", self.path, e)
+            self.file.close()
+            self.file = None
+        logger.info("Map writer closed: %s", self.metrics())
+
+    def _run(self):
+        while True:
+            with self.cond:
+                deadline = time.monotonic() + self.flush_interval
+                while self.running and self.buffered_rows < self.flush_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                if not self.running:
+                    return
+            self._flush()
+
+    def _flush(self, force_fsync=False):
+        with self.write_lock:
+            self._write_buffer(force_fsync)
+
+    def _write_buffer(self, force_fsync):
+        with self.cond:
+            batches = list(self.buffer)
+            self.buffer.clear()
+            self.buffered_rows = 0
+        if not batches:
+            return
+        start = time.perf_counter()
+        try:
+            points = np.concatenate([p for p, _ in batches])
+            codes = np.concatenate([c for _, c in batches])
+            now = time.monotonic()
+            do_fsync = force_fsync or self.fsync == "flush" or (
+                self.fsync == "interval" and now - self.last_fsync >= self.fsync_interval)
+            if self.tiles is not None:
+                self.tiles.append(points, codes, fsync=do_fsync)
+            else:
+                f = self._open()
+                if self.binary:
+                    map_format.write_chunk(f, points, codes)
+                else:
+                    names = np.asarray(OBJECT_TYPES)[codes]
+                    f.write("".join(f"{x},{y},{z},{name}\n" for (x, y, z), name in zip(points.tolist(), names)))
+                f.flush()
+                if do_fsync:
+                    os.fsync(f.fileno())
+                self.unsynced = not do_fsync
+            if do_fsync:
+                self.last_fsync = now
+        except OSError as e:
+            logger.error("Error writing %s: %s", self.path, e)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.cond:
+            self.stats["rows_written"] += len(points)
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = elapsed_ms
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+            self.stats["total_flush_ms"] += elapsed_ms
+        logger.debug("Flushed %d points to %s in %.1f ms", len(points), self.path, elapsed_ms)
+
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.path, 'ab' if self.binary else 'a')
+            if self.file.tell() == 0:
+                if self.binary:
+                    map_format.write_header(self.file)
+                else:
+                    self.file.write("x,y,depth,object_type\n")
+        return self.file
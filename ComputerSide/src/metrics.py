@@ -0,0 +1,228 @@
+# metrics.py
+# Метрики конвеєра, спільні для дрона й наземної станції: лічильники, датчики (gauge) і
+# гістограми затримок у стилі HDR в одному реєстрі, доступні як періодичний JSON-дамп і локальний
+# HTTP-ендпоінт (GET /metrics).
+# Дзеркальна копія: RaspberrySide/utils/metrics.py — зміни вносити в обидві.
+#
+# Гістограми мають лог-лінійні кошики: точні нижче 2 * SUB_BUCKETS, далі SUB_BUCKETS лінійних
+# кошиків на кожен степінь двійки, тобто відносна похибка близько 1 / SUB_BUCKETS на будь-якому
+# масштабі, а кілька сотень кошиків покривають діапазон від мікросекунд до годин. Запис — O(1).
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(value):
+    """Кошик невід'ємного цілого значення."""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucket_bounds(index):
+    """Діапазон значень кошика [low, high)."""
+    shift = max(0, index // SUB_BUCKETS - 1)
+    low = (index - shift * SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+def bucket_percentile(counts, total, low, high, q):
+    """Перцентиль q за кількостями в кошиках (усього total значень у межах [low, high])."""
+    if not total:
+        return 0
+    target = max(1, -(-total * q // 100))
+    seen = 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= target:
+            bucket_low, bucket_high = bucket_bounds(index)
+            return min(max((bucket_low + bucket_high - 1) / 2, low), high)
+    return high
+
+
+class Counter:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Розподіл невід'ємних значень (за домовленістю — затримки в мікросекундах)."""
+
+    def __init__(self, name, unit="us"):
+        self.name = name
+        self.unit = unit
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = []
+            self.count = 0
+            self.total = 0
+            self.min = None
+            self.max = 0
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = bucket_index(value)
+        with self.lock:
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+            self.min = value if self.min is None else min(self.min, value)
+
+    def record_seconds(self, seconds):
+        self.record(seconds * 1e6)
+
+    @contextmanager
+    def time(self):
+        """Запис тривалості блоку with у мікросекундах."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record((time.perf_counter() - start) * 1e6)
+
+    def percentile(self, q):
+        """Значення перцентиля q (0-100): середина кошика, що його містить, обмежена min/max."""
+        with self.lock:
+            return bucket_percentile(self.counts, self.count, self.min, self.max, q)
+
+    def snapshot(self):
+        """Кількість, середнє, min/max і перцентилі з однієї узгодженої копії кошиків."""
+        with self.lock:
+            counts, count, total, low, high = list(self.counts), self.count, self.total, self.min, self.max
+        result = {"count": count, "unit": self.unit, "min": low or 0, "max": high,
+                  "mean": total / count if count else 0.0}
+        for q in PERCENTILES:
+            result[f"p{q:g}"] = bucket_percentile(counts, count, low, high, q)
+        return result
+
+
+class MetricsRegistry:
+    """Метрики за назвою; та сама назва завжди повертає той самий об'єкт."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.started = time.time()
+
+    def _get(self, cls, name, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls):
+                raise TypeError(f"Metric {name} is a {type(metric).__name__}, not a {cls.__name__}")
+            return metric
+
+    def counter(self, name):
+        return self._get(Counter, name)
+
+    def gauge(self, name):
+        return self._get(Gauge, name)
+
+    def histogram(self, name, unit="us"):
+        return self._get(Histogram, name, unit)
+
+    def snapshot(self):
+        """Усі метрики як словник, придатний для JSON."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        result = {"timestamp": time.time(), "uptime": time.time() - self.started,
+                  "counters": {}, "gauges": {}, "histograms": {}}
+        for metric in sorted(metrics, key=lambda m: m.name):
+            section = {Counter: "counters", Gauge: "gauges", Histogram: "histograms"}[type(metric)]
+            result[section][metric.name] = metric.snapshot()
+        return result
+
+    def dump_json(self, path):
+        """Атомарний запис знімка у path."""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(temp_path, path)
+
+
+# Спільний реєстр процесу для всіх інструментованих модулів
+REGISTRY = MetricsRegistry()
+
+
+class MetricsReporter:
+    """Фоновий потік, що кожні interval секунд записує реєстр у JSON-файл."""
+
+    def __init__(self, path, interval=5.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="MetricsReporter", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.registry.dump_json(self.path)
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        self.registry.dump_json(self.path)
+
+
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Віддача знімка реєстру як JSON за адресою http://host:port/metrics з фонового потоку."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = json.dumps(registry.snapshot()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="MetricsHTTP", daemon=True).start()
+    return server
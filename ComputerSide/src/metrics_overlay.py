@@ -0,0 +1,71 @@
+# metrics_overlay.py
+import time
+from PyQt5 import QtWidgets, QtCore
+from src.metrics import REGISTRY
+
+# (підпис, гістограма) етапів, для яких показується p99
+STAGES = (
+    ("receive", "net.receive_us"),
+    ("assemble", "net.frame_assembly_us"),
+    ("decode", "camera.decode_us"),
+    ("ingest", "map.ingest_us"),
+    ("render", "render.render_us"),
+    ("capture", "render.capture_us"),
+    ("glass2glass", "trace.glass_to_glass_us"),
+    ("sonar2map", "trace.sonar_to_map_us"),
+)
+# (підпис, лічильник) для швидкостей за секунду
+RATES = (
+    ("render FPS", "render.frames"),
+    ("camera FPS", "camera.displayed"),
+    ("points/s", "map.points"),
+    ("datagrams/s", "net.datagrams"),
+)
+
+
+class MetricsOverlay(QtWidgets.QLabel):
+    """Напівпрозора панель поверх вікна: FPS, точки за секунду та p99 затримок етапів."""
+
+    def __init__(self, parent, interval_ms=1000, registry=REGISTRY):
+        super().__init__(parent)
+        self.registry = registry
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: #e0e0e0; "
+                           "font-family: monospace; padding: 6px;")
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self.last_counts = {}
+        self.last_time = time.monotonic()
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.setInterval(interval_ms)
+        self.hide()
+
+    def set_enabled(self, enabled):
+        """Показ/приховування панелі; оновлення йдуть лише поки вона видима."""
+        if enabled:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.timer.start()
+        else:
+            self.timer.stop()
+            self.hide()
+
+    def refresh(self):
+        snapshot = self.registry.snapshot()
+        now = time.monotonic()
+        elapsed = max(now - self.last_time, 1e-6)
+        lines = []
+        for label, name in RATES:
+            count = snapshot["counters"].get(name, 0)
+            rate = (count - self.last_counts.get(name, count)) / elapsed
+            self.last_counts[name] = count
+            lines.append(f"{label:<12}{rate:>9.1f}")
+        lines.append("p99, ms")
+        for label, name in STAGES:
+            histogram = snapshot["histograms"].get(name)
+            value = f"{histogram['p99'] / 1000:>9.2f}" if histogram and histogram["count"] else f"{'-':>9}"
+            lines.append(f"  {label:<10}{value}")
+        self.last_time = now
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(10, 10)
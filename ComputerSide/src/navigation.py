@@ -9,8 +9,8 @@ class Navigation:
         self.thruster_speeds = [0.0] * 6
 
     def on_map_click(self, visualizer, event):
-        if visualizer.display_mode in ["sonar", "both"] and len(visualizer.points) > 0:
-            last_point = visualizer.points[-1]
+        if visualizer.display_mode in ["sonar", "both"] and len(visualizer.point_store) > 0:
+            last_point = visualizer.point_store.last_point().copy()
             self.route.append(last_point)
             print(f"Added route point via click: {last_point}")
 
@@ -1,46 +1,275 @@
 # network.py
 import socket
 import json
+import threading
+import time
+import logging
+from collections import deque
+from src import protocol
+from src.reassembly import FrameReassembler, FRAME_RESET_GAP
+from src.log_tools import PacketLog
+from src.metrics import REGISTRY
+from src.tracing import TRACE, ClockSync
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Номер пакета сенсорів, менший за попередній більш ніж на стільки, означає перезапуск дрона, а не
+# перестановку (для кадрів камери — FRAME_RESET_GAP)
+SEQ_RESET_GAP = 1000
 
 class NetworkHandler:
-    def __init__(self, local_ip="127.0.0.1", local_port=5005, rpi_ip="127.0.0.1", rpi_port=5006):
+    def __init__(self, local_ip="127.0.0.1", local_port=5005, rpi_ip="127.0.0.1", rpi_port=5006,
+                 wire_formats=protocol.SUPPORTED_FORMATS, sensor_queue_size=512, recv_buffer_size=4 * 1024 * 1024,
+                 link_stats_interval=1.0, reorder_window=0.03, nack_interval=0.1, max_nacks=3,
+                 frame_timeout=0.5, reassembly_budget=32 * 1024 * 1024, ping_interval=1.0):
         self.rpi_ip = rpi_ip
         self.rpi_port = rpi_port
         self.local_ip = local_ip
         self.local_port = local_port
         self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Більший буфер ядра, щоб пачка чанків кадру не відкидалась до того, як її прочитає потік
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
         self.udp_socket.bind((self.local_ip, self.local_port))
-        self.udp_socket.settimeout(0.1)
-        self.image_buffer = {} 
+        self.udp_socket.settimeout(min(0.1, reorder_window))
+        # Незібрані кадри; ті, що не зібрались за frame_timeout або не вмістились у бюджет, втрачені
+        self.reassembler = FrameReassembler(frame_timeout, reassembly_budget)
+        # Повторний запит втрачених чанків (NACK): чанки кадру, до якого reorder_window нічого
+        # не надходило, вважаються втраченими; запит повторюється не частіше ніж раз на
+        # nack_interval, не більше max_nacks разів.
+        self.reorder_window = reorder_window
+        self.nack_interval = nack_interval
+        self.max_nacks = max_nacks
+        self.wire_formats = list(wire_formats)
+        # Рядки на кожен пакет зводяться в періодичні підсумки (log_tools.set_per_packet вмикає їх назад)
+        self.packet_log = PacketLog(logger)
+        self.metrics = {
+            "receive": REGISTRY.histogram("net.receive_us"),
+            "assembly": REGISTRY.histogram("net.frame_assembly_us"),
+            "datagrams": REGISTRY.counter("net.datagrams"),
+            "bytes": REGISTRY.counter("net.bytes"),
+            "frames": REGISTRY.counter("net.frames"),
+            "frames_lost": REGISTRY.counter("net.frames_lost"),
+            "rtt": REGISTRY.histogram("link.rtt_us"),
+            "offset": REGISTRY.gauge("clock.offset_ms"),
+        }
+        # Зсув годинника дрона та RTT за обміном ping/pong раз на ping_interval
+        self.clock = ClockSync()
+        self.ping_interval = ping_interval
+        self.ping_id = 0
+        self.last_ping = 0.0
+
+        # Результати потоку читання: камера — лише останній кадр, сенсори — обмежена черга
+        self.results_lock = threading.Lock()
+        self.latest_frame = None
+        self.sensor_queue = deque(maxlen=sensor_queue_size)
+        # Якщо задано, зібрані кадри передаються напряму (наприклад, у FrameDecoder), минаючи latest_frame
+        self.frame_sink = None
+        self.stats = {"datagrams": 0, "frames": 0, "frames_replaced": 0, "sensor_packets": 0, "sensor_dropped": 0,
+                      "nacks_sent": 0, "chunks_requested": 0, "chunks_recovered": 0, "frames_recovered": 0,
+                      "frames_lost": 0}
+        # Статистика каналу за інтервал, яку дрон використовує для адаптації відеопотоку
+        self.link_stats_interval = link_stats_interval
+        self.link = self._empty_link_stats()
+        self.last_link_report = time.monotonic()
+        self.last_frame_id = None
+        self.last_sensor_seq = None
+        self.running = False
+        self.reader_thread = None
+        self.send_hello()
+
+    def start(self):
+        """Запуск фонового потоку, що вичитує всі датаграми одразу після надходження."""
+        if self.reader_thread is not None:
+            return
+        self.running = True
+        self.reader_thread = threading.Thread(target=self._reader_loop, name="NetworkReader", daemon=True)
+        self.reader_thread.start()
+
+    def _reader_loop(self):
+        while self.running:
+            try:
+                result = self.receive_data()
+            except socket.timeout:
+                result = None
+            except OSError as e:
+                if self.running:
+                    logger.error("Reader error: %s", e)
+                break
+            if result:
+                self._publish(result)
+            if len(self.reassembler):
+                self.expire_frames()
+                self.send_nacks()
+            self.packet_log.tick()
+            if time.monotonic() - self.last_link_report >= self.link_stats_interval:
+                self.send_link_stats()
+            if time.monotonic() - self.last_ping >= self.ping_interval:
+                self.send_ping()
+
+    def _publish(self, result):
+        if result["type"] == "camera" and self.frame_sink is not None:
+            self.stats["frames"] += 1
+            self.frame_sink(result["data"], result.get("trace"))
+            return
+        with self.results_lock:
+            if result["type"] == "camera":
+                if self.latest_frame is not None:
+                    self.stats["frames_replaced"] += 1
+                self.latest_frame = result["data"]
+                self.stats["frames"] += 1
+            elif result["type"] == "sensor":
+                if len(self.sensor_queue) == self.sensor_queue.maxlen:
+                    self.stats["sensor_dropped"] += 1
+                self.sensor_queue.append(result["data"])
+                self.stats["sensor_packets"] += 1
+
+    def take_latest_frame(self):
+        """Останній зібраний кадр (JPEG-байти) або None, якщо нового кадру не було."""
+        with self.results_lock:
+            frame, self.latest_frame = self.latest_frame, None
+        return frame
+
+    def take_sensor_packets(self):
+        """Усі накопичені пакети сенсорів у порядку надходження."""
+        with self.results_lock:
+            packets = list(self.sensor_queue)
+            self.sensor_queue.clear()
+        return packets
+
+    @staticmethod
+    def _empty_link_stats():
+        return {"frames": 0, "dropped": 0, "late": 0, "recovered": 0, "bytes": 0, "sensor_packets": 0,
+                "sensor_lost": 0}
+
+    def expire_frames(self):
+        """Відкидання незібраних кадрів, що застаріли або не вмістились у бюджет пам'яті."""
+        for frame in self.reassembler.expire():
+            self.link["dropped"] += 1
+            self.stats["frames_lost"] += 1
+            self.metrics["frames_lost"].inc()
+            self.packet_log.event("frame_dropped", "Dropped incomplete frame %d (%d/%d chunks)",
+                                  frame.frame_id, frame.count, frame.total_chunks)
+
+    def send_nacks(self):
+        """Запит у дрона чанків, яких бракує в незібраних кадрах (одна датаграма на всі кадри)."""
+        now = time.monotonic()
+        frames = []
+        budget = protocol.MAX_NACK_CHUNKS
+        for frame_id, frame in sorted(self.reassembler.frames.items()):
+            if frame.nacks >= self.max_nacks:
+                continue
+            wait = self.reorder_window if frame.nacks == 0 else self.nack_interval
+            if now - frame.last < wait:
+                continue
+            missing = frame.missing()[:budget]
+            if not missing:
+                continue
+            frames.append([frame_id, missing])
+            frame.requested.update(missing)
+            frame.nacks += 1
+            frame.last = now
+            self.stats["chunks_requested"] += len(missing)
+            budget -= len(missing)
+            if budget <= 0:
+                break
+        if not frames:
+            return
+        self.stats["nacks_sent"] += 1
+        try:
+            message = json.dumps({"type": protocol.NACK, "frames": frames}, separators=(",", ":"))
+            self.udp_socket.sendto(message.encode(), (self.rpi_ip, self.rpi_port))
+        except OSError as e:
+            self.packet_log.limited("send", 5.0, logging.WARNING, "Send NACK error: %s", e)
+
+    def send_link_stats(self):
+        """Звіт дрону про якість каналу за останній інтервал (кадри, втрати, запізнення, байти)."""
+        now = time.monotonic()
+        report = dict(self.link, type=protocol.LINK_STATS, interval=now - self.last_link_report)
+        self.link = self._empty_link_stats()
+        self.last_link_report = now
+        try:
+            self.udp_socket.sendto(json.dumps(report).encode(), (self.rpi_ip, self.rpi_port))
+        except OSError as e:
+            self.packet_log.limited("send", 5.0, logging.WARNING, "Send link stats error: %s", e)
+
+    def send_ping(self):
+        """Ping дрону для оцінки зсуву годинника; відповідь (pong) приходить разом з телеметрією."""
+        self.last_ping = time.monotonic()
+        self.ping_id += 1
+        try:
+            message = json.dumps({"type": protocol.PING, "id": self.ping_id, "t0": time.time()})
+            self.udp_socket.sendto(message.encode(), (self.rpi_ip, self.rpi_port))
+        except OSError as e:
+            self.packet_log.limited("send", 5.0, logging.WARNING, "Send ping error: %s", e)
+
+    def handle_pong(self, pong, received):
+        """Оновлення оцінки зсуву годинника дрона та RTT за відповіддю на ping."""
+        try:
+            offset, rtt = self.clock.add(pong["t0"], pong["t1"], pong["t2"], received)
+        except (KeyError, TypeError) as e:
+            self.packet_log.limited("pong", 5.0, logging.WARNING, "Bad pong %s: %s", pong, e)
+            return
+        self.metrics["rtt"].record_seconds(rtt)
+        self.metrics["offset"].set(self.clock.offset * 1000)
+        TRACE.record("clock", pong.get("id"), offset=self.clock.offset, rtt=self.clock.rtt,
+                     sample_offset=offset, sample_rtt=rtt)
+
+    def send_hello(self):
+        """Повідомлення дрону про підтримувані формати пакетів."""
+        try:
+            message = json.dumps({"type": "hello", "formats": self.wire_formats})
+            self.udp_socket.sendto(message.encode(), (self.rpi_ip, self.rpi_port))
+        except Exception as e:
+            logger.error("Send hello error: %s", e)
 
     def send_command(self, thruster_speeds):
         """Відправлення команди з швидкостями двигунів."""
-        command = {"thruster_speeds": thruster_speeds}
-        print(f"Sending command to {self.rpi_ip}:{self.rpi_port}: {command}")
+        command = {"thruster_speeds": thruster_speeds, "formats": self.wire_formats}
+        self.packet_log.event("command_tx", "Sending command to %s:%d: %s", self.rpi_ip, self.rpi_port, command)
         try:
             message = json.dumps(command)
             if len(message) > 1024:
-                print(f"Warning: Command size {len(message)} exceeds 1024 bytes")
+                logger.warning("Command size %d exceeds 1024 bytes", len(message))
             self.udp_socket.sendto(message.encode(), (self.rpi_ip, self.rpi_port))
         except Exception as e:
-            print(f"Send command error: {e}")
+            self.packet_log.limited("send", 5.0, logging.WARNING, "Send command error: %s", e)
 
     def receive_data(self):
         """Отримання даних: sensor_data або image_chunk."""
+        start = None
         try:
-            data, addr = self.udp_socket.recvfrom(16384)
-            print(f"Received data size: {len(data)} bytes from {addr}")
-            try:
-                packet = json.loads(data.decode())
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {e}, raw data: {data.decode()[:100]}...")
+            data, addr = self.udp_socket.recvfrom(65535)
+            # Час обробки датаграми (без очікування в recvfrom)
+            start = time.perf_counter()
+            received = time.time()
+            self.stats["datagrams"] += 1
+            self.metrics["datagrams"].inc()
+            self.metrics["bytes"].inc(len(data))
+            self.packet_log.event("datagram", "Received data size: %d bytes from %s", len(data), addr, size=len(data))
+            if protocol.is_binary(data):
+                try:
+                    packet = protocol.decode(data)
+                except protocol.ProtocolError as e:
+                    self.packet_log.limited("decode", 5.0, logging.WARNING, "Binary decode error: %s", e)
+                    return {}
+            else:
+                try:
+                    packet = protocol.decode_json(data)
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    self.packet_log.limited("decode", 5.0, logging.WARNING, "JSON decode error: %s, raw data: %r...",
+                                            e, data[:100])
+                    return {}
+
+            if packet.get("type") == protocol.PONG:
+                self.handle_pong(packet, received)
                 return {}
 
             # Обробка image_chunk
             if packet.get("type") == "image_chunk":
                 required_fields = ["frame_id", "chunk_index", "total_chunks", "data"]
                 if not all(field in packet for field in required_fields):
-                    print(f"Error: Missing fields in image_chunk: {packet}")
+                    self.packet_log.limited("fields", 5.0, logging.WARNING, "Missing fields in image_chunk: %s", packet)
                     return {}
 
                 frame_id = packet["frame_id"]
@@ -48,48 +277,82 @@ class NetworkHandler:
                 total_chunks = packet["total_chunks"]
                 chunk_data = packet["data"]
 
-                print(f"Image chunk: frame_id={frame_id}, chunk={chunk_index+1}/{total_chunks}, size={len(chunk_data)} bytes")
-
-                if frame_id not in self.image_buffer:
-                    self.image_buffer[frame_id] = [""] * total_chunks
-                    print(f"Started collecting frame {frame_id} with {total_chunks} chunks")
-                
-                self.image_buffer[frame_id][chunk_index] = chunk_data
-
-                if all(chunk != "" for chunk in self.image_buffer[frame_id]):
-                    full_frame = "".join(self.image_buffer[frame_id])
-                    print(f"Assembled frame {frame_id} with {len(full_frame)} bytes")
-                    del self.image_buffer[frame_id]
-                    # Очищення старих фреймів
-                    old_frames = [fid for fid in self.image_buffer if fid < frame_id - 10]
-                    for fid in old_frames:
-                        del self.image_buffer[fid]
-                        print(f"Cleared old frame {fid}")
-                    return {"type": "camera", "data": full_frame}
-                
-                return {}
+                self.packet_log.event("image_chunk", "Image chunk: frame_id=%d, chunk=%d/%d, size=%d bytes",
+                                      frame_id, chunk_index + 1, total_chunks, len(chunk_data))
+                self.link["bytes"] += len(data)
+
+                partial = self.reassembler.get(frame_id)
+                if partial is not None and chunk_index in partial.requested and not partial.has(chunk_index):
+                    self.stats["chunks_recovered"] += 1
+
+                frame = self.reassembler.add(frame_id, chunk_index, total_chunks, chunk_data,
+                                             timestamp=packet.get("timestamp"))
+                if frame is None:
+                    return {}
+                full_frame = self.reassembler.frame_bytes(frame)
+                self.packet_log.event("frame", "Assembled frame %d with %d bytes in %.1f ms", frame_id,
+                                      len(full_frame), self.reassembler.stats["last_latency_ms"], size=len(full_frame))
+                recovered = frame.nacks > 0
+                self.metrics["frames"].inc()
+                self.metrics["assembly"].record(self.reassembler.stats["last_latency_ms"] * 1000)
+                self.link["frames"] += 1
+                if recovered:
+                    self.stats["frames_recovered"] += 1
+                    self.link["recovered"] += 1
+                if self.last_frame_id is not None and self.last_frame_id - FRAME_RESET_GAP < frame_id < self.last_frame_id:
+                    # Кадр зібрано вже після новішого — для показу він запізнився. Відновлений
+                    # повтором кадр запізнюється за визначенням, це не перестановка в каналі
+                    if not recovered:
+                        self.link["late"] += 1
+                else:
+                    self.last_frame_id = frame_id
+                # Трасування кадру: час захоплення на дроні (заголовок) і час збирання тут
+                latency = self.reassembler.stats["last_latency_ms"] / 1000
+                trace = {"id": frame_id, "capture": packet.get("timestamp"), "first_chunk": received - latency,
+                         "assembled": received}
+                return {"type": "camera", "data": full_frame, "trace": trace}
 
             # Обробка sensor_data
             required_fields = ["timestamp", "imu", "sonar", "thruster_speeds", "frame_id"]
             if not all(field in packet for field in required_fields):
-                print(f"Error: Missing fields in sensor_data: {required_fields}, packet: {packet}")
+                self.packet_log.limited("fields", 5.0, logging.WARNING, "Missing fields in sensor_data: %s, packet: %s",
+                                        required_fields, packet)
                 return {}
 
             sonar_data = packet.get("sonar", {})
             required_sonar_fields = ["point", "distance", "object_type"]
             if not all(field in sonar_data for field in required_sonar_fields):
-                print(f"Error: Missing fields in sonar_data: {required_sonar_fields}, packet: {packet}")
+                self.packet_log.limited("fields", 5.0, logging.WARNING, "Missing fields in sonar_data: %s, packet: %s",
+                                        required_sonar_fields, packet)
                 return {}
 
-            print(f"Sensor data: timestamp={packet['timestamp']}, frame_id={packet['frame_id']}, object_type={sonar_data['object_type']}")
+            self.packet_log.event("sensor", "Sensor data: timestamp=%s, frame_id=%s, object_type=%s",
+                                  packet["timestamp"], packet["frame_id"], sonar_data["object_type"])
+            # Пакети сенсорів нумеруються підряд: пропуски в номерах — втрачені датаграми
+            seq = packet["frame_id"]
+            self.link["sensor_packets"] += 1
+            if self.last_sensor_seq is not None and seq > self.last_sensor_seq + 1:
+                self.link["sensor_lost"] += seq - self.last_sensor_seq - 1
+            if self.last_sensor_seq is None or seq > self.last_sensor_seq or seq < self.last_sensor_seq - SEQ_RESET_GAP:
+                self.last_sensor_seq = seq
+            packet["received_at"] = received
             return {"type": "sensor", "data": packet}
 
         except socket.timeout:
             raise
         except Exception as e:
-            print(f"Receive error: {e}")
+            self.packet_log.limited("receive", 5.0, logging.WARNING, "Receive error: %s", e)
             return {}
+        finally:
+            if start is not None:
+                self.metrics["receive"].record_seconds(time.perf_counter() - start)
 
     def close(self):
-        """Закриття сокета."""
+        """Зупинка потоку читання та закриття сокета."""
+        self.running = False
+        if self.reader_thread is not None:
+            self.reader_thread.join(timeout=1.0)
+            self.reader_thread = None
         self.udp_socket.close()
+        self.packet_log.flush()
+        logger.info("Network stats: %s, reassembly: %s", self.stats, self.reassembler.stats)
@@ -0,0 +1,215 @@
+# point_store.py
+import numpy as np
+import pandas as pd
+
+OBJECT_TYPES = ("sand", "rock", "coral", "reef", "empty")
+OBJECT_CODES = {name: code for code, name in enumerate(OBJECT_TYPES)}
+EMPTY_CODE = OBJECT_CODES["empty"]
+# Відсортовані назви для пошуку кодів через np.searchsorted
+_SORTED_TYPES = np.array(sorted(OBJECT_TYPES))
+_SORTED_CODES = np.array([OBJECT_CODES[name] for name in _SORTED_TYPES], dtype=np.uint8)
+
+# Кольори типів об'єктів, індексовані кодом типу
+PALETTE = np.array([
+    [0.957, 0.894, 0.678],  # sand — бежевий
+    [0.502, 0.502, 0.502],  # rock — сірий
+    [1.0, 0.412, 0.706],    # coral — рожевий
+    [0.0, 0.502, 0.0],      # reef — зелений
+    [0.0, 0.0, 0.0]         # empty — чорний
+])
+
+
+def encode_object_types(names):
+    """Перетворення назв типів у коди uint8; невідомі типи стають 'empty'."""
+    names = np.asarray(names, dtype=str).reshape(-1)
+    index = np.minimum(np.searchsorted(_SORTED_TYPES, names), len(_SORTED_TYPES) - 1)
+    return np.where(_SORTED_TYPES[index] == names, _SORTED_CODES[index], EMPTY_CODE).astype(np.uint8)
+
+
+class PointStore:
+    """Стовпцеве сховище точок карти на суцільних масивах NumPy.
+
+    Точки (float64, N×3), коди типів (uint8), кольори (float64, N×3), кількість влучань
+    (uint32) та голоси за типи (uint32, N×len(OBJECT_TYPES)) лежать у спільних буферах;
+    властивості повертають view без копіювання.
+    Буфер росте подвоєнням до 2×max_points; після заповнення найстаріші точки
+    відкидаються зсувом вікна, а дані переносяться на початок лише раз на max_points додавань.
+    Кожна точка має сталий id (порядковий номер додавання), який не змінюється при зсуві.
+    """
+
+    COLUMNS = {
+        "points": ((3,), np.float64),
+        "codes": ((), np.uint8),
+        "colors": ((3,), np.float64),
+        "hits": ((), np.uint32),
+        "votes": ((len(OBJECT_TYPES),), np.uint32)
+    }
+
+    def __init__(self, max_points=1000000, initial_capacity=1024):
+        self.max_points = max_points
+        capacity = max(1, min(initial_capacity, 2 * max_points))
+        self._columns = self._allocate(capacity)
+        self.start = 0
+        self.end = 0
+        self.first_id = 0  # id точки з індексом 0 у view
+        # id точок, змінених merge() з моменту take_modified() (для часткового оновлення рендерера);
+        # None — змінено надто багато, дешевше перебудувати все
+        self._modified = []
+        self._modified_count = 0
+
+    def _allocate(self, capacity):
+        return {name: np.zeros((capacity,) + shape, dtype=dtype) for name, (shape, dtype) in self.COLUMNS.items()}
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def capacity(self):
+        return len(self._columns["codes"])
+
+    @property
+    def points(self):
+        return self._columns["points"][self.start:self.end]
+
+    @property
+    def codes(self):
+        return self._columns["codes"][self.start:self.end]
+
+    @property
+    def colors(self):
+        return self._columns["colors"][self.start:self.end]
+
+    @property
+    def hits(self):
+        return self._columns["hits"][self.start:self.end]
+
+    @property
+    def votes(self):
+        return self._columns["votes"][self.start:self.end]
+
+    @property
+    def next_id(self):
+        return self.first_id + len(self)
+
+    def object_types(self):
+        """Назви типів об'єктів для всіх точок."""
+        return pd.Categorical.from_codes(self.codes, categories=OBJECT_TYPES)
+
+    def last_point(self):
+        return self._columns["points"][self.end - 1] if len(self) else None
+
+    def clear(self):
+        self.first_id += len(self)
+        self.start = 0
+        self.end = 0
+        self._modified = []
+        self._modified_count = 0
+
+    def take_modified(self):
+        """id точок, змінених merge() з попереднього виклику (можуть бути вже відкинуті),
+        або None, якщо їх більше за чверть сховища."""
+        modified = self._modified
+        self._modified = []
+        self._modified_count = 0
+        if modified is None:
+            return None
+        return np.unique(np.concatenate(modified)) if modified else np.empty(0, dtype=np.int64)
+
+    def replace(self, points, codes, hits=None, votes=None):
+        """Заміна вмісту сховища (наприклад, при завантаженні карти)."""
+        self.clear()
+        self.append(points, codes, hits, votes)
+
+    def append(self, points, codes, hits=None, votes=None):
+        """Додавання пачки точок (k×3) з кодами типів (k,); hits/votes за замовчуванням — одне влучання."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        codes = np.asarray(codes, dtype=np.uint8).reshape(-1)
+        if len(points) != len(codes):
+            raise ValueError(f"Points ({len(points)}) and codes ({len(codes)}) mismatch")
+        if len(points) > self.max_points:
+            skipped = len(points) - self.max_points
+            self.clear()
+            self.first_id += skipped
+            points = points[skipped:]
+            codes = codes[skipped:]
+            hits = hits[skipped:] if hits is not None else None
+            votes = votes[skipped:] if votes is not None else None
+        count = len(points)
+        if count == 0:
+            return
+
+        # Відкидаємо найстаріші точки, щоб не перевищити max_points
+        overflow = len(self) + count - self.max_points
+        if overflow > 0:
+            self.start += overflow
+            self.first_id += overflow
+        if self.end + count > self.capacity:
+            self._make_room(count)
+
+        new = slice(self.end, self.end + count)
+        columns = self._columns
+        columns["points"][new] = points
+        columns["codes"][new] = codes
+        np.take(PALETTE, codes, axis=0, out=columns["colors"][new])
+        columns["hits"][new] = 1 if hits is None else hits
+        if votes is None:
+            columns["votes"][new] = 0
+            columns["votes"][new][np.arange(count), codes] = columns["hits"][new]
+        else:
+            columns["votes"][new] = votes
+        self.end += count
+
+    def merge(self, ids, point_sums, counts, votes):
+        """Злиття нових влучань у наявні точки (за id): середнє положення, лічильник, тип за більшістю.
+
+        :param point_sums: сума координат нових влучань для кожної точки (k×3)
+        :param counts: кількість нових влучань (k,)
+        :param votes: голоси нових влучань за типи (k×len(OBJECT_TYPES))
+        """
+        index = np.asarray(ids, dtype=np.int64) - self.first_id + self.start
+        columns = self._columns
+        hits = columns["hits"][index].astype(np.float64)
+        total = hits + counts
+        columns["points"][index] = (columns["points"][index] * hits[:, None] + point_sums) / total[:, None]
+        columns["hits"][index] = total
+        columns["votes"][index] += votes.astype(np.uint32)
+        codes = np.argmax(columns["votes"][index], axis=1).astype(np.uint8)
+        columns["codes"][index] = codes
+        columns["colors"][index] = PALETTE[codes]
+        if self._modified is not None:
+            self._modified.append(np.asarray(ids, dtype=np.int64))
+            self._modified_count += len(index)
+            if self._modified_count > max(len(self) // 4, 1024):
+                self._modified = None
+
+    def alive(self, ids):
+        """Маска id, точки яких ще є у сховищі."""
+        ids = np.asarray(ids, dtype=np.int64)
+        return (ids >= self.first_id) & (ids < self.next_id)
+
+    def _make_room(self, count):
+        size = len(self)
+        needed = size + count
+        live = slice(self.start, self.end)
+        if 2 * needed <= self.capacity:
+            # Достатньо місця — переносимо живі дані на початок буфера
+            for column in self._columns.values():
+                column[:size] = column[live]
+        else:
+            capacity = min(max(2 * self.capacity, 2 * needed), 2 * self.max_points)
+            columns = self._allocate(capacity)
+            for name, column in self._columns.items():
+                columns[name][:size] = column[live]
+            self._columns = columns
+        self.start = 0
+        self.end = size
+
+    def to_dataframe(self):
+        """DataFrame у форматі terrain_map.csv поверх view сховища."""
+        points = self.points
+        return pd.DataFrame({
+            "x": points[:, 0],
+            "y": points[:, 1],
+            "depth": points[:, 2],
+            "object_type": self.object_types()
+        }, copy=False)
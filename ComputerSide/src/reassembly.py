@@ -0,0 +1,228 @@
+# reassembly.py
+# Збирання кадрів камери з UDP-чанків без проміжних копій.
+#
+# Для кожного кадру одразу виділяється один bytearray на total_chunks × розмір чанка
+# (усі чанки, крім останнього, однакового розміру), і кожен чанк копіюється на своє місце
+# через memoryview. Прибуття чанків відмічається бітовою маскою та лічильником, тож перевірка
+# завершеності — O(1). Незібрані кадри відкидаються за віком і за бюджетом пам'яті.
+import time
+import base64
+from collections import OrderedDict
+
+# Скільки ідентифікаторів завершених кадрів пам'ятати, щоб пізні дублікати чанків не починали кадр знову
+FINISHED_HISTORY = 256
+# Чанк кадру, на стільки номерів старшого за найновіший, не може бути пізнім дублікатом (повтори
+# за NACK закінчуються за frame_timeout, тобто за кілька кадрів): дрон перезапустився й нумерує
+# кадри заново, тож історія завершених кадрів і незібрані кадри старої нумерації скидаються.
+# Поки номери ще малі, перезапуск видно інакше: відомий frame_id приходить з іншою кількістю
+# чанків або з новішим часом захоплення кадру
+FRAME_RESET_GAP = 64
+
+
+class PartialFrame:
+    """Кадр, що збирається: буфер, маска отриманих чанків і стан повторних запитів (NACK)."""
+
+    def __init__(self, frame_id, total_chunks, now, timestamp=None):
+        self.frame_id = frame_id
+        self.total_chunks = total_chunks
+        self.timestamp = timestamp  # Час захоплення кадру на дроні (однаковий в усіх чанках кадру)
+        self.chunk_size = None
+        self.buffer = None
+        self.view = None
+        self.received = 0  # Бітова маска отриманих чанків
+        self.count = 0
+        self.length = 0
+        self.tail = None  # Останній чанк, що прийшов раніше за буфер (розмір чанка ще невідомий)
+        self.text = False  # JSON-формат: у буфері base64-текст
+        self.bad = False  # Відкладений хвіст виявився довшим за чанк
+        self.first = now
+        self.last = now
+        self.nacks = 0
+        self.requested = set()
+
+    @property
+    def complete(self):
+        return self.count == self.total_chunks
+
+    @property
+    def capacity(self):
+        return len(self.buffer) if self.buffer is not None else 0
+
+    def has(self, index):
+        return self.received >> index & 1 == 1
+
+    def missing(self):
+        """Індекси ще не отриманих чанків."""
+        return [i for i in range(self.total_chunks) if not self.received >> i & 1]
+
+    def _allocate(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.buffer = bytearray(self.total_chunks * chunk_size)
+        self.view = memoryview(self.buffer)
+
+    def _place(self, index, data):
+        """Копіювання чанка на його місце; False, якщо чанк довший за розмір чанка кадру."""
+        if len(data) > self.chunk_size:
+            return False
+        start = index * self.chunk_size
+        self.view[start:start + len(data)] = data
+        if index == self.total_chunks - 1:
+            self.length = start + len(data)
+        return True
+
+    def add(self, index, data):
+        """Запис чанка; False для дубліката."""
+        if self.has(index):
+            return False
+        self.received |= 1 << index
+        self.count += 1
+        if index == self.total_chunks - 1 and self.buffer is None and self.total_chunks > 1:
+            # Розмір звичайного чанка визначить перший же не останній чанк
+            self.tail = data
+            return True
+        if self.buffer is None:
+            self._allocate(len(data))
+        self._place(index, data)
+        if self.tail is not None:
+            tail, self.tail = self.tail, None
+            self.bad = not self._place(self.total_chunks - 1, tail)
+        return True
+
+    def payload(self):
+        """Зібраний кадр без копіювання (memoryview на буфер)."""
+        return self.view[:self.length]
+
+
+class FrameReassembler:
+    """Незібрані кадри за frame_id з відкиданням за віком (timeout) і бюджетом пам'яті."""
+
+    def __init__(self, timeout=0.5, memory_budget=32 * 1024 * 1024):
+        self.frames = {}
+        self.timeout = timeout
+        self.memory_budget = memory_budget
+        self.buffered_bytes = 0
+        self.evicted = []  # Відкинуті через бюджет пам'яті, ще не повернуті з expire()
+        self.finished = OrderedDict()  # frame_id зібраних і відкинутих кадрів -> (total_chunks, timestamp)
+        self.newest = None  # Найбільший frame_id поточної нумерації
+        self.stats = {"completed": 0, "duplicates": 0, "bad_chunks": 0, "evicted_timeout": 0,
+                      "evicted_memory": 0, "resets": 0, "last_latency_ms": 0.0, "mean_latency_ms": 0.0,
+                      "max_latency_ms": 0.0}
+        self._latency_sum = 0.0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame_id):
+        return frame_id in self.frames
+
+    def get(self, frame_id):
+        return self.frames.get(frame_id)
+
+    def add(self, frame_id, chunk_index, total_chunks, data, now=None, timestamp=None):
+        """Додавання чанка; повертає зібраний PartialFrame або None."""
+        now = time.monotonic() if now is None else now
+        if (self.newest is not None and frame_id < self.newest - FRAME_RESET_GAP or
+                self._restarted(frame_id, total_chunks, timestamp)):
+            self.reset()
+        if self.newest is None or frame_id > self.newest:
+            self.newest = frame_id
+        frame = self.frames.get(frame_id)
+        if frame is None:
+            if frame_id in self.finished:
+                self.stats["duplicates"] += 1
+                return None
+            frame = self.frames[frame_id] = PartialFrame(frame_id, total_chunks, now, timestamp)
+        if total_chunks != frame.total_chunks or not 0 <= chunk_index < total_chunks:
+            self.stats["bad_chunks"] += 1
+            return None
+        if isinstance(data, str):
+            # JSON-формат: чанк — шматок base64-тексту (ASCII)
+            frame.text = True
+            data = data.encode("ascii")
+        if frame.chunk_size is not None and (len(data) > frame.chunk_size or
+                                             (chunk_index < total_chunks - 1 and len(data) != frame.chunk_size)):
+            self.stats["bad_chunks"] += 1
+            return None
+        before = frame.capacity
+        if not frame.add(chunk_index, data):
+            self.stats["duplicates"] += 1
+            return None
+        frame.last = now
+        self.buffered_bytes += frame.capacity - before
+        if frame.bad:
+            # Хвіст, що не вміщується в чанк: кадр пошкоджений, повтор надіслав би те саме
+            self.stats["bad_chunks"] += 1
+            self.evicted.append(self._remove(frame_id))
+            return None
+        if not frame.complete:
+            self._enforce_budget(frame_id)
+            return None
+        self._remove(frame_id)
+        latency_ms = (now - frame.first) * 1000
+        self.stats["completed"] += 1
+        self._latency_sum += latency_ms
+        self.stats["last_latency_ms"] = latency_ms
+        self.stats["mean_latency_ms"] = self._latency_sum / self.stats["completed"]
+        self.stats["max_latency_ms"] = max(self.stats["max_latency_ms"], latency_ms)
+        return frame
+
+    def _restarted(self, frame_id, total_chunks, timestamp):
+        """Чанк відомого кадру з новішим часом захоплення (або, для завершеного кадру, з іншою
+        кількістю чанків) — це вже інший кадр нової нумерації після перезапуску дрона."""
+        frame = self.frames.get(frame_id)
+        if frame is not None:
+            known_total, known_timestamp = None, frame.timestamp
+        elif frame_id in self.finished:
+            known_total, known_timestamp = self.finished[frame_id]
+        else:
+            return False
+        if known_total is not None and total_chunks != known_total:
+            return True
+        return timestamp is not None and known_timestamp is not None and timestamp > known_timestamp
+
+    @staticmethod
+    def frame_bytes(frame):
+        """JPEG-байти зібраного кадру: memoryview на буфер або декодований base64 (JSON)."""
+        if frame.text:
+            return base64.b64decode(frame.payload())
+        return frame.payload()
+
+    def expire(self, now=None):
+        """Відкидання кадрів, старших за timeout; повертає всі відкинуті з попереднього виклику."""
+        now = time.monotonic() if now is None else now
+        expired = [frame_id for frame_id, frame in self.frames.items() if now - frame.first > self.timeout]
+        self.stats["evicted_timeout"] += len(expired)
+        evicted, self.evicted = self.evicted, []
+        return evicted + [self._remove(frame_id) for frame_id in expired]
+
+    def _enforce_budget(self, keep):
+        # Найстаріші незібрані кадри поступаються місцем новим
+        while self.buffered_bytes > self.memory_budget and len(self.frames) > 1:
+            oldest = min((frame for frame in self.frames.values() if frame.frame_id != keep),
+                         key=lambda frame: frame.first)
+            self.evicted.append(self._remove(oldest.frame_id))
+            self.stats["evicted_memory"] += 1
+
+    def _remove(self, frame_id):
+        frame = self.frames.pop(frame_id)
+        self.buffered_bytes -= frame.capacity
+        self.finished[frame_id] = (frame.total_chunks, frame.timestamp)
+        if len(self.finished) > FINISHED_HISTORY:
+            self.finished.popitem(last=False)
+        return frame
+
+    def reset(self):
+        """Нова нумерація кадрів: незібрані кадри старої віддаються як відкинуті, історія очищується."""
+        self.evicted.extend(self.frames.values())
+        self.frames = {}
+        self.finished = OrderedDict()
+        self.buffered_bytes = 0
+        self.newest = None
+        self.stats["resets"] += 1
+
+    def clear(self):
+        self.frames = {}
+        self.evicted = []
+        self.finished = OrderedDict()
+        self.buffered_bytes = 0
+        self.newest = None
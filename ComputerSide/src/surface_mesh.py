@@ -0,0 +1,129 @@
+# surface_mesh.py
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.point_store import PALETTE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GEOMETRY_MODES = ("points", "mesh", "both")
+
+
+def grid_block_mesh(depth, types, x0, y0, cell_size):
+    """Тріангуляція блоку сітки глибин.
+
+    Вершина — центр кожної заповненої комірки на середній глибині; кожен квадрат із чотирьох
+    заповнених сусідніх комірок дає два трикутники. Повертає (vertices V×3, triangles T×3, colors V×3).
+    """
+    filled = ~np.isnan(depth)
+    rows, columns = np.nonzero(filled)
+    index = np.full(depth.shape, -1, dtype=np.int64)
+    index[rows, columns] = np.arange(len(rows))
+    vertices = np.column_stack([x0 + (columns + 0.5) * cell_size, y0 + (rows + 0.5) * cell_size,
+                                depth[rows, columns]])
+    colors = PALETTE[types[rows, columns]]
+
+    a, b = index[:-1, :-1], index[:-1, 1:]
+    c, d = index[1:, :-1], index[1:, 1:]
+    quads = (a >= 0) & (b >= 0) & (c >= 0) & (d >= 0)
+    a, b, c, d = a[quads], b[quads], c[quads], d[quads]
+    triangles = np.concatenate([np.column_stack([a, b, d]), np.column_stack([a, d, c])]).astype(np.int32)
+    return vertices, triangles, colors
+
+
+def _build_blocks(blocks, cell_size):
+    """Задача робочого процесу: меші для списку блоків [(key, depth, types, x0, y0)]."""
+    return [(key, grid_block_mesh(depth, types, x0, y0, cell_size)) for key, depth, types, x0, y0 in blocks]
+
+
+class SurfaceMesher:
+    """Фонова побудова поверхні за сіткою глибин DepthGrid в окремому процесі.
+
+    Перебудовуються лише блоки сітки, у які потрапили нові точки; готові меші блоків
+    кешуються, а поверхня збирається з них після завершення чергової побудови.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.future = None
+        self.submitted_at = 0.0
+        self.generation = None
+        self.pending = []  # Блоки поточної побудови; при збої вони повертаються в чергу
+        self.blocks = {}  # ключ блоку -> (vertices, triangles, colors)
+        self.stats = {"builds": 0, "blocks_built": 0, "last_build_ms": 0.0, "max_build_ms": 0.0}
+
+    @property
+    def busy(self):
+        return self.future is not None
+
+    def submit(self, grid):
+        """Постановка змінених блоків сітки на побудову; False, якщо будувати нічого або побудова вже йде."""
+        if self.busy:
+            return False
+        if grid.generation != self.generation:
+            # Сітку перебудовано з нуля (нова карта або інший набір тайлів) — кеш блоків застарів
+            self.blocks = {}
+            self.pending = []
+            self.generation = grid.generation
+        keys = sorted(set(grid.take_dirty_blocks()) | set(self.pending))
+        if not keys:
+            return False
+        blocks = [(key,) + grid.block_arrays(key) for key in keys]
+        if self.executor is None:
+            # spawn: GUI-процес багатопотоковий, fork з Qt небезпечний
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.pending = keys
+        self.submitted_at = time.perf_counter()
+        self.future = self.executor.submit(_build_blocks, blocks, grid.cell_size)
+        return True
+
+    def poll(self):
+        """Меш усієї поверхні (vertices, triangles, colors), якщо побудова щойно завершилась, інакше None."""
+        if self.future is None or not self.future.done():
+            return None
+        future, self.future = self.future, None
+        try:
+            results = future.result()
+        except Exception as e:
+            logger.error("Surface mesh build failed: %s", e)
+            # Пул міг зламатися (робочий процес завершився) — наступна побудова створить новий
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            return None
+        self.pending = []
+        for key, mesh in results:
+            if len(mesh[1]):
+                self.blocks[key] = mesh
+            else:
+                self.blocks.pop(key, None)
+        elapsed_ms = (time.perf_counter() - self.submitted_at) * 1000
+        self.stats["builds"] += 1
+        self.stats["blocks_built"] += len(results)
+        self.stats["last_build_ms"] = elapsed_ms
+        self.stats["max_build_ms"] = max(self.stats["max_build_ms"], elapsed_ms)
+        mesh = self.combine()
+        logger.info("Surface mesh: rebuilt %d blocks in %.1f ms, %d vertices, %d triangles",
+                    len(results), elapsed_ms, len(mesh[0]), len(mesh[1]))
+        return mesh
+
+    def combine(self):
+        """Об'єднання мешів блоків в один."""
+        meshes = list(self.blocks.values())
+        if not meshes:
+            return np.empty((0, 3)), np.empty((0, 3), dtype=np.int32), np.empty((0, 3))
+        offsets = np.cumsum([0] + [len(v) for v, _, _ in meshes[:-1]])
+        vertices = np.concatenate([v for v, _, _ in meshes])
+        triangles = np.concatenate([t + offset for (_, t, _), offset in zip(meshes, offsets)]).astype(np.int32)
+        colors = np.concatenate([c for _, _, c in meshes])
+        return vertices, triangles, colors
+
+    def close(self):
+        """Зупинка робочого процесу."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.future = None
+        logger.info("Surface mesher stats: %s", self.stats)
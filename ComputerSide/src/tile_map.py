@@ -0,0 +1,314 @@
+# tile_map.py
+# Тайлова карта (каталог *.tiles) для зйомок, що не вміщаються в пам'ять.
+#
+# Площина XY розбита на квадратні тайли tile_size × tile_size метрів; кожен тайл — окремий
+# файл .udmap (tile_<tx>_<ty>.udmap), нові точки дописуються в нього чанками; тайл, у якому
+# набралося понад max_chunks чанків, ущільнюється в один (з voxel_size — ще й по вокселях).
+# index.json зберігає розмір тайла та кількість точок у кожному тайлі.
+# Тайли навколо дрона підвантажує фоновий потік і віддає споживачу готовими масивами (take_loaded).
+#
+# Імпорт: python -m src.tile_map import terrain_map.udmap terrain_map.tiles [tile_size]
+import json
+import os
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src import map_format
+from src.point_store import encode_object_types
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EXTENSION = ".tiles"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+DEFAULT_TILE_SIZE = 50.0
+# Кожне скидання MapWriter додає в тайл чанк, а read_chunks відкриває по два memmap на чанк
+MAX_TILE_CHUNKS = 16
+
+
+def is_tiled_map(path):
+    return path.rstrip("/\\").endswith(EXTENSION)
+
+
+def tile_keys(points, tile_size):
+    """Цілочисельні координати тайлів (N×2) для точок."""
+    return np.floor(np.asarray(points)[:, :2] / tile_size).astype(np.int64)
+
+
+def split_by_tile(points, codes, tile_size):
+    """Розбиття точок за тайлами: {(tx, ty): (points, codes)}."""
+    if len(points) == 0:
+        return {}
+    keys = tile_keys(points, tile_size)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(unique) + 1))
+    return {(int(tx), int(ty)): (points[order[a:b]], codes[order[a:b]])
+            for (tx, ty), a, b in zip(unique, bounds[:-1], bounds[1:])}
+
+
+class TiledMap:
+    """Карта з тайлів на диску з LRU-кешем тайлів навколо точки фокусу (позиції дрона).
+
+    Фоновий потік читає тайли в радіусі radius тайлів від фокусу (найближчі першими), ущільнюючи
+    їх на диску, і складає прочитані масиви в чергу для take_loaded(); у кеші лише ключі вже
+    відданих тайлів, найдавніше використані забуваються, коли їх більше cache_tiles.
+    version збільшується один раз за прохід, що змінив набір тайлів.
+    """
+
+    def __init__(self, root, tile_size=DEFAULT_TILE_SIZE, cache_tiles=64, radius=2, voxel_size=None,
+                 max_chunks=MAX_TILE_CHUNKS):
+        self.root = root
+        self.tile_size = tile_size
+        self.cache_tiles = max(cache_tiles, (2 * radius + 1) ** 2)
+        self.radius = radius
+        self.voxel_size = voxel_size
+        self.max_chunks = max_chunks
+        self.cond = threading.Condition()
+        self.io_lock = threading.Lock()  # Запис і читання файлів тайлів не перетинаються
+        self.counts = {}  # (tx, ty) -> кількість точок у файлі тайла
+        self.chunks = {}  # (tx, ty) -> кількість чанків у файлі тайла (відомі лише для вже відкритих)
+        self.cache = OrderedDict()  # (tx, ty) відданих тайлів -> None, від давніх до свіжих
+        self.loaded = []  # [(key, points, codes, hits, votes)] прочитані, ще не забрані take_loaded()
+        self.focus_key = None
+        self.version = 0
+        self.stats = {"loaded": 0, "evicted": 0, "compacted": 0, "last_load_ms": 0.0, "max_load_ms": 0.0}
+        self.running = False
+        self.thread = None
+        self._open_index()
+
+    def __len__(self):
+        with self.cond:
+            return sum(self.counts.values())
+
+    def _open_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, INDEX_NAME)
+        if not os.path.exists(path):
+            self.save_index()
+            return
+        with open(path) as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path}: unsupported tile index version {index.get('version')}")
+        self.tile_size = float(index["tile_size"])
+        self.counts = {tuple(int(v) for v in key.split("_")): count for key, count in index["tiles"].items()}
+        logger.info("Opened tiled map %s: %d tiles, %d points", self.root, len(self.counts), sum(self.counts.values()))
+
+    def save_index(self):
+        """Атомарний запис index.json."""
+        with self.cond:
+            tiles = {f"{tx}_{ty}": count for (tx, ty), count in sorted(self.counts.items())}
+        path = os.path.join(self.root, INDEX_NAME)
+        with self.io_lock:
+            with open(path + ".tmp", 'w') as f:
+                json.dump({"version": INDEX_VERSION, "tile_size": self.tile_size, "tiles": tiles}, f)
+            os.replace(path + ".tmp", path)
+
+    def tile_path(self, key):
+        return os.path.join(self.root, f"tile_{key[0]}_{key[1]}{map_format.EXTENSION}")
+
+    def append(self, points, codes, fsync=False):
+        """Дозапис точок у файли тайлів (по чанку на тайл).
+
+        Новий тайл одразу вважається відданим: усі його точки прийшли від споживача.
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        codes = np.asarray(codes, dtype=np.uint8).reshape(-1)
+        tiles = split_by_tile(points, codes, self.tile_size)
+        for key, (tile_points, tile_codes) in tiles.items():
+            with self.io_lock:
+                path = self.tile_path(key)
+                created = not os.path.exists(path)
+                if key not in self.chunks:
+                    self.chunks[key] = 0 if created else len(map_format.read_chunks(path))
+                with open(path, 'ab') as f:
+                    if f.tell() == 0:
+                        map_format.write_header(f)
+                    map_format.write_chunk(f, tile_points, tile_codes)
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                self.chunks[key] += 1
+                count = self._compact_tile(key) if self.chunks[key] > self.max_chunks else None
+                with self.cond:
+                    self.counts[key] = count if count is not None else self.counts.get(key, 0) + len(tile_points)
+                    if created:
+                        self.cache[key] = None
+        if tiles:
+            self.save_index()
+
+    def _compact_tile(self, key):
+        """Злиття чанків файлу тайла (виклик під io_lock); повертає нову кількість точок у тайлі або None."""
+        start = time.perf_counter()
+        path = self.tile_path(key)
+        try:
+            before = map_format.compact(path, self.voxel_size)
+            chunks = map_format.read_chunks(path)
+        except (OSError, ValueError) as e:
+            logger.error("Error compacting tile %s: %s", key, e)
+            return None
+        self.chunks[key] = len(chunks)
+        count = sum(len(points) for points, _ in chunks)
+        if before > 1:
+            with self.cond:
+                self.stats["compacted"] += 1
+        logger.debug("Compacted tile %s: %d points in %.1f ms", key, count, (time.perf_counter() - start) * 1000)
+        return count
+
+    def focus(self, position, block=False):
+        """Зміщення фокусу кешу; block=True — завантажити потрібні тайли в поточному потоці."""
+        key = tuple(int(v) for v in tile_keys(np.asarray(position, dtype=np.float64).reshape(1, 3),
+                                              self.tile_size)[0])
+        with self.cond:
+            changed = key != self.focus_key
+            self.focus_key = key
+            if changed:
+                self.cond.notify()
+        if block:
+            self._refresh()
+
+    def wanted(self, center):
+        """Наявні тайли в радіусі від центру, від найближчих до найдальших."""
+        cx, cy = center
+        keys = [(cx + dx, cy + dy) for dx in range(-self.radius, self.radius + 1)
+                for dy in range(-self.radius, self.radius + 1)]
+        keys = [key for key in keys if key in self.counts]
+        return sorted(keys, key=lambda key: (key[0] - cx) ** 2 + (key[1] - cy) ** 2)
+
+    def take_loaded(self):
+        """Прочитані з попереднього виклику тайли: [(key, points, codes, hits, votes)].
+
+        hits і votes — None, якщо тайли не ущільнюються по вокселях.
+        """
+        with self.cond:
+            loaded, self.loaded = self.loaded, []
+        return loaded
+
+    def drop_cache(self):
+        """Забути віддані тайли (наприклад, перед повторним завантаженням карти)."""
+        with self.cond:
+            self.cache.clear()
+            self.loaded = []
+
+    def start(self):
+        """Запуск потоку підвантаження тайлів."""
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="TileLoader", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Зупинка потоку та збереження індексу."""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.save_index()
+        logger.info("Tiled map closed: %s", self.stats)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                focus_key = self.focus_key
+                while self.running and self.focus_key == focus_key:
+                    self.cond.wait(1.0)
+                    if self.focus_key is not None and not all(key in self.cache for key in self.wanted(self.focus_key)):
+                        break
+                if not self.running:
+                    return
+            self._refresh()
+
+    def _refresh(self):
+        with self.cond:
+            if self.focus_key is None:
+                return
+            wanted = self.wanted(self.focus_key)
+            for key in wanted:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+            missing = [key for key in wanted if key not in self.cache]
+
+        loaded = 0
+        for key in missing:
+            with self.cond:
+                if key in self.cache:
+                    continue
+            start = time.perf_counter()
+            try:
+                with self.io_lock:
+                    # Один чанк на тайл: одне читання замість злиття багатьох memmap
+                    self._compact_tile(key)
+                    tile = self._read_tile(key)
+            except (OSError, ValueError) as e:
+                logger.error("Error loading tile %s: %s", key, e)
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.cond:
+                # Тайл міг уже віддати інший потік (focus(block=True) паралельно з фоновим)
+                if key in self.cache:
+                    continue
+                self.counts[key] = len(tile[0])
+                self.cache[key] = None
+                self.loaded.append((key,) + tile)
+                loaded += 1
+                self.stats["loaded"] += 1
+                self.stats["last_load_ms"] = elapsed_ms
+                self.stats["max_load_ms"] = max(self.stats["max_load_ms"], elapsed_ms)
+            logger.debug("Loaded tile %s: %d points in %.1f ms", key, len(tile[0]), elapsed_ms)
+
+        with self.cond:
+            evicted = 0
+            while len(self.cache) > self.cache_tiles:
+                key, _ = self.cache.popitem(last=False)
+                evicted += 1
+                logger.debug("Evicted tile %s", key)
+            self.stats["evicted"] += evicted
+            if loaded or evicted:
+                self.version += 1
+
+    def _read_tile(self, key):
+        """(points, codes, hits, votes) тайла копіями в пам'яті (виклик під io_lock)."""
+        path = self.tile_path(key)
+        if self.voxel_size:
+            return map_format.load_weighted(path)
+        points, codes = map_format.load(path)
+        return np.array(points), np.array(codes), None, None
+
+
+def import_map(source, root, tile_size=DEFAULT_TILE_SIZE, chunk_rows=1000000):
+    """Імпорт карти (.udmap або terrain_map.csv) у тайлову карту без завантаження її цілком."""
+    tiles = TiledMap(root, tile_size)
+    total = 0
+    if map_format.is_binary_map(source):
+        for points, codes in map_format.read_chunks(source):
+            for start in range(0, len(points), chunk_rows):
+                tiles.append(points[start:start + chunk_rows], codes[start:start + chunk_rows])
+                total += len(points[start:start + chunk_rows])
+    else:
+        for df in pd.read_csv(source, chunksize=chunk_rows):
+            df = df.dropna()
+            tiles.append(df[["x", "y", "depth"]].to_numpy(dtype=np.float32),
+                         encode_object_types(df["object_type"].to_numpy()))
+            total += len(df)
+    tiles.close()
+    return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (4, 5) or sys.argv[1] != "import":
+        print("Usage: python -m src.tile_map import <source.udmap|source.csv> <destination.tiles> [tile_size]")
+        sys.exit(1)
+    source, destination = sys.argv[2:4]
+    size = float(sys.argv[4]) if len(sys.argv) == 5 else DEFAULT_TILE_SIZE
+    count = import_map(source, destination, size)
+    print(f"Imported {count} points: {source} -> {destination}")
@@ -1,9 +1,12 @@
 import numpy as np
 
 def quaternion_to_rotation_matrix(q):
-    q0, q1, q2, q3 = q
-    return np.array([
-        [1 - 2*q2**2 - 2*q3**2, 2*q1*q2 - 2*q0*q3, 2*q1*q3 + 2*q0*q2],
-        [2*q1*q2 + 2*q0*q3, 1 - 2*q1**2 - 2*q3**2, 2*q2*q3 - 2*q0*q1],
-        [2*q1*q3 - 2*q0*q2, 2*q2*q3 + 2*q0*q1, 1 - 2*q1**2 - 2*q2**2]
-    ])
+    """Матриця повороту (3×3) для кватерніона [q0, q1, q2, q3] або пачка матриць (N×3×3) для масиву N×4."""
+    q = np.asarray(q, dtype=np.float64)
+    q0, q1, q2, q3 = np.moveaxis(q, -1, 0)
+    R = np.stack([
+        1 - 2*q2**2 - 2*q3**2, 2*q1*q2 - 2*q0*q3, 2*q1*q3 + 2*q0*q2,
+        2*q1*q2 + 2*q0*q3, 1 - 2*q1**2 - 2*q3**2, 2*q2*q3 - 2*q0*q1,
+        2*q1*q3 - 2*q0*q2, 2*q2*q3 + 2*q0*q1, 1 - 2*q1**2 - 2*q2**2
+    ], axis=-1)
+    return R.reshape(q.shape[:-1] + (3, 3))
@@ -1,23 +1,63 @@
 # visualization.py
+import time
 import numpy as np
 import open3d as o3d
 from PyQt5 import QtGui, QtCore
 import logging
+from src.point_store import EMPTY_CODE
+from src.lod import LevelOfDetail
+from src.surface_mesh import GEOMETRY_MODES
+from src.metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+AXES_LINES = [[0, 1], [0, 2], [0, 3]]
+AXES_COLORS = [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+
 class Visualization:
-    def __init__(self, parent):
+    def __init__(self, parent, max_fps=30):
         self.parent = parent
         self.vis = None
         self.pcd = o3d.geometry.PointCloud()
         self.axes = o3d.geometry.LineSet()
+        self.mesh = o3d.geometry.TriangleMesh()
+        self.geometry_mode = "points"  # points / mesh / both
         self.vis_initialized = False
         self.camera_params = None
         self.zoom_factor = 1.0
         self.last_points_count = 0
         self.force_update = False  # Для примусового оновлення при зміні камери
+        # Планувальник рендерингу: зміни сцени лише позначають її «брудною»,
+        # а кадр рендериться не частіше ніж max_fps разів на секунду
+        self.dirty = False
+        self.frame_interval = 1.0 / max_fps
+        self.last_render_time = 0.0
+        self.render_timer = QtCore.QTimer()
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self.render_frame)
+        self.axis_extent = np.ones(3)
+        # Рівні деталізації: під час обертання/масштабування рендериться проріджена хмара
+        self.lod = LevelOfDetail()
+        self.cloud_points = None
+        self.cloud_colors = None
+        # Сховище, хмара з якого ще не перенесена в pcd (перебудова відкладається до кадру)
+        self.cloud_source = None
+        # (first_id, next_id) точок сховища, що лежать у pcd повною хмарою; None — у pcd інші дані
+        self.pcd_ids = None
+        self.interacting = False
+        self.refine_timer = QtCore.QTimer()
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(250)
+        self.refine_timer.timeout.connect(self.refine)
+        # Буфери захоплення кадру, що перевикористовуються між кадрами
+        self.capture_scratch = None
+        self.capture_rgb = None
+        self.capture_image = None
+        self.metrics = {stage: REGISTRY.histogram(f"render.{stage}_us") for stage in ("render", "capture", "present")}
+        self.metrics["frames"] = REGISTRY.counter("render.frames")
+        self.render_stats = {"frames": 0, "requests": 0, "last_render_ms": 0.0, "last_capture_ms": 0.0, "last_present_ms": 0.0,
+                             "total_render_ms": 0.0, "total_capture_ms": 0.0, "total_present_ms": 0.0}
 
     def init_open3d(self):
         """Ініціалізація Open3D візуалізатора."""
@@ -30,21 +70,13 @@ class Visualization:
             center = np.array([0, 0, 0])
             if len(self.pcd.points) == 0:
                 logger.warning("Point cloud is empty, initializing with default point")
-                self.parent.points = [np.array([0.0, 0.0, 0.0])]
-                self.parent.object_types = ["empty"]
-                self.pcd.points = o3d.utility.Vector3dVector(np.array(self.parent.points))
+                self.parent.point_store.append([0.0, 0.0, 0.0], [EMPTY_CODE])
+                self.pcd.points = o3d.utility.Vector3dVector(self.parent.point_store.points)
                 colors = np.zeros((1, 3))
                 colors[:, 0] = 1.0
                 self.pcd.colors = o3d.utility.Vector3dVector(colors)
-            self.axes.points = o3d.utility.Vector3dVector([
-                [0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]
-            ])
-            self.axes.lines = o3d.utility.Vector2iVector([
-                [0, 1], [0, 2], [0, 3]
-            ])
-            self.axes.colors = o3d.utility.Vector3dVector([
-                [1, 0, 0], [0, 1, 0], [0, 0, 1]
-            ])
+            if len(self.axes.points) == 0:
+                self.reset_axes()
             view_control.set_lookat(center)
             view_control.set_front([0, 0, -1])
             view_control.set_up([0, -1, 0])
@@ -57,14 +89,174 @@ class Visualization:
                 [0, 0, 0, 1]
             ])
             view_control.convert_from_pinhole_camera_parameters(self.camera_params)
-            logger.info(f"Initialized camera: front=[0, 0, -1], up=[0, -1, 0], lookat={center}, zoom={self.zoom_factor}, extrinsic={self.camera_params.extrinsic}")
+            logger.info("Initialized camera: front=[0, 0, -1], up=[0, -1, 0], lookat=%s, zoom=%s, extrinsic=%s",
+                        center, self.zoom_factor, self.camera_params.extrinsic)
         self.vis.clear_geometries()
-        self.vis.add_geometry(self.pcd)
-        self.vis.add_geometry(self.axes)
+        for geometry in self.scene_geometries():
+            self.vis.add_geometry(geometry)
         self.vis_initialized = True
-        self.vis.poll_events()
-        self.vis.update_renderer()
-        self.update_open3d_image(self.parent.sonar_label if self.parent.display_mode == "sonar" else self.parent.both_sonar_label)
+        self.request_render()
+
+    def scene_geometries(self):
+        """Геометрії сцени для поточного режиму (точки, поверхня або обидва) разом з осями."""
+        geometries = []
+        if self.geometry_mode in ("points", "both"):
+            geometries.append(self.pcd)
+        if self.geometry_mode in ("mesh", "both"):
+            geometries.append(self.mesh)
+        return geometries + [self.axes]
+
+    def set_geometry_mode(self, mode):
+        """Перемикання між хмарою точок, поверхнею та обома."""
+        mode = mode.lower()
+        if mode not in GEOMETRY_MODES:
+            raise ValueError(f"Unknown geometry mode: {mode}, expected one of {GEOMETRY_MODES}")
+        if mode == self.geometry_mode:
+            return
+        self.geometry_mode = mode
+        logger.info("Geometry mode: %s", mode)
+        if self.vis and self.vis_initialized:
+            self.vis.clear_geometries()
+            for geometry in self.scene_geometries():
+                self.vis.add_geometry(geometry, reset_bounding_box=False)
+        self.request_render(force=True)
+
+    def set_mesh(self, vertices, triangles, colors):
+        """Заміна поверхні готовим мешем: новий TriangleMesh підставляється у сцену за один крок."""
+        mesh = o3d.geometry.TriangleMesh()
+        mesh.vertices = o3d.utility.Vector3dVector(vertices)
+        mesh.triangles = o3d.utility.Vector3iVector(triangles)
+        mesh.vertex_colors = o3d.utility.Vector3dVector(colors)
+        mesh.compute_vertex_normals()
+        old, self.mesh = self.mesh, mesh
+        if self.vis and self.vis_initialized and self.geometry_mode in ("mesh", "both"):
+            self.vis.remove_geometry(old, reset_bounding_box=False)
+            self.vis.add_geometry(mesh, reset_bounding_box=False)
+        self.request_render()
+
+    def set_cloud(self, points, colors):
+        """Нова повна хмара точок (view сховища); на екран іде рівень деталізації за станом взаємодії."""
+        self.cloud_points = points
+        self.cloud_colors = colors
+        self.lod.update(points, colors)
+        self.apply_lod()
+
+    def invalidate_cloud(self, store):
+        """Позначення хмари застарілою: pcd і рівні деталізації перебудуються один раз у найближчому кадрі."""
+        self.cloud_source = store
+        self.request_render()
+
+    def sync_cloud(self, store):
+        """Перенесення змін сховища в pcd: злиті точки оновлюються на місці, нові дописуються в кінець.
+
+        Повна перебудова — лише коли pcd не тримає повну хмару сховища (рівень деталізації, інше
+        джерело), сховище відкинуло найстаріші точки або змінених точок надто багато.
+        """
+        modified = store.take_modified()
+        synced = self.pcd_ids
+        if (synced is None or synced[0] != store.first_id or modified is None or self.interacting
+                or len(self.pcd.points) != synced[1] - synced[0]):
+            self.set_cloud(store.points, store.colors)
+            if not self.interacting:
+                self.pcd_ids = (store.first_id, store.next_id)
+            return
+        points, colors = store.points, store.colors
+        self.cloud_points, self.cloud_colors = points, colors
+        self.lod.update(points, colors)
+        rows = modified[modified < synced[1]] - store.first_id
+        if len(rows):
+            np.asarray(self.pcd.points)[rows] = points[rows]
+            np.asarray(self.pcd.colors)[rows] = colors[rows]
+        tail = slice(synced[1] - store.first_id, len(points))
+        if tail.start < tail.stop:
+            self.pcd.points.extend(o3d.utility.Vector3dVector(points[tail]))
+            self.pcd.colors.extend(o3d.utility.Vector3dVector(colors[tail]))
+        self.pcd_ids = (store.first_id, store.next_id)
+        if len(rows) or tail.start < tail.stop:
+            if self.vis and self.vis_initialized:
+                self.vis.update_geometry(self.pcd)
+            self.request_render()
+
+    def apply_lod(self):
+        """Заповнення pcd повною хмарою або прорідженим рівнем під час взаємодії."""
+        if self.cloud_points is None:
+            return
+        level = self.lod.select(self.zoom_factor) if self.interacting else None
+        points, colors = level if level is not None else (self.cloud_points, self.cloud_colors)
+        self.pcd_ids = None
+        self.pcd.points = o3d.utility.Vector3dVector(points)
+        self.pcd.colors = o3d.utility.Vector3dVector(colors)
+        if self.vis and self.vis_initialized:
+            self.vis.update_geometry(self.pcd)
+        self.request_render()
+
+    def reset_axes(self, extent=None):
+        """Перебудова осей координат під заданий розмір (за замовчуванням 1 м)."""
+        self.axis_extent = np.ones(3) if extent is None else np.maximum(extent, 1.0)
+        x, y, z = self.axis_extent
+        self.axes.points = o3d.utility.Vector3dVector([[0, 0, 0], [x, 0, 0], [0, y, 0], [0, 0, z]])
+        self.axes.lines = o3d.utility.Vector2iVector(AXES_LINES)
+        self.axes.colors = o3d.utility.Vector3dVector(AXES_COLORS)
+        logger.debug("Axis lengths: X=%s, Y=%s, Z=%s", x, y, z)
+        if self.vis and self.vis_initialized:
+            self.vis.update_geometry(self.axes)
+        self.request_render()
+
+    def grow_axes(self, points, margin=1.1):
+        """Подовження осей, лише якщо нові точки вийшли за поточні межі."""
+        if len(points) == 0:
+            return
+        extent = np.max(np.abs(points), axis=0) * margin
+        if np.any(extent > self.axis_extent):
+            self.reset_axes(np.maximum(extent, self.axis_extent))
+
+    def sonar_label(self):
+        """Мітка, в яку виводиться 3D-сцена у поточному режимі, або None."""
+        if self.parent.display_mode == "sonar":
+            return self.parent.sonar_label
+        if self.parent.display_mode == "both":
+            return self.parent.both_sonar_label
+        return None
+
+    def request_render(self, force=False):
+        """Позначення сцени зміненою; кілька запитів між кадрами зливаються в один рендер."""
+        self.dirty = True
+        self.force_update = self.force_update or force
+        self.render_stats["requests"] += 1
+        if not self.vis_initialized or self.render_timer.isActive():
+            return
+        delay = self.last_render_time + self.frame_interval - time.monotonic()
+        self.render_timer.start(max(0, int(delay * 1000)))
+
+    def render_frame(self):
+        """Рендер кадру за таймером планувальника."""
+        label = self.sonar_label()
+        if label is None or not self.vis_initialized:
+            return
+        self.last_render_time = time.monotonic()
+        if self.cloud_source is not None:
+            store, self.cloud_source = self.cloud_source, None
+            self.sync_cloud(store)
+        self.update_open3d_image(label)
+
+    def begin_interaction(self):
+        """Початок обертання/масштабування: перехід на грубий рівень деталізації."""
+        self.refine_timer.stop()
+        if not self.interacting:
+            self.interacting = True
+            self.apply_lod()
+
+    def end_interaction(self):
+        """Кінець взаємодії: повна деталізація після короткої паузи."""
+        self.refine_timer.start()
+
+    def refine(self):
+        """Повернення до повної хмари точок після завершення взаємодії."""
+        if not self.interacting:
+            return
+        self.interacting = False
+        self.apply_lod()
+        self.request_render(force=True)
 
     def update_open3d_image(self, label):
         """Оновлення зображення Open3D."""
@@ -76,8 +268,8 @@ class Visualization:
             logger.warning("No points to display")
             label.setText("No points to display")
             return
-        # Оновлюємо, якщо змінилася кількість точок або потрібне примусове оновлення (наприклад, зміна камери)
-        if self.last_points_count != len(self.pcd.points) or self.force_update:
+        # Оновлюємо, якщо сцена змінилася або потрібне примусове оновлення (наприклад, зміна камери)
+        if self.dirty or self.last_points_count != len(self.pcd.points) or self.force_update:
             view_control = self.vis.get_view_control()
             center = np.array([0, 0, 0])
             view_control.set_lookat(center)
@@ -85,9 +277,10 @@ class Visualization:
             if self.camera_params is not None:
                 try:
                     view_control.convert_from_pinhole_camera_parameters(self.camera_params)
-                    logger.debug(f"Camera: extrinsic={self.camera_params.extrinsic}, zoom_factor={self.zoom_factor}, lookat={center}")
+                    logger.debug("Camera: extrinsic=%s, zoom_factor=%s, lookat=%s",
+                                 self.camera_params.extrinsic, self.zoom_factor, center)
                 except Exception as e:
-                    logger.error(f"Camera params error: {e}, resetting")
+                    logger.error("Camera params error: %s, resetting", e)
                     view_control.set_lookat(center)
                     view_control.set_front([0, 0, -1])
                     view_control.set_up([0, -1, 0])
@@ -100,7 +293,8 @@ class Visualization:
                         [0, 0, 0, 1]
                     ])
                     view_control.convert_from_pinhole_camera_parameters(self.camera_params)
-                    logger.info(f"Reset camera: extrinsic={self.camera_params.extrinsic}, lookat={center}, zoom={self.zoom_factor}")
+                    logger.info("Reset camera: extrinsic=%s, lookat=%s, zoom=%s",
+                                self.camera_params.extrinsic, center, self.zoom_factor)
             else:
                 view_control.set_lookat(center)
                 view_control.set_front([0, 0, -1])
@@ -114,25 +308,73 @@ class Visualization:
                     [0, 0, 0, 1]
                 ])
                 view_control.convert_from_pinhole_camera_parameters(self.camera_params)
-                logger.info(f"Initialized camera_params: extrinsic={self.camera_params.extrinsic}, lookat={center}, zoom={self.zoom_factor}")
+                logger.info("Initialized camera_params: extrinsic=%s, lookat=%s, zoom=%s",
+                            self.camera_params.extrinsic, center, self.zoom_factor)
+            start = time.perf_counter()
             self.vis.poll_events()
             self.vis.update_renderer()
-            self.vis.capture_screen_image(self.parent.temp_image_path)
-            pixmap = QtGui.QPixmap(self.parent.temp_image_path)
-            scaled_pixmap = pixmap.scaled(label.size(), QtCore.Qt.KeepAspectRatio)
-            logger.debug(f"Pixmap size: {scaled_pixmap.size().width()}x{scaled_pixmap.size().height()}")
+            rendered = time.perf_counter()
+            image = self.capture_qimage()
+            captured = time.perf_counter()
+            scaled_pixmap = QtGui.QPixmap.fromImage(image).scaled(label.size(), QtCore.Qt.KeepAspectRatio)
+            logger.debug("Pixmap size: %dx%d", scaled_pixmap.size().width(), scaled_pixmap.size().height())
             label.setPixmap(scaled_pixmap)
+            self.record_frame_timing(start, rendered, captured, time.perf_counter())
             self.last_points_count = len(self.pcd.points)
             self.force_update = False  # Скидаємо після оновлення
+            self.dirty = False
+
+    def capture_qimage(self):
+        """Захоплення відрендереного кадру в QImage без проміжного PNG-файлу.
+
+        Float-буфер Open3D (H×W×3, 0..1) масштабується в перевикористовуваний uint8-буфер;
+        QImage посилається на цей буфер без копіювання.
+        """
+        frame = np.asarray(self.vis.capture_screen_float_buffer(do_render=False))
+        if self.capture_rgb is None or self.capture_rgb.shape != frame.shape:
+            self.capture_scratch = np.empty(frame.shape, dtype=np.float32)
+            self.capture_rgb = np.empty(frame.shape, dtype=np.uint8)
+            height, width, channels = frame.shape
+            self.capture_image = QtGui.QImage(self.capture_rgb.data, width, height, width * channels,
+                                              QtGui.QImage.Format_RGB888)
+            logger.info("Allocated render capture buffer %dx%d", width, height)
+        np.multiply(frame, 255.0, out=self.capture_scratch)
+        np.copyto(self.capture_rgb, self.capture_scratch, casting='unsafe')
+        return self.capture_image
+
+    def record_frame_timing(self, start, rendered, captured, presented):
+        """Облік часу рендерингу, захоплення та виводу кадру."""
+        stats = self.render_stats
+        timings = {"render": rendered - start, "capture": captured - rendered, "present": presented - captured}
+        for stage, seconds in timings.items():
+            stats[f"last_{stage}_ms"] = seconds * 1000
+            stats[f"total_{stage}_ms"] += seconds * 1000
+        stats["frames"] += 1
+        for stage, seconds in timings.items():
+            self.metrics[stage].record_seconds(seconds)
+        self.metrics["frames"].inc()
+        logger.debug("Frame %d: render %.1f ms, capture %.1f ms, present %.1f ms", stats["frames"],
+                     stats["last_render_ms"], stats["last_capture_ms"], stats["last_present_ms"])
+
+    def frame_metrics(self):
+        """Середній час етапів кадру (мс)."""
+        stats = dict(self.render_stats)
+        frames = stats["frames"]
+        for stage in ("render", "capture", "present"):
+            stats[f"mean_{stage}_ms"] = stats.pop(f"total_{stage}_ms") / frames if frames else 0.0
+        return stats
 
     def cleanup(self):
         """Очищення ресурсів візуалізатора."""
+        self.refine_timer.stop()
+        self.render_timer.stop()
+        logger.info("Sonar render timing: %s", self.frame_metrics())
         if hasattr(self, 'vis') and self.vis:
             try:
                 self.vis.destroy_window()
                 logger.info("Visualizer destroyed")
             except Exception as e:
-                logger.error(f"Error during visualizer cleanup: {e}")
+                logger.error("Error during visualizer cleanup: %s", e)
             self.vis = None
         self.vis_initialized = False
         self.camera_params = None
@@ -0,0 +1,141 @@
+# voxel_map.py
+import numpy as np
+from src.point_store import OBJECT_TYPES
+
+
+def voxel_keys(points, voxel_size):
+    """Цілочисельні координати вокселів (N×3, int64) для точок."""
+    return np.floor(np.asarray(points, dtype=np.float64) / voxel_size).astype(np.int64)
+
+
+def group_by_voxel(points, codes, voxel_size, hits=None, votes=None):
+    """Групування точок за вокселями; hits і votes — вага та голоси вже злитих точок.
+
+    Повертає (keys M×3, point_sums M×3, counts M, votes M×len(OBJECT_TYPES), first M), де first —
+    індекс першої точки групи у вхідному масиві (групи впорядковані за першою появою).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    codes = np.asarray(codes, dtype=np.int64).reshape(-1)
+    weights = np.ones(len(points)) if hits is None else np.asarray(hits, dtype=np.float64)
+    keys = voxel_keys(points, voxel_size)
+    if len(points) == 0:
+        empty = np.empty((0, 3))
+        return keys, empty, np.empty(0), np.empty((0, len(OBJECT_TYPES))), np.empty(0, dtype=np.int64)
+
+    # Пакуємо три координати в один int64 для швидкого np.unique
+    low = keys.min(axis=0)
+    span = keys.max(axis=0) - low + 1
+    packed = np.ravel_multi_index((keys - low).T, span)
+    _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    groups = rank[inverse.reshape(-1)]
+    count = len(first)
+
+    point_sums = np.stack([np.bincount(groups, weights=points[:, axis] * weights, minlength=count)
+                           for axis in range(3)], axis=1)
+    counts = np.bincount(groups, weights=weights, minlength=count)
+    if votes is None:
+        votes = np.bincount(groups * len(OBJECT_TYPES) + codes, weights=weights,
+                            minlength=count * len(OBJECT_TYPES)).reshape(count, len(OBJECT_TYPES))
+    else:
+        votes = np.asarray(votes, dtype=np.float64).reshape(-1, len(OBJECT_TYPES))
+        votes = np.stack([np.bincount(groups, weights=votes[:, code], minlength=count)
+                          for code in range(len(OBJECT_TYPES))], axis=1)
+    first = first[order]
+    return keys[first], point_sums, counts, votes, first
+
+
+def compact(points, codes, voxel_size, hits=None, votes=None):
+    """Пакетне ущільнення карти: одна точка на воксель із середнім положенням,
+    сумарною кількістю влучань і типом за більшістю голосів.
+
+    Повертає (points, codes, hits, votes).
+    """
+    _, point_sums, counts, votes, _ = group_by_voxel(points, codes, voxel_size, hits, votes)
+    merged = point_sums / counts[:, None] if len(counts) else point_sums
+    return (merged, np.argmax(votes, axis=1).astype(np.uint8) if len(votes) else np.empty(0, dtype=np.uint8),
+            counts.astype(np.uint32), votes.astype(np.uint32))
+
+
+class VoxelIndex:
+    """Хеш-таблиця вокселів → id точки в PointStore для онлайн-дедуплікації.
+
+    Точки, що потрапляють у зайнятий воксель, зливаються з наявною точкою
+    (середнє положення, лічильник влучань, тип за більшістю) замість додавання нової.
+    """
+
+    def __init__(self, voxel_size=0.05):
+        self.voxel_size = voxel_size
+        self.index = {}
+        self.stats = {"added": 0, "merged": 0}
+
+    def __len__(self):
+        return len(self.index)
+
+    def rebuild(self, store):
+        """Побудова індексу за поточним вмістом сховища."""
+        keys = voxel_keys(store.points, self.voxel_size)
+        ids = range(store.first_id, store.next_id)
+        self.index = dict(zip(map(tuple, keys.tolist()), ids))
+
+    def ingest(self, store, points, codes):
+        """Додавання пачки точок зі злиттям у зайняті вокселі.
+
+        Повертає (points, codes) точок, що потрапили в нові вокселі (для запису на диск).
+        """
+        keys, point_sums, counts, votes, first = group_by_voxel(points, codes, self.voxel_size)
+        key_tuples = list(map(tuple, keys.tolist()))
+        ids = np.array([self.index.get(key, -1) for key in key_tuples], dtype=np.int64)
+        existing = store.alive(ids)
+
+        if existing.any():
+            store.merge(ids[existing], point_sums[existing], counts[existing], votes[existing])
+            self.stats["merged"] += int(counts[existing].sum())
+
+        new = ~existing
+        new_points = point_sums[new] / counts[new][:, None]
+        new_codes = np.argmax(votes[new], axis=1).astype(np.uint8)
+        if len(new_points):
+            first_new_id = store.next_id
+            store.append(new_points, new_codes, counts[new], votes[new])
+            for offset, position in enumerate(np.flatnonzero(new)):
+                self.index[key_tuples[position]] = first_new_id + offset
+            self.stats["added"] += len(new_points)
+
+        # Записи для відкинутих сховищем точок накопичуються — періодично перебудовуємо індекс
+        if len(self.index) > 2 * max(len(store), 1024):
+            self.rebuild(store)
+        return new_points, new_codes
+
+
+    def insert(self, store, points, codes, hits=None, votes=None):
+        """Додавання вже злитих точок (по одній на воксель, наприклад тайла з диска) лише у вокселі,
+        яких ще немає у сховищі; повертає кількість доданих точок."""
+        key_tuples = list(map(tuple, voxel_keys(points, self.voxel_size).tolist()))
+        ids = np.array([self.index.get(key, -1) for key in key_tuples], dtype=np.int64)
+        new = np.flatnonzero(~store.alive(ids))
+        if len(new) == 0:
+            return 0
+        first_new_id = store.next_id
+        store.append(np.asarray(points)[new], np.asarray(codes)[new],
+                     None if hits is None else np.asarray(hits)[new], None if votes is None else np.asarray(votes)[new])
+        for offset, position in enumerate(new):
+            self.index[key_tuples[position]] = first_new_id + offset
+        self.stats["added"] += len(new)
+        if len(self.index) > 2 * max(len(store), 1024):
+            self.rebuild(store)
+        return len(new)
+
+
+def voxel_representatives(points, voxel_size):
+    """Індекси по одній точці (першій) з кожного зайнятого вокселя — для проріджування."""
+    keys = voxel_keys(points, voxel_size)
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    low = keys.min(axis=0)
+    span = keys.max(axis=0) - low + 1
+    packed = np.ravel_multi_index((keys - low).T, span)
+    _, first = np.unique(packed, return_index=True)
+    return np.sort(first)
@@ -0,0 +1,85 @@
+# test_dem_grid.py
+import numpy as np
+
+from src.dem_grid import BLOCK_CELLS, SMALL_BATCH, DepthGrid
+from src.point_store import EMPTY_CODE, OBJECT_CODES, OBJECT_TYPES
+
+
+def cell(grid, x, y):
+    """(рядок, стовпець) комірки з точкою (x, y)."""
+    ix, iy = np.floor(np.array([x, y]) / grid.cell_size).astype(int) - grid.origin
+    return iy, ix
+
+
+def test_mean_min_max_per_cell():
+    grid = DepthGrid(cell_size=1.0, margin_cells=2)
+    grid.add([[0.2, 0.2, 4.0], [0.8, 0.5, 6.0], [3.5, 0.5, 2.0]], [0, 0, 1])
+    grid.add([[0.5, 0.9, 8.0]], [1])
+    row, column = cell(grid, 0.5, 0.5)
+    assert grid.count[row, column] == 3
+    assert grid.mean_depth()[row, column] == 6.0
+    assert (grid.depth_min[row, column], grid.depth_max[row, column]) == (4.0, 8.0)
+    assert grid.mean_depth()[cell(grid, 3.5, 0.5)] == 2.0
+    # Порожні комірки: NaN і тип 'empty'
+    empty = grid.count == 0
+    assert np.isnan(grid.mean_depth()[empty]).all()
+    assert (grid.dominant_type()[empty] == EMPTY_CODE).all()
+    layers = grid.layers()
+    assert layers.shape == (5,) + grid.shape
+    assert np.isnan(layers[2][empty]).all() and layers[3][row, column] == 8.0
+
+
+def test_dominant_type_is_majority_vote():
+    grid = DepthGrid(cell_size=1.0)
+    codes = [OBJECT_CODES["rock"], OBJECT_CODES["coral"], OBJECT_CODES["coral"], OBJECT_CODES["sand"]]
+    grid.add([[0.5, 0.5, 1.0]] * 4, codes)
+    assert grid.dominant_type()[cell(grid, 0.5, 0.5)] == OBJECT_CODES["coral"]
+
+
+def test_weighted_add_matches_raw_samples():
+    raw = DepthGrid(cell_size=1.0)
+    raw.add([[0.5, 0.5, 2.0]] * 3 + [[0.5, 0.5, 5.0]], [1, 1, 2, 2])
+    merged = DepthGrid(cell_size=1.0)
+    votes = np.zeros((2, len(OBJECT_TYPES)))
+    votes[0, 1], votes[0, 2], votes[1, 2] = 2, 1, 1
+    merged.add([[0.5, 0.5, 2.0], [0.5, 0.5, 5.0]], [1, 2], hits=[3, 1], votes=votes)
+    np.testing.assert_array_equal(merged.count, raw.count)
+    np.testing.assert_array_equal(merged.mean_depth(), raw.mean_depth())
+    np.testing.assert_array_equal(merged.votes, raw.votes)
+
+
+def test_grid_grows_and_keeps_existing_cells():
+    grid = DepthGrid(cell_size=0.5, margin_cells=1)
+    grid.add([[0.1, 0.1, 3.0]], [0])
+    shape = grid.shape
+    grid.add([[-40.0, 25.0, 7.0]], [1])
+    assert grid.shape[0] > shape[0] and grid.shape[1] > shape[1]
+    assert grid.mean_depth()[cell(grid, 0.1, 0.1)] == 3.0
+    assert grid.mean_depth()[cell(grid, -40.0, 25.0)] == 7.0
+    x_min, y_min, x_max, y_max = grid.bounds()
+    assert x_min <= -40.0 and y_max > 25.0 and x_max > 0.1 and y_min <= 0.1
+
+
+def test_dirty_blocks_cover_neighbours_of_block_edges():
+    grid = DepthGrid(cell_size=1.0)
+    grid.add([[0.5, 0.5, 1.0]], [0])
+    # Комірка (0, 0) — перший рядок і стовпець блоку (0, 0), вона ж шов блоків зліва та знизу
+    assert grid.take_dirty_blocks() == [(-1, -1), (-1, 0), (0, -1), (0, 0)]
+    assert grid.take_dirty_blocks() == []
+    grid.add([[10.5, 10.5, 1.0]], [0])
+    assert grid.take_dirty_blocks() == [(0, 0)]
+    # Велика пачка (через np.unique) дає ті ж блоки
+    many = np.column_stack([np.linspace(0.5, 3 * BLOCK_CELLS - 0.5, SMALL_BATCH * 4), np.full(SMALL_BATCH * 4, 10.5),
+                            np.ones(SMALL_BATCH * 4)])
+    grid.add(many, np.zeros(len(many)))
+    assert grid.take_dirty_blocks() == [(-1, 0), (0, 0), (1, 0), (2, 0)]
+
+
+def test_block_arrays_are_padded_with_nan_outside_grid():
+    grid = DepthGrid(cell_size=1.0)
+    grid.add([[2.5, 1.5, 4.0]], [OBJECT_CODES["reef"]])
+    depth, types, x0, y0 = grid.block_arrays((0, 0))
+    assert depth.shape == (BLOCK_CELLS + 1, BLOCK_CELLS + 1) and (x0, y0) == (0.0, 0.0)
+    assert depth[1, 2] == 4.0 and types[1, 2] == OBJECT_CODES["reef"]
+    assert np.isnan(depth).sum() == depth.size - 1
+    assert (types[np.isnan(depth)] == EMPTY_CODE).all()
@@ -0,0 +1,56 @@
+# test_lod.py
+import numpy as np
+
+from src.lod import LevelOfDetail
+
+
+def terrain(count, size=100.0, seed=0):
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(0, size, (count, 2)), rng.uniform(-1, 0, count)])
+    return points, rng.uniform(0, 1, (count, 3))
+
+
+def built(lod, points, colors):
+    lod.update(points, colors)
+    if lod.build_thread is not None:
+        lod.build_thread.join()
+    return lod
+
+
+def test_small_cloud_has_no_levels():
+    lod = built(LevelOfDetail(interaction_budget=1000), *terrain(500))
+    assert lod.levels == [] and lod.select() is None
+
+
+def test_levels_get_coarser_and_fit_budget():
+    points, colors = terrain(20000)
+    lod = built(LevelOfDetail(interaction_budget=2000), points, colors)
+    sizes = [len(p) for _, p, _ in lod.levels]
+    voxels = [voxel for voxel, _, _ in lod.levels]
+    assert len(sizes) >= 2
+    assert sizes == sorted(sizes, reverse=True) and sizes[0] < len(points)
+    np.testing.assert_allclose(np.diff(np.log2(voxels)), 1)
+    selected, selected_colors = lod.select()
+    assert len(selected) <= 2000 and len(selected) == len(selected_colors)
+    # Точки рівнів — підмножина вихідних разом з їхніми кольорами
+    index = {tuple(p): i for i, p in enumerate(points.tolist())}
+    rows = [index[tuple(p)] for p in selected.tolist()]
+    np.testing.assert_array_equal(colors[rows], selected_colors)
+
+
+def test_select_follows_zoom():
+    lod = built(LevelOfDetail(interaction_budget=2000), *terrain(20000))
+    near, _ = lod.select(zoom_factor=0.25)
+    far, _ = lod.select(zoom_factor=4.0)
+    assert len(near) >= len(lod.select()[0]) >= len(far)
+    assert len(far) <= 500 or far is lod.levels[-1][1]
+
+
+def test_rebuild_only_after_growth():
+    points, colors = terrain(20000)
+    lod = built(LevelOfDetail(interaction_budget=2000, rebuild_growth=0.1), points, colors)
+    levels = lod.levels
+    built(lod, points[:19000], colors[:19000])
+    assert lod.levels is levels
+    built(lod, *terrain(30000, seed=1))
+    assert lod.levels is not levels and lod.source_count == 30000
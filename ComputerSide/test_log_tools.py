@@ -0,0 +1,105 @@
+# test_log_tools.py
+# Неблокуюче логування: відкидання записів переповненої черги, обмеження частоти й зведення PacketLog.
+import sys
+import queue
+import logging
+
+from src import log_tools
+from src.log_tools import DroppingQueueHandler, PacketLog
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+
+def recording_logger(name):
+    logger = logging.getLogger(name)
+    logger.handlers = []
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    recorder = Recorder()
+    logger.addHandler(recorder)
+    return logger, recorder
+
+
+def test_full_queue_drops_and_counts_records():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    logger = logging.getLogger("test_log_tools.drop")
+    logger.handlers = [handler]
+    logger.propagate = False
+    for i in range(5):
+        logger.warning("record %d", i)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    # Запис у черзі ще не відформатований: аргументи передаються потоку запису
+    record = handler.queue.get_nowait()
+    assert record.args == (0,)
+    assert record.getMessage() == "record 0"
+
+
+def test_traceback_is_rendered_before_queueing():
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test_log_tools.exc").makeRecord(
+            "x", logging.ERROR, __file__, 0, "failed", (), sys.exc_info())
+    handler.handle(record)
+    queued = handler.queue.get_nowait()
+    assert queued.exc_info is None
+    assert "ValueError: boom" in queued.exc_text
+
+
+def test_limited_suppresses_repeats_within_interval(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(log_tools.time, "monotonic", clock)
+    logger, recorder = recording_logger("test_log_tools.limited")
+    packet_log = PacketLog(logger, per_packet=False)
+    for _ in range(4):
+        packet_log.limited("decode", 5.0, logging.WARNING, "Decode error: %s", "bad")
+    packet_log.limited("socket", 5.0, logging.WARNING, "Socket error")
+    assert recorder.lines == ["Decode error: bad", "Socket error"]
+    clock.now = 5.0
+    packet_log.limited("decode", 5.0, logging.WARNING, "Decode error: %s", "late")
+    assert recorder.lines[-1] == "Decode error: late (3 similar suppressed)"
+    clock.now = 10.0
+    packet_log.limited("decode", 5.0, logging.WARNING, "Decode error: %s", "again")
+    assert recorder.lines[-1] == "Decode error: again"
+
+
+def test_events_collapse_into_summary(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(log_tools.time, "monotonic", clock)
+    logger, recorder = recording_logger("test_log_tools.summary")
+    packet_log = PacketLog(logger, per_packet=False, summary_interval=10.0)
+    for _ in range(20):
+        packet_log.event("chunk", "Chunk %d", 1, size=100)
+    packet_log.event("nack")
+    assert recorder.lines == []
+    clock.now = 10.0
+    packet_log.event("chunk", size=100)
+    assert recorder.lines == ["Last 10.0 s: chunk 21 (2.1/s, 2100 B), nack 1 (0.1/s)"]
+    assert packet_log.counts == {}
+
+
+def test_per_packet_mode_logs_every_event(monkeypatch):
+    monkeypatch.setattr(log_tools, "PER_PACKET", False)
+    logger, recorder = recording_logger("test_log_tools.per_packet")
+    packet_log = PacketLog(logger)
+    packet_log.event("chunk", "Chunk %d", 1)
+    log_tools.set_per_packet(True)
+    packet_log.event("chunk", "Chunk %d", 2)
+    assert recorder.lines == ["Chunk 2"]
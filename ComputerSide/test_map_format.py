@@ -0,0 +1,97 @@
+# test_map_format.py
+import struct
+
+import numpy as np
+import pytest
+
+from src import map_format
+from src.point_store import OBJECT_CODES
+
+
+def sample(count, offset=0.0):
+    points = np.column_stack([np.arange(count) + offset, np.arange(count) * 0.5, -np.arange(count) * 0.25])
+    codes = np.arange(count, dtype=np.uint8) % 5
+    return points.astype(np.float32), codes
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "map.udmap")
+    points, codes = sample(7)
+    map_format.save(path, points, codes)
+    loaded_points, loaded_codes = map_format.load(path)
+    np.testing.assert_array_equal(loaded_points, points)
+    np.testing.assert_array_equal(loaded_codes, codes)
+    # Заголовок, чанк і вирівнювання 7 байт типів до 8
+    assert (tmp_path / "map.udmap").stat().st_size == (map_format.FILE_HEADER.size + map_format.CHUNK_HEADER.size
+                                                     + 7 * 12 + 8)
+
+
+def test_appended_chunks_load_in_order_and_compact(tmp_path):
+    path = str(tmp_path / "map.udmap")
+    map_format.create(path)
+    batches = [sample(count, offset) for count, offset in ((3, 0), (0, 0), (5, 100), (1, 200))]
+    with open(path, 'ab') as f:
+        for points, codes in batches:
+            map_format.write_chunk(f, points, codes)
+    # Порожній чанк не повертається
+    assert len(map_format.read_chunks(path)) == 3
+    expected_points = np.concatenate([p for p, _ in batches])
+    expected_codes = np.concatenate([c for _, c in batches])
+    assert map_format.compact(path) == 3
+    assert len(map_format.read_chunks(path)) == 1
+    points, codes = map_format.load(path)
+    np.testing.assert_array_equal(points, expected_points)
+    np.testing.assert_array_equal(codes, expected_codes)
+
+
+def test_truncated_last_chunk_is_ignored(tmp_path):
+    path = tmp_path / "map.udmap"
+    map_format.create(str(path))
+    with open(path, 'ab') as f:
+        map_format.write_chunk(f, *sample(4))
+        map_format.write_chunk(f, *sample(4, 10))
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    points, _ = map_format.load(str(path))
+    np.testing.assert_array_equal(points[:, 0], np.arange(4))
+
+
+def test_empty_map_loads_as_empty_arrays(tmp_path):
+    path = str(tmp_path / "map.udmap")
+    map_format.create(path)
+    points, codes = map_format.load(path)
+    assert points.shape == (0, 3) and codes.shape == (0,)
+
+
+@pytest.mark.parametrize("header", [b"", b"NOTMAP\x01\x00", struct.pack("<6sH", map_format.MAGIC, 99)])
+def test_bad_header_is_rejected(tmp_path, header):
+    path = tmp_path / "map.udmap"
+    path.write_bytes(header)
+    with pytest.raises(ValueError):
+        map_format.read_chunks(str(path))
+
+
+def test_write_chunk_rejects_mismatched_codes(tmp_path):
+    with open(tmp_path / "map.udmap", 'wb') as f:
+        with pytest.raises(ValueError):
+            map_format.write_chunk(f, np.zeros((3, 3)), np.zeros(2))
+
+
+def test_csv_import_and_export(tmp_path):
+    csv_path = tmp_path / "terrain_map.csv"
+    csv_path.write_text("x,y,depth,object_type\n"
+                        "1.0,2.0,-3.0,coral\n"
+                        "4.0,,-6.0,rock\n"
+                        "7.0,8.0,-9.0,kelp\n")
+    bin_path = str(tmp_path / "terrain_map.udmap")
+    # Рядок з пропущеним значенням відкидається, невідомий тип стає 'empty'
+    assert map_format.csv_to_binary(str(csv_path), bin_path, chunk_rows=1) == 2
+    points, codes = map_format.load(bin_path)
+    np.testing.assert_array_equal(points, [[1, 2, -3], [7, 8, -9]])
+    np.testing.assert_array_equal(codes, [OBJECT_CODES["coral"], OBJECT_CODES["empty"]])
+    assert len(map_format.read_chunks(bin_path)) == 1
+
+    out_path = tmp_path / "export.csv"
+    assert map_format.binary_to_csv(bin_path, str(out_path)) == 2
+    assert out_path.read_text().splitlines() == ["x,y,depth,object_type", "1.0,2.0,-3.0,coral",
+                                                 "7.0,8.0,-9.0,empty"]
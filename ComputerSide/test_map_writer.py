@@ -0,0 +1,103 @@
+# test_map_writer.py
+import numpy as np
+import pytest
+
+from src import map_format
+from src import map_writer
+from src.map_writer import MapWriter
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(map_writer.os, "fsync", calls.append)
+    return calls
+
+
+def batch(start, count):
+    return np.column_stack([np.arange(start, start + count), np.zeros(count), np.ones(count)]), np.zeros(count)
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        MapWriter(str(tmp_path / "map.udmap"), fsync="always")
+
+
+@pytest.mark.parametrize("policy, expected, on_close", [("never", 0, 1), ("flush", 3, 0), ("interval", 0, 1)])
+def test_fsync_policy_on_flush(tmp_path, fsyncs, policy, expected, on_close):
+    writer = MapWriter(str(tmp_path / "map.udmap"), fsync=policy, fsync_interval=3600.0)
+    for start in range(0, 9, 3):
+        writer.submit(*batch(start, 3))
+        writer.flush()
+    assert len(fsyncs) == expected
+    # close() синхронізує все, що ще не пройшло fsync, навіть якщо буфер уже порожній
+    writer.close()
+    assert len(fsyncs) == expected + on_close
+
+
+def test_interval_policy_fsyncs_once_interval_passed(tmp_path, fsyncs):
+    writer = MapWriter(str(tmp_path / "map.udmap"), fsync="interval", fsync_interval=0.0)
+    writer.submit(*batch(0, 3))
+    writer.flush()
+    assert len(fsyncs) == 1
+    writer.close()
+
+
+def test_empty_flush_writes_nothing(tmp_path, fsyncs):
+    path = tmp_path / "map.udmap"
+    writer = MapWriter(str(path), fsync="flush")
+    writer.flush()
+    writer.close()
+    assert not path.exists() and fsyncs == []
+    assert writer.metrics()["flushes"] == 0
+
+
+def test_close_flushes_everything_submitted_to_running_thread(tmp_path, fsyncs):
+    path = str(tmp_path / "map.udmap")
+    writer = MapWriter(path, flush_rows=1000000, flush_interval=3600.0)
+    writer.start()
+    for start in range(0, 50, 5):
+        writer.submit(*batch(start, 5))
+    writer.close()
+    assert writer.thread is None and writer.file is None
+    points, codes = map_format.load(path)
+    np.testing.assert_array_equal(points[:, 0], np.arange(50))
+    metrics = writer.metrics()
+    assert metrics["rows_written"] == 50 and metrics["queue_depth"] == 0
+
+
+def test_full_buffer_drops_oldest_batches(tmp_path, fsyncs):
+    path = str(tmp_path / "map.udmap")
+    writer = MapWriter(path, flush_rows=1000000, max_buffered_rows=10)
+    for start in range(0, 20, 5):
+        writer.submit(*batch(start, 5))
+    writer.close()
+    points, _ = map_format.load(path)
+    np.testing.assert_array_equal(points[:, 0], np.arange(10, 20))
+    assert writer.metrics()["rows_dropped"] == 10
+
+
+def test_csv_output_has_header_and_type_names(tmp_path, fsyncs):
+    path = tmp_path / "map.csv"
+    writer = MapWriter(str(path))
+    writer.submit([[1.5, 2.0, 3.0]], [2])
+    writer.close()
+    assert path.read_text().splitlines() == ["x,y,depth,object_type", "1.5,2.0,3.0,coral"]
+
+
+def test_tiles_receive_batches_with_fsync_flag(tmp_path, fsyncs):
+    class Tiles:
+        def __init__(self):
+            self.calls = []
+
+        def append(self, points, codes, fsync):
+            self.calls.append((len(points), fsync))
+
+    tiles = Tiles()
+    writer = MapWriter(str(tmp_path / "tiles"), fsync="never", tiles=tiles)
+    writer.submit(*batch(0, 4))
+    writer.flush()
+    writer.submit(*batch(4, 2))
+    writer.close()
+    assert tiles.calls == [(4, False), (2, True)]
+    assert fsyncs == []
@@ -0,0 +1,81 @@
+# test_metrics.py
+# Реєстр метрик: лог-лінійні кошики гістограм, перцентилі та знімок для JSON.
+import json
+
+import pytest
+
+from src.metrics import (SUB_BUCKETS, Histogram, MetricsRegistry, bucket_bounds, bucket_index,
+                         bucket_percentile)
+
+
+def test_small_values_have_exact_buckets():
+    for value in range(2 * SUB_BUCKETS):
+        assert bucket_index(value) == value
+        assert bucket_bounds(value) == (value, value + 1)
+
+
+def test_bucket_bounds_contain_value_with_bounded_error():
+    previous = -1
+    for value in list(range(2 * SUB_BUCKETS, 5000)) + [10 ** 6, 3600 * 10 ** 6]:
+        index = bucket_index(value)
+        low, high = bucket_bounds(index)
+        assert low <= value < high
+        assert (high - low) / low <= 1 / SUB_BUCKETS
+        assert index >= previous
+        previous = index
+
+
+def test_percentiles_within_bucket_error():
+    histogram = Histogram("latency")
+    for value in range(1, 1001):
+        histogram.record(value)
+    for q in (50, 90, 99):
+        assert histogram.percentile(q) == pytest.approx(q * 10, rel=1 / SUB_BUCKETS)
+    assert histogram.percentile(100) == 1000
+    # Перцентилі обмежені фактичними мінімумом і максимумом
+    assert histogram.percentile(0) >= 1
+
+
+def test_empty_histogram():
+    histogram = Histogram("idle")
+    assert histogram.percentile(99) == 0
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 0 and snapshot["min"] == 0 and snapshot["mean"] == 0.0
+    assert bucket_percentile([], 0, None, 0, 50) == 0
+
+
+def test_histogram_snapshot_and_reset():
+    histogram = Histogram("assembly")
+    for value in (5, 7.9, -3, 100):
+        histogram.record(value)
+    histogram.record_seconds(0.002)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["min"] == 0 and snapshot["max"] == 2000
+    assert snapshot["mean"] == pytest.approx((5 + 7 + 0 + 100 + 2000) / 5)
+    assert {"p50", "p90", "p99", "p99.9"} <= set(snapshot)
+    assert snapshot["p50"] == 7
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0
+
+
+def test_registry_returns_same_metric_and_rejects_type_clash():
+    registry = MetricsRegistry()
+    assert registry.counter("frames") is registry.counter("frames")
+    with pytest.raises(TypeError):
+        registry.histogram("frames")
+
+
+def test_registry_snapshot_is_json(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("frames").inc(3)
+    registry.gauge("level").set(2)
+    registry.histogram("decode").record(250)
+    snapshot = registry.snapshot()
+    assert snapshot["counters"] == {"frames": 3}
+    assert snapshot["gauges"] == {"level": 2}
+    assert snapshot["histograms"]["decode"]["count"] == 1
+    path = str(tmp_path / "metrics.json")
+    registry.dump_json(path)
+    with open(path) as f:
+        assert json.load(f)["counters"] == {"frames": 3}
@@ -0,0 +1,80 @@
+# test_point_store.py
+import numpy as np
+import pytest
+
+from src.point_store import EMPTY_CODE, OBJECT_CODES, OBJECT_TYPES, PALETTE, PointStore, encode_object_types
+
+
+def points_along_x(start, count):
+    return np.column_stack([np.arange(start, start + count, dtype=np.float64), np.zeros(count), np.zeros(count)])
+
+
+def test_encode_object_types_maps_unknown_names_to_empty():
+    names = ["reef", "kelp", "sand", None, "empty", "coral", "", "rock"]
+    expected = [OBJECT_CODES["reef"], EMPTY_CODE, OBJECT_CODES["sand"], EMPTY_CODE, EMPTY_CODE,
+                OBJECT_CODES["coral"], EMPTY_CODE, OBJECT_CODES["rock"]]
+    codes = encode_object_types(np.array(names, dtype=object))
+    assert codes.dtype == np.uint8
+    np.testing.assert_array_equal(codes, expected)
+    assert encode_object_types([]).shape == (0,)
+
+
+def test_append_grows_and_keeps_columns():
+    store = PointStore(max_points=100, initial_capacity=2)
+    codes = encode_object_types(["sand", "rock", "coral", "empty"])
+    store.append(points_along_x(0, 4), codes)
+    assert len(store) == 4 and store.capacity >= 4
+    assert list(store.object_types()) == ["sand", "rock", "coral", "empty"]
+    np.testing.assert_array_equal(store.colors, PALETTE[codes])
+    np.testing.assert_array_equal(store.hits, 1)
+    # Голос кожної точки — за її власний тип
+    np.testing.assert_array_equal(np.argmax(store.votes, axis=1), codes)
+    np.testing.assert_array_equal(store.last_point(), [3, 0, 0])
+
+
+def test_append_rejects_mismatched_codes():
+    with pytest.raises(ValueError):
+        PointStore().append(points_along_x(0, 3), [0, 1])
+
+
+def test_oldest_points_drop_when_full():
+    store = PointStore(max_points=5, initial_capacity=2)
+    for start in range(0, 12, 3):
+        store.append(points_along_x(start, 3), np.zeros(3, dtype=np.uint8))
+        assert store.capacity <= 2 * store.max_points
+    assert len(store) == 5
+    np.testing.assert_array_equal(store.points[:, 0], np.arange(7, 12))
+    # id точок сталі: id = порядковий номер додавання
+    assert (store.first_id, store.next_id) == (7, 12)
+    np.testing.assert_array_equal(store.alive([6, 7, 11, 12]), [False, True, True, False])
+
+
+def test_batch_larger_than_store_keeps_its_tail():
+    store = PointStore(max_points=4)
+    store.append(points_along_x(0, 10), np.zeros(10, dtype=np.uint8))
+    np.testing.assert_array_equal(store.points[:, 0], [6, 7, 8, 9])
+    assert store.first_id == 6
+
+
+def test_merge_averages_points_and_votes_for_type():
+    store = PointStore()
+    store.append(points_along_x(0, 2), [OBJECT_CODES["sand"]] * 2)
+    votes = np.zeros((1, len(OBJECT_TYPES)), dtype=np.uint32)
+    votes[0, OBJECT_CODES["rock"]] = 3
+    store.merge([store.first_id + 1], np.array([[6.0, 3.0, 0.0]]), np.array([3]), votes)
+    np.testing.assert_allclose(store.points[1], [(1 + 6) / 4, 3 / 4, 0])
+    assert store.hits[1] == 4
+    assert store.object_types()[1] == "rock"
+    np.testing.assert_array_equal(store.colors[1], PALETTE[OBJECT_CODES["rock"]])
+    # Сусідня точка не змінилась
+    np.testing.assert_array_equal(store.points[0], [0, 0, 0])
+    assert store.hits[0] == 1
+
+
+def test_replace_resets_contents():
+    store = PointStore()
+    store.append(points_along_x(0, 3), [0, 0, 0])
+    store.replace(points_along_x(10, 2), [1, 1], hits=np.array([5, 6]))
+    np.testing.assert_array_equal(store.points[:, 0], [10, 11])
+    np.testing.assert_array_equal(store.hits, [5, 6])
+    assert store.first_id == 3
@@ -0,0 +1,84 @@
+# test_protocol.py
+import struct
+
+import pytest
+
+from src import protocol
+
+
+def sensor_data():
+    return {
+        "frame_id": 42,
+        "timestamp": 1700000000.25,
+        "imu": {"quaternion": [1.0, 0.0, 0.5, -0.5]},
+        "sonar": {"point": [1.5, -2.25, 30.0], "distance": 12.5, "object_type": "coral"},
+        "thruster_speeds": [0.5, -0.5, 0.0, 0.0, 0.25, 0.25],
+    }
+
+
+def test_sensor_round_trip():
+    data = sensor_data()
+    datagram = protocol.encode_sensor(data)
+    assert protocol.is_binary(datagram)
+    assert len(datagram) == protocol.HEADER.size + protocol.SENSOR_PAYLOAD.size
+    assert protocol.decode(datagram) == data
+
+
+def test_unknown_object_type_is_sent_as_empty():
+    data = sensor_data()
+    data["sonar"]["object_type"] = "kelp"
+    assert protocol.decode(protocol.encode_sensor(data))["sonar"]["object_type"] == "empty"
+
+
+def test_image_chunk_round_trip():
+    payload = bytes(range(256)) * 4
+    datagram = protocol.encode_image_chunk(7, 2, 5, payload, 123.5)
+    decoded = protocol.decode(datagram)
+    assert {key: decoded[key] for key in ("type", "frame_id", "chunk_index", "total_chunks", "timestamp")} == {
+        "type": "image_chunk", "frame_id": 7, "chunk_index": 2, "total_chunks": 5, "timestamp": 123.5}
+    # Дані чанка — view на датаграму, без копії
+    assert isinstance(decoded["data"], memoryview)
+    assert bytes(decoded["data"]) == payload
+
+
+def test_json_round_trip():
+    data = sensor_data()
+    datagram = protocol.encode_sensor_json(data)
+    assert not protocol.is_binary(datagram)
+    assert protocol.decode_json(datagram) == data
+    chunk = protocol.decode_json(protocol.encode_image_chunk_json(3, 0, 1, "QUJD", 1.0))
+    assert chunk["data"] == "QUJD" and chunk["frame_id"] == 3
+
+
+def test_rejects_other_protocol_version():
+    datagram = bytearray(protocol.encode_sensor(sensor_data()))
+    datagram[2] = protocol.VERSION + 1
+    with pytest.raises(protocol.ProtocolError, match="version"):
+        protocol.decode(bytes(datagram))
+
+
+@pytest.mark.parametrize("datagram", [
+    b"UD\x01",
+    b"XX" + bytes(protocol.HEADER.size),
+    protocol.HEADER.pack(protocol.MAGIC, protocol.VERSION, 99, 0, 0, 1, 0.0),
+    protocol.HEADER.pack(protocol.MAGIC, protocol.VERSION, protocol.TYPE_SENSOR, 0, 0, 1, 0.0) + b"\0" * 8,
+])
+def test_rejects_malformed_datagrams(datagram):
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode(datagram)
+
+
+def test_protocol_error_is_value_error():
+    with pytest.raises(ValueError):
+        protocol.decode(b"")
+
+
+def test_negotiate_prefers_peer_order():
+    assert protocol.negotiate(["binary", "json"]) == "binary"
+    assert protocol.negotiate(["protobuf", "json", "binary"]) == "json"
+    assert protocol.negotiate(None) == protocol.FORMAT_JSON
+
+
+def test_header_layout_is_stable():
+    # Формат заголовка поділяють обидві сторони; зміна розміру ламає сумісність
+    assert protocol.HEADER.size == struct.calcsize("!2sBBIHHd") == 20
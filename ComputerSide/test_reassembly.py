@@ -0,0 +1,166 @@
+# test_reassembly.py
+import base64
+import random
+
+from src.reassembly import FINISHED_HISTORY, FRAME_RESET_GAP, FrameReassembler
+
+CHUNK = 100
+
+
+def chunks_of(payload, size=CHUNK):
+    return [payload[i:i + size] for i in range(0, len(payload), size)]
+
+
+def feed(reassembler, frame_id, chunks, order=None, now=0.0):
+    """Подача чанків кадру у заданому порядку; повертає зібраний кадр (або None)."""
+    result = None
+    for index in order if order is not None else range(len(chunks)):
+        frame = reassembler.add(frame_id, index, len(chunks), chunks[index], now=now)
+        if frame is not None:
+            result = frame
+    return result
+
+
+def test_assembles_shuffled_chunks():
+    payload = bytes(random.Random(1).getrandbits(8) for _ in range(1050))
+    chunks = chunks_of(payload)
+    order = list(range(len(chunks)))
+    random.Random(2).shuffle(order)
+    # Хвіст першим: розмір чанка ще невідомий
+    order.remove(len(chunks) - 1)
+    order.insert(0, len(chunks) - 1)
+    reassembler = FrameReassembler()
+    frame = feed(reassembler, 1, chunks, order)
+    assert frame is not None
+    assert bytes(FrameReassembler.frame_bytes(frame)) == payload
+    assert reassembler.stats["completed"] == 1
+    assert len(reassembler) == 0 and reassembler.buffered_bytes == 0
+
+
+def test_single_chunk_frame():
+    frame = FrameReassembler().add(5, 0, 1, b"jpeg", now=0.0)
+    assert bytes(frame.payload()) == b"jpeg"
+
+
+def test_json_frames_are_base64_decoded():
+    payload = b"\xff\xd8" + bytes(300) + b"\xff\xd9"
+    chunks = chunks_of(base64.b64encode(payload).decode("ascii"))
+    frame = feed(FrameReassembler(), 1, chunks)
+    assert frame.text
+    assert FrameReassembler.frame_bytes(frame) == payload
+
+
+def test_duplicates_are_ignored():
+    chunks = chunks_of(bytes(350))
+    reassembler = FrameReassembler()
+    assert reassembler.add(1, 0, len(chunks), chunks[0], now=0.0) is None
+    assert reassembler.add(1, 0, len(chunks), chunks[0], now=0.0) is None
+    assert reassembler.stats["duplicates"] == 1
+    assert feed(reassembler, 1, chunks, range(1, len(chunks))) is not None
+    # Пізній дублікат зібраного кадру не починає його знову
+    assert reassembler.add(1, 2, len(chunks), chunks[2], now=0.0) is None
+    assert 1 not in reassembler
+    assert reassembler.stats["duplicates"] == 2
+
+
+def test_rejects_inconsistent_chunks():
+    reassembler = FrameReassembler()
+    reassembler.add(1, 0, 3, bytes(CHUNK), now=0.0)
+    assert reassembler.add(1, 1, 4, bytes(CHUNK), now=0.0) is None  # інша кількість чанків
+    assert reassembler.add(1, 3, 3, bytes(CHUNK), now=0.0) is None  # індекс поза кадром
+    assert reassembler.add(1, 1, 3, bytes(CHUNK + 1), now=0.0) is None  # довший за чанк
+    assert reassembler.stats["bad_chunks"] == 3
+
+
+def test_oversized_early_tail_drops_frame():
+    reassembler = FrameReassembler()
+    assert reassembler.add(1, 2, 3, bytes(CHUNK + 20), now=0.0) is None
+    assert reassembler.add(1, 0, 3, bytes(CHUNK), now=0.0) is None
+    assert 1 not in reassembler
+    assert reassembler.stats["bad_chunks"] == 1
+    assert [frame.frame_id for frame in reassembler.expire(now=0.0)] == [1]
+    assert reassembler.buffered_bytes == 0
+
+
+def test_expires_stale_frames():
+    reassembler = FrameReassembler(timeout=0.5)
+    reassembler.add(1, 0, 2, bytes(CHUNK), now=0.0)
+    reassembler.add(2, 0, 2, bytes(CHUNK), now=0.4)
+    assert reassembler.expire(now=0.45) == []
+    expired = reassembler.expire(now=0.6)
+    assert [frame.frame_id for frame in expired] == [1]
+    assert expired[0].missing() == [1]
+    assert 2 in reassembler
+    assert reassembler.stats["evicted_timeout"] == 1
+    # Відкинутий кадр вважається завершеним
+    assert reassembler.add(1, 1, 2, bytes(10), now=0.7) is None
+
+
+def test_memory_budget_evicts_oldest_frames():
+    reassembler = FrameReassembler(memory_budget=3 * 4 * CHUNK)
+    for frame_id in range(1, 6):
+        reassembler.add(frame_id, 0, 4, bytes(CHUNK), now=frame_id * 0.01)
+    assert reassembler.buffered_bytes <= reassembler.memory_budget
+    assert sorted(reassembler.frames) == [3, 4, 5]
+    assert reassembler.stats["evicted_memory"] == 2
+    assert sorted(frame.frame_id for frame in reassembler.expire(now=0.05)) == [1, 2]
+
+
+def test_backward_jump_resets_numbering():
+    reassembler = FrameReassembler()
+    for frame_id in range(1, 301):
+        reassembler.add(frame_id, 0, 1, b"x", now=0.0)
+    reassembler.add(301, 0, 2, bytes(CHUNK), now=0.0)
+    # Дрон перезапустився: нумерація знову з малих номерів
+    for frame_id in range(100, 105):
+        assert reassembler.add(frame_id, 0, 1, b"y", now=1.0) is not None
+    assert reassembler.stats["resets"] == 1
+    assert [frame.frame_id for frame in reassembler.expire(now=1.0)] == [301]
+    assert len(reassembler.finished) == 5
+
+
+def test_late_duplicate_within_gap_is_not_a_reset():
+    reassembler = FrameReassembler()
+    for frame_id in range(1, FRAME_RESET_GAP + 10):
+        reassembler.add(frame_id, 0, 1, b"x", now=0.0)
+    assert reassembler.add(10, 0, 1, b"x", now=0.0) is None
+    assert reassembler.stats["resets"] == 0
+    assert reassembler.stats["duplicates"] == 1
+
+
+def test_finished_history_is_bounded():
+    reassembler = FrameReassembler()
+    for frame_id in range(FINISHED_HISTORY + 50):
+        reassembler.add(frame_id, 0, 1, b"x", now=0.0)
+    assert len(reassembler.finished) == FINISHED_HISTORY
+
+
+def test_restart_with_low_numbers_is_detected_by_timestamp():
+    reassembler = FrameReassembler()
+    for frame_id in range(1, 11):
+        assert reassembler.add(frame_id, 0, 1, b"x", now=0.0, timestamp=100.0 + frame_id) is not None
+    reassembler.add(11, 0, 2, bytes(CHUNK), now=0.0, timestamp=111.0)
+    # Перезапуск за кілька кадрів: номери ще далеко до FRAME_RESET_GAP, але кадри знято пізніше
+    assert reassembler.add(1, 0, 1, b"y", now=1.0, timestamp=200.0) is not None
+    assert reassembler.stats["resets"] == 1
+    assert [frame.frame_id for frame in reassembler.expire(now=1.0)] == [11]
+    # Пізній дублікат кадру нової нумерації (той самий час захоплення) лишається дублікатом
+    assert reassembler.add(1, 0, 1, b"y", now=1.0, timestamp=200.0) is None
+    assert reassembler.stats["duplicates"] == 1
+
+
+def test_restart_detected_by_chunk_count_of_finished_frame():
+    reassembler = FrameReassembler()
+    feed(reassembler, 3, chunks_of(bytes(250)))
+    chunks = chunks_of(bytes(450))
+    assert feed(reassembler, 3, chunks) is not None
+    assert reassembler.stats["resets"] == 1
+
+
+def test_restart_replaces_frame_in_progress():
+    reassembler = FrameReassembler()
+    reassembler.add(2, 0, 2, bytes(CHUNK), now=0.0, timestamp=10.0)
+    assert reassembler.add(2, 0, 2, bytes(CHUNK), now=0.1, timestamp=20.0) is None
+    assert reassembler.stats["resets"] == 1 and reassembler.stats["duplicates"] == 0
+    assert reassembler.get(2).timestamp == 20.0
+    assert reassembler.add(2, 1, 2, b"tail", now=0.1, timestamp=20.0) is not None
@@ -0,0 +1,81 @@
+# test_streaming.py
+# StreamController дрона: адаптація потоку камери за звітами link_stats станції.
+from utils.streaming import MIN_DATAGRAM, UDP_IP_OVERHEAD, UPGRADE_AFTER, StreamController, build_ladder
+
+
+def controller(**kwargs):
+    options = {"target_bitrate": 1000000, "max_loss": 0.05, "mtu": 1500}
+    options.update(kwargs)
+    return StreamController(640, 480, 30, 80, **options)
+
+
+def report(frames=30, dropped=0, late=0, bytes_=50000, sensor_packets=20, sensor_lost=0):
+    return {"type": "link_stats", "interval": 1.0, "frames": frames, "dropped": dropped, "late": late,
+            "bytes": bytes_, "sensor_packets": sensor_packets, "sensor_lost": sensor_lost}
+
+
+def test_ladder_runs_from_configured_to_cheapest():
+    ladder = build_ladder(640, 480, 30, 80)
+    assert ladder[0] == (640, 480, 80, 30)
+    assert len(set(ladder)) == len(ladder)
+    assert all(a[0] >= b[0] and a[2] >= b[2] and a[3] >= b[3] for a, b in zip(ladder, ladder[1:]))
+
+
+def test_datagram_size_follows_mtu():
+    stream = controller(mtu=1400)
+    assert stream.datagram_size == stream.max_datagram == 1400 - UDP_IP_OVERHEAD
+    assert controller(mtu=100).max_datagram == MIN_DATAGRAM
+
+
+def test_loss_steps_down_and_halves_datagrams():
+    stream = controller()
+    stream.update(report(frames=20, dropped=10))
+    assert stream.level == 1
+    assert stream.datagram_size == (1500 - UDP_IP_OVERHEAD) // 2
+    assert stream.stats["downgrades"] == 1
+    assert abs(stream.stats["last_loss"] - 1 / 3) < 1e-9
+
+
+def test_sensor_loss_counts_when_frames_fit_one_datagram():
+    stream = controller()
+    stream.update(report(sensor_packets=10, sensor_lost=10))
+    assert stream.level == 1
+
+
+def test_bitrate_over_budget_steps_down_without_shrinking_datagrams():
+    stream = controller()
+    stream.update(report(bytes_=200000))
+    assert stream.level == 1
+    assert stream.datagram_size == stream.max_datagram
+
+
+def test_level_is_clamped_to_the_ladder():
+    stream = controller()
+    for _ in range(len(stream.ladder) + 3):
+        stream.update(report(dropped=30))
+    assert stream.level == len(stream.ladder) - 1
+    assert stream.datagram_size == MIN_DATAGRAM
+    assert stream.fps == stream.ladder[-1][3]
+
+
+def test_steps_up_after_consecutive_clean_reports():
+    stream = controller()
+    stream.update(report(dropped=30))
+    for _ in range(UPGRADE_AFTER - 1):
+        stream.update(report())
+    assert stream.level == 1
+    stream.update(report())
+    assert stream.level == 0
+    assert stream.datagram_size == stream.max_datagram
+    assert stream.stats["upgrades"] == 1
+
+
+def test_marginal_report_restarts_clean_streak():
+    stream = controller()
+    stream.update(report(dropped=30))
+    for _ in range(UPGRADE_AFTER - 1):
+        stream.update(report())
+    # Втрати в межах допуску, але вище половини: не погіршення і не «чистий» звіт
+    stream.update(report(frames=96, dropped=4))
+    stream.update(report())
+    assert stream.level == 1
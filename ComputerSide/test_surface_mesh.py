@@ -0,0 +1,76 @@
+# test_surface_mesh.py
+import time
+
+import numpy as np
+
+from src.dem_grid import BLOCK_CELLS, DepthGrid
+from src.point_store import OBJECT_CODES, PALETTE
+from src.surface_mesh import SurfaceMesher, grid_block_mesh
+
+
+def test_block_mesh_triangulates_filled_quads_only():
+    depth = np.array([[1.0, 2.0, np.nan],
+                      [3.0, 4.0, 5.0]])
+    types = np.full(depth.shape, OBJECT_CODES["rock"], dtype=np.uint8)
+    vertices, triangles, colors = grid_block_mesh(depth, types, 10.0, 20.0, 0.5)
+    assert len(vertices) == 5
+    np.testing.assert_allclose(vertices[0], [10.25, 20.25, 1.0])
+    np.testing.assert_allclose(vertices[-1], [11.25, 20.75, 5.0])
+    # Лише квадрат з чотирьох заповнених комірок (лівий) дає два трикутники
+    assert triangles.tolist() == [[0, 1, 3], [0, 3, 2]]
+    np.testing.assert_array_equal(colors, np.tile(PALETTE[OBJECT_CODES["rock"]], (5, 1)))
+
+
+def test_combine_offsets_triangle_indices_per_block():
+    mesher = SurfaceMesher()
+    square = (np.zeros((4, 3)), np.array([[0, 1, 3], [0, 3, 2]], dtype=np.int32), np.zeros((4, 3)))
+    mesher.blocks = {(0, 0): square, (1, 0): square}
+    vertices, triangles, colors = mesher.combine()
+    assert len(vertices) == 8 and len(colors) == 8
+    assert triangles.tolist() == [[0, 1, 3], [0, 3, 2], [4, 5, 7], [4, 7, 6]]
+    empty = SurfaceMesher().combine()
+    assert [len(part) for part in empty] == [0, 0, 0]
+
+
+def wait_for_mesh(mesher, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        mesh = mesher.poll()
+        if mesh is not None:
+            return mesh
+        time.sleep(0.02)
+    raise AssertionError("surface mesh build timed out")
+
+
+def test_blocks_merge_into_seamless_surface_and_rebuild_incrementally():
+    grid = DepthGrid(cell_size=1.0)
+    # Смуга 4×2 комірки через шов між блоками (0, 0) і (1, 0), не на краю блоків за Y
+    xs = np.arange(BLOCK_CELLS - 2, BLOCK_CELLS + 2) + 0.5
+    points = np.array([[x, y, 3.0] for x in xs for y in (1.5, 2.5)])
+    grid.add(points, np.zeros(len(points)))
+    mesher = SurfaceMesher()
+    try:
+        assert mesher.submit(grid)
+        assert not mesher.submit(grid)  # Попередня побудова ще йде
+        vertices, triangles, _ = wait_for_mesh(mesher)
+        assert set(mesher.blocks) == {(0, 0), (1, 0)}
+        # Блок (0, 0) містить перший стовпець сусіднього блоку, тож шов закрито: 3 квадрати по 2 трикутники
+        assert len(triangles) == 6
+        spans = vertices[triangles].reshape(-1, 3)[:, 0]
+        assert spans.min() == BLOCK_CELLS - 1.5 and spans.max() == BLOCK_CELLS + 1.5
+
+        # Нові точки лише в блоці (1, 0): перебудовується тільки він
+        grid.add([[BLOCK_CELLS + 2.5, 1.5, 3.0], [BLOCK_CELLS + 2.5, 2.5, 3.0]], [0, 0])
+        assert grid.dirty_blocks == {(1, 0)}
+        built = mesher.stats["blocks_built"]
+        assert mesher.submit(grid)
+        _, triangles, _ = wait_for_mesh(mesher)
+        assert mesher.stats["blocks_built"] == built + 1
+        assert len(triangles) == 8
+
+        # Очищена сітка (нова карта) скидає кеш блоків
+        grid.clear()
+        assert not mesher.submit(grid)
+        assert mesher.blocks == {}
+    finally:
+        mesher.close()
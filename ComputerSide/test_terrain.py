@@ -0,0 +1,66 @@
+# test_terrain.py
+# TerrainClassifier дрона: таблиці LUT і класифікація кадру.
+import cv2
+import numpy as np
+import pytest
+
+from utils.terrain import EMPTY_LABEL, TERRAIN_RANGES, TERRAIN_TYPES, TerrainClassifier, build_luts
+
+
+def bgr(h, s, v):
+    """BGR-колір за HSV в одиницях OpenCV."""
+    return cv2.cvtColor(np.uint8([[[h, s, v]]]), cv2.COLOR_HSV2BGR)[0, 0]
+
+
+def reference_label(h, s, v, ranges=TERRAIN_RANGES):
+    """Перший клас, у діапазони якого потрапляє піксель (без таблиць)."""
+    for label, (_, *channels) in enumerate(ranges):
+        inside = True
+        for value, (low, high) in zip((h, s, v), channels):
+            inside &= low <= value <= high if low <= high else value >= low or value <= high
+        if inside:
+            return label
+    return len(ranges)
+
+
+def test_luts_match_range_checks():
+    luts, first_label = build_luts()
+    rng = np.random.default_rng(0)
+    for h, s, v in zip(rng.integers(0, 180, 2000), rng.integers(0, 256, 2000), rng.integers(0, 256, 2000)):
+        bits = luts[0, h] & luts[1, s] & luts[2, v]
+        assert first_label[bits] == reference_label(h, s, v)
+
+
+def test_hue_range_wraps_around():
+    luts, _ = build_luts([("coral", (170, 5), (0, 255), (0, 255))])
+    assert luts[0, 175] and luts[0, 3]
+    assert not luts[0, 90]
+
+
+def test_first_range_wins_on_overlap():
+    _, first_label = build_luts()
+    assert first_label[0b0110] == 1
+    assert first_label[0] == EMPTY_LABEL
+
+
+def test_too_many_classes_are_rejected():
+    with pytest.raises(ValueError):
+        build_luts([(f"class{i}", (0, 179), (0, 255), (0, 255)) for i in range(9)])
+
+
+@pytest.mark.parametrize("name, hsv", [("coral", (160, 200, 200)), ("reef", (60, 200, 120)),
+                                       ("sand", (20, 80, 200)), ("rock", (100, 20, 120)), ("empty", (0, 0, 10))])
+def test_uniform_frame_is_classified(name, hsv):
+    frame = np.tile(bgr(*hsv), (48, 64, 1))
+    assert TerrainClassifier().classify(frame) == name
+
+
+def test_dominant_tile_vote_wins():
+    classifier = TerrainClassifier(grid=(2, 2), subsample=1)
+    frame = np.tile(bgr(20, 80, 200), (40, 40, 1))
+    frame[:20, :20] = bgr(60, 200, 120)
+    tiles = classifier.classify_tiles(frame)
+    assert TERRAIN_TYPES[tiles[0, 0]] == "reef"
+    assert [TERRAIN_TYPES[label] for label in tiles.ravel()[1:]] == ["sand"] * 3
+    assert classifier.classify(frame) == "sand"
+    assert classifier.histograms(frame).sum() == 40 * 40
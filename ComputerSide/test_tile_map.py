@@ -0,0 +1,149 @@
+# test_tile_map.py
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from src import map_format
+from src.map_utils import MapUtils
+from src.point_store import PointStore
+from src.tile_map import TiledMap, split_by_tile, tile_keys
+
+
+def test_split_by_tile_groups_points_by_floor_of_xy():
+    points = np.array([[0.5, 0.5, 1.0], [-0.5, 0.5, 2.0], [9.9, 0.1, 3.0], [10.0, -0.1, 4.0], [1.0, 2.0, 5.0]])
+    codes = np.arange(5, dtype=np.uint8)
+    tiles = split_by_tile(points, codes, 10.0)
+    assert sorted(tiles) == [(-1, 0), (0, 0), (1, -1)]
+    tile_points, tile_codes = tiles[(0, 0)]
+    np.testing.assert_array_equal(tile_codes, [0, 2, 4])
+    np.testing.assert_array_equal(tile_points[:, 2], [1.0, 3.0, 5.0])
+    np.testing.assert_array_equal(tile_keys(points, 10.0)[3], [1, -1])
+    assert split_by_tile(points[:0], codes[:0], 10.0) == {}
+
+
+def test_index_persists_tile_counts_and_size(tmp_path):
+    root = str(tmp_path / "survey.tiles")
+    tiles = TiledMap(root, tile_size=10.0)
+    tiles.append([[1, 1, 1], [2, 2, 2], [15, 1, 1]], [0, 1, 2])
+    tiles.close()
+    reopened = TiledMap(root, tile_size=99.0)
+    assert reopened.tile_size == 10.0
+    assert reopened.counts == {(0, 0): 2, (1, 0): 1}
+    assert len(reopened) == 3
+    points, codes = map_format.load(reopened.tile_path((1, 0)))
+    np.testing.assert_array_equal(points, [[15, 1, 1]])
+    np.testing.assert_array_equal(codes, [2])
+
+
+def test_tile_chunks_stay_bounded_under_many_small_appends(tmp_path):
+    tiles = TiledMap(str(tmp_path / "survey.tiles"), tile_size=10.0, max_chunks=8)
+    for i in range(200):
+        tiles.append([[i * 0.01, 1.0, 1.0]], [i % 5])
+        assert len(map_format.read_chunks(tiles.tile_path((0, 0)))) <= 8
+    assert tiles.stats["compacted"] > 0
+    points, codes = map_format.load(tiles.tile_path((0, 0)))
+    # Без voxel_size ущільнення лише зливає чанки: усі точки на місці й у тому ж порядку
+    np.testing.assert_allclose(points[:, 0], np.arange(200) * 0.01, atol=1e-6)
+    np.testing.assert_array_equal(codes, np.arange(200) % 5)
+    assert tiles.counts[(0, 0)] == 200
+
+
+def test_voxel_compaction_merges_repeated_samples(tmp_path):
+    root = str(tmp_path / "survey.tiles")
+    tiles = TiledMap(root, tile_size=10.0, voxel_size=1.0, max_chunks=4)
+    for i in range(100):
+        tiles.append([[0.5, 0.5, 0.5 + (i % 2) * 0.1], [5.5, 5.5, 0.5]], [1, 2])
+    tiles.close()
+    _, _, hits, votes = map_format.load_weighted(tiles.tile_path((0, 0)))
+    assert len(hits) <= 2 + 2 * 4 and hits.sum() == 200
+    assert votes[:, 1].sum() == 100 and votes[:, 2].sum() == 100
+    assert TiledMap(root).counts[(0, 0)] == len(hits)
+
+
+def survey(root, size=5, tile_size=10.0):
+    # По дві точки в кожному тайлі сітки size×size
+    tiles = TiledMap(root, tile_size=tile_size)
+    centers = (np.arange(size) + 0.5) * tile_size
+    xy = np.array([(x, y) for x in centers for y in centers])
+    points = np.column_stack([np.repeat(xy, 2, axis=0), np.tile([1.0, 2.0], len(xy))])
+    tiles.append(points, np.zeros(len(points), dtype=np.uint8))
+    tiles.close()
+
+
+def test_loaded_tiles_are_handed_out_once_and_lru_evicted(tmp_path):
+    root = str(tmp_path / "survey.tiles")
+    survey(root)
+    tiles = TiledMap(root, tile_size=10.0, cache_tiles=1, radius=1)
+    assert tiles.cache_tiles == 9
+    tiles.focus([5.0, 5.0, 0.0], block=True)
+    loaded = tiles.take_loaded()
+    # Найближчий тайл першим; набір змінився за один прохід — version зростає на 1
+    assert [tile[0] for tile in loaded] == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert all(len(points) == 2 and hits is None for _, points, _, hits, _ in loaded)
+    assert tiles.version == 1 and tiles.take_loaded() == []
+
+    tiles.focus([5.0, 5.0, 0.0], block=True)
+    assert tiles.version == 1 and tiles.take_loaded() == []
+
+    tiles.focus([45.0, 45.0, 0.0], block=True)
+    tiles.focus([25.0, 25.0, 0.0], block=True)
+    assert len(tiles.cache) == 9 and tiles.stats["evicted"] > 0
+    assert (0, 0) not in tiles.cache and (2, 2) in tiles.cache
+    assert tiles.version == 3
+
+
+def test_background_loader_fills_queue(tmp_path):
+    root = str(tmp_path / "survey.tiles")
+    survey(root)
+    tiles = TiledMap(root, tile_size=10.0, radius=0)
+    tiles.start()
+    try:
+        tiles.focus([15.0, 25.0, 0.0])
+        for _ in range(200):
+            loaded = tiles.take_loaded()
+            if loaded:
+                break
+            time.sleep(0.01)
+    finally:
+        tiles.close()
+    assert [tile[0] for tile in loaded] == [(1, 2)]
+
+
+def test_new_tiles_written_in_session_are_not_loaded_back(tmp_path):
+    tiles = TiledMap(str(tmp_path / "survey.tiles"), tile_size=10.0)
+    tiles.append([[5.0, 5.0, 1.0]], [0])
+    tiles.focus([5.0, 5.0, 0.0], block=True)
+    assert tiles.take_loaded() == []
+
+
+def make_visualizer(max_points=1000000):
+    visualization = SimpleNamespace(set_cloud=lambda points, colors: None, invalidate_cloud=lambda store: None,
+                                    grow_axes=lambda points: None, reset_axes=lambda extent=None: None,
+                                    axis_extent=None)
+    return SimpleNamespace(point_store=PointStore(max_points), drone_position=np.array([5.0, 5.0, 0.0]),
+                           visualization=visualization)
+
+
+def test_map_utils_appends_only_new_tile_points(tmp_path):
+    root = str(tmp_path / "survey.tiles")
+    survey(root)
+    map_utils = MapUtils(map_path=root, voxel_size=1.0)
+    map_utils.tiles.radius = 0
+    map_utils.tiles.cache_tiles = 1
+    visualizer = make_visualizer()
+    try:
+        map_utils.load_map(visualizer)
+        store = visualizer.point_store
+        assert len(store) == 2
+        before = store.points.copy()
+        # Дрон відлітає й повертається: тайл (0, 0) вивантажено з кешу й прочитано знову
+        for position in ([15.0, 5.0, 0.0], [5.0, 5.0, 0.0]):
+            visualizer.drone_position = np.array(position)
+            map_utils.tiles.focus(position, block=True)
+            map_utils.poll_tiles(visualizer)
+        assert len(store) == 4
+        np.testing.assert_array_equal(store.points[:2], before)
+        assert int(map_utils.dem.count.sum()) == 4
+    finally:
+        map_utils.close()
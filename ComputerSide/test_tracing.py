@@ -0,0 +1,50 @@
+# test_tracing.py
+import pytest
+
+from src.tracing import ClockSync
+
+
+def exchange(t0, offset, uplink, downlink, processing=0.001):
+    """Часи (t0, t1, t2, t3) пінгу з годинником дрона, зсунутим на offset."""
+    t1 = t0 + uplink + offset
+    t2 = t1 + processing
+    t3 = t2 - offset + downlink
+    return t0, t1, t2, t3
+
+
+def test_symmetric_link_gives_exact_offset():
+    clock = ClockSync()
+    offset, rtt = clock.add(*exchange(100.0, 2.5, 0.004, 0.004))
+    assert offset == pytest.approx(2.5)
+    assert rtt == pytest.approx(0.008)
+    assert clock.to_local(102.5) == pytest.approx(100.0)
+
+
+def test_estimate_uses_lowest_rtt_sample():
+    clock = ClockSync(window=4)
+    clock.add(*exchange(0.0, 1.0, 0.050, 0.002))
+    clock.add(*exchange(1.0, 1.0, 0.002, 0.002))
+    clock.add(*exchange(2.0, 1.0, 0.002, 0.040))
+    assert clock.rtt == pytest.approx(0.004)
+    assert clock.offset == pytest.approx(1.0)
+
+
+def test_asymmetry_error_is_bounded_by_half_rtt():
+    clock = ClockSync()
+    offset, rtt = clock.add(*exchange(0.0, -3.0, 0.009, 0.001))
+    assert abs(offset - -3.0) <= rtt / 2
+
+
+def test_old_samples_leave_the_window():
+    clock = ClockSync(window=2)
+    clock.add(*exchange(0.0, 1.0, 0.001, 0.001))
+    clock.add(*exchange(1.0, 5.0, 0.010, 0.010))
+    clock.add(*exchange(2.0, 5.0, 0.010, 0.010))
+    assert clock.offset == pytest.approx(5.0)
+
+
+def test_no_estimate_before_first_sample():
+    clock = ClockSync()
+    assert clock.to_local(10.0) is None
+    clock.add(*exchange(0.0, 1.0, 0.001, 0.001))
+    assert clock.to_local(None) is None
@@ -0,0 +1,111 @@
+# test_voxel_map.py
+from types import SimpleNamespace
+
+import numpy as np
+
+from src import map_format
+from src.map_utils import MapUtils
+from src.point_store import OBJECT_CODES, OBJECT_TYPES, PointStore
+from src.voxel_map import VoxelIndex, compact
+
+
+def test_voxel_index_merges_hits_into_existing_points():
+    store = PointStore()
+    index = VoxelIndex(voxel_size=1.0)
+    new_points, _ = index.ingest(store, [[0.2, 0.2, 0.2], [5.5, 0.5, 0.5]], [OBJECT_CODES["sand"]] * 2)
+    assert len(new_points) == 2 and len(store) == 2
+    # Два влучання в перший воксель і одне в новий
+    new_points, new_codes = index.ingest(store, [[0.4, 0.4, 0.4], [0.6, 0.6, 0.6], [9.5, 0.5, 0.5]],
+                                         [OBJECT_CODES["rock"]] * 3)
+    np.testing.assert_allclose(new_points, [[9.5, 0.5, 0.5]])
+    assert list(new_codes) == [OBJECT_CODES["rock"]]
+    assert len(store) == 3 and len(index) == 3
+    np.testing.assert_allclose(store.points[0], [0.4, 0.4, 0.4])
+    assert store.hits[0] == 3
+    assert store.object_types()[0] == "rock"
+    assert index.stats == {"added": 3, "merged": 2}
+
+
+def test_voxel_index_forgets_dropped_points():
+    store = PointStore(max_points=2)
+    index = VoxelIndex(voxel_size=1.0)
+    for x in (0.5, 1.5, 2.5):
+        index.ingest(store, [[x, 0.5, 0.5]], [0])
+    # Точка першого вокселя вже витіснена зі сховища — влучання додає нову точку
+    new_points, _ = index.ingest(store, [[0.6, 0.5, 0.5]], [0])
+    assert len(new_points) == 1
+    np.testing.assert_allclose(store.points[:, 0], [2.5, 0.6])
+
+
+def test_rebuild_matches_store():
+    store = PointStore()
+    points, codes, hits, votes = compact([[0.1, 0.1, 0.1], [0.2, 0.2, 0.2], [3.0, 3.0, 3.0]], [0, 0, 0], 1.0)
+    store.append(points, codes, hits, votes)
+    index = VoxelIndex(voxel_size=1.0)
+    index.rebuild(store)
+    assert len(index) == 2
+    new_points, _ = index.ingest(store, [[3.2, 3.2, 3.2]], [0])
+    assert len(new_points) == 0
+    np.testing.assert_array_equal(store.hits, [2, 2])
+
+
+def test_compact_keeps_weights_of_merged_points():
+    votes = np.zeros((2, len(OBJECT_TYPES)))
+    votes[0, OBJECT_CODES["rock"]] = 3
+    votes[1, OBJECT_CODES["sand"]] = 1
+    points, codes, hits, merged_votes = compact([[0.2, 0.2, 0.2], [0.6, 0.6, 0.6]], [OBJECT_CODES["rock"]] * 2,
+                                                1.0, hits=[3, 1], votes=votes)
+    np.testing.assert_allclose(points, [[0.3, 0.3, 0.3]])
+    assert list(hits) == [4] and list(codes) == [OBJECT_CODES["rock"]]
+    np.testing.assert_array_equal(merged_votes, votes.sum(axis=0, keepdims=True))
+
+
+def make_visualizer():
+    visualization = SimpleNamespace(set_cloud=lambda points, colors: None, invalidate_cloud=lambda store: None,
+                                    grow_axes=lambda points: None, reset_axes=lambda extent=None: None,
+                                    axis_extent=None)
+    return SimpleNamespace(point_store=PointStore(), drone_position=np.zeros(3), visualization=visualization)
+
+
+def ingest_session(path, samples):
+    map_utils = MapUtils(map_path=path, voxel_size=1.0)
+    visualizer = make_visualizer()
+    map_utils.load_map(visualizer)
+    for depth, object_type in samples:
+        map_utils.ingest_batch(visualizer, [depth], [[1.0, 0.0, 0.0, 0.0]], [[0.5, 0.5, 0.0]], [object_type])
+    map_utils.close()
+    return visualizer.point_store
+
+
+def test_reload_keeps_hits_and_votes_and_file_stays_compact(tmp_path):
+    path = str(tmp_path / "map.udmap")
+    ingest_session(path, [(5.5, "sand"), (5.6, "rock"), (5.7, "rock"), (9.5, "coral")])
+    # Після закриття на диску по точці на воксель, а не по виміру
+    chunks = map_format.read_weighted_chunks(path)
+    assert len(chunks) == 1 and len(chunks[0][0]) == 2
+
+    store = ingest_session(path, [(5.4, "sand")])
+    # Від мілкішої точки до глибшої: воксель на глибині ~5.5 м з чотирма вимірами, потім корал
+    order = np.argsort(store.points[:, 2])[::-1]
+    np.testing.assert_array_equal(store.hits[order], [4, 1])
+    np.testing.assert_array_equal(store.votes[order][0], [2, 2, 0, 0, 0])
+    np.testing.assert_array_equal(store.votes[order][1], [0, 0, 1, 0, 0])
+    np.testing.assert_allclose(store.points[order][0], [0.5, 0.5, -5.55], atol=1e-5)
+
+    points, codes, hits, votes = map_format.load_weighted(path)
+    assert len(points) == 2 and sorted(hits) == [1, 4]
+
+
+def test_raw_chunks_from_older_files_are_compacted_on_load(tmp_path):
+    path = str(tmp_path / "map.udmap")
+    map_format.create(path)
+    with open(path, 'ab') as f:
+        for depth in (-5.5, -5.6, -5.7):
+            map_format.write_chunk(f, [[0.5, 0.5, depth]], [OBJECT_CODES["reef"]])
+    map_utils = MapUtils(map_path=path, voxel_size=1.0)
+    visualizer = make_visualizer()
+    map_utils.load_map(visualizer)
+    map_utils.close()
+    assert list(visualizer.point_store.hits) == [3]
+    assert visualizer.point_store.object_types()[0] == "reef"
+    assert len(map_format.read_weighted_chunks(path)) == 1
@@ -1,20 +1,54 @@
 # main.py
 import time
-import socket
 import json
-import threading
-import cv2
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import base64
 from mock.camera import MockCamera
 from mock.imu import MockIMU
 from mock.sonar import MockSonar
 from utils.logger import Logger
+from utils import protocol
+from utils.terrain import TerrainClassifier
+from utils.acquisition import RingBuffer, SensorTask, PeriodicTask, report_stats
+from utils.streaming import StreamController, ChunkCache
+from utils.metrics import REGISTRY, MetricsReporter, start_http_server
+from utils.tracing import TRACE
+
+class DroneProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint: hands received datagrams to a callback and tracks write back-pressure."""
+
+    def __init__(self, on_datagram=None, on_error=None):
+        self.on_datagram = on_datagram
+        self.on_error = on_error
+        self.transport = None
+        self.paused = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if self.on_datagram is not None:
+            self.on_datagram(data, addr)
+
+    def error_received(self, exc):
+        if self.on_error is not None:
+            self.on_error(exc)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
 
 class UnderwaterDrone:
-    def __init__(self):
-        self.logger = Logger("drone_log.txt")
-        self.camera = MockCamera()
+    def __init__(self, wire_format=protocol.FORMAT_BINARY, camera=None, sensor_rate=20.0, imu_rate=50.0,
+                 sonar_rate=20.0, mtu=None, target_bitrate=2000000, max_loss=0.05, cache_frames=8,
+                 per_packet_log=False, metrics_port=None, metrics_file=None, trace_file=None):
+        # Packet-level lines are summarised every 10 s unless per_packet_log is set
+        self.logger = Logger("drone_log.txt", per_packet=per_packet_log)
+        self.camera = camera if camera is not None else MockCamera()
         self.imu = MockIMU()
         self.sonar = MockSonar()
         
@@ -22,108 +56,261 @@ class UnderwaterDrone:
         self.udp_host = "127.0.0.1"
         self.udp_send_port = 5005
         self.udp_recv_port = 5006
-        self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.udp_socket.bind((self.udp_host, self.udp_recv_port))
+        self.send_buffer_size = 1024 * 1024
+        # Event loop endpoints, created in main(): control commands in, telemetry out
+        self.loop = None
+        self.control = None
+        self.telemetry = None
+        self.stopped = None
+        self.send_stats = {"datagrams": 0, "bytes": 0, "skipped": 0, "refused": 0}
         
         # Control variables
         self.thruster_speeds = [0.0] * 6
         self.drone_position = np.array([0.0, 0.0, 0.0])
         self.running = True
         self.frame_id = 0
+        # Packet format; switched to whatever the ground station offers in its hello/commands
+        self.wire_format = wire_format
         
-        # Map of object types based on HSV color ranges
-        self.color_map = {
-            "sand": [0.957, 0.894, 0.678],   # Бежевий
-            "rock": [0.502, 0.502, 0.502],   # Сірий
-            "coral": [1.0, 0.412, 0.706],    # Рожевий
-            "reef": [0.0, 0.502, 0.0],       # Зелений
-            "empty": [0.0, 0.0, 0.0]         # Чорний
+        # Camera stream settings and datagram size, adapted to the ground station's link reports
+        self.stream = StreamController(self.camera.width, self.camera.height, self.camera.fps,
+                                       self.camera.jpeg_quality, target_bitrate=target_bitrate,
+                                       max_loss=max_loss, mtu=mtu, dest_ip=self.udp_host, log=self.logger.log)
+        self.logger.log("Path MTU %d, max datagram %d bytes", self.stream.mtu, self.stream.max_datagram)
+        # Chunks of the last few frames, resent when the ground station NACKs them
+        self.chunk_cache = ChunkCache(cache_frames)
+
+        # Terrain type from HSV range tables, evaluated per tile on the raw frame
+        self.terrain_classifier = TerrainClassifier()
+
+        # Each sensor is sampled by its own loop task into a ring buffer, the blocking reads
+        # running in a thread pool; main() sends the latest samples at fixed rates (sensor
+        # packets at sensor_rate, frames at the stream's fps)
+        self.sensor_rate = sensor_rate
+        self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="sensor")
+        self.sensors = {
+            "imu": SensorTask("imu", self.imu.get_data, imu_rate, on_error=self.sensor_error, executor=self.executor),
+            "sonar": SensorTask("sonar", self.read_sonar, sonar_rate, on_error=self.sensor_error,
+                                executor=self.executor),
+            "camera": SensorTask("camera", self.read_camera, self.camera.fps, RingBuffer(4),
+                                 on_error=self.sensor_error, executor=self.executor),
         }
+        self.last_sent_frame = 0
+        self.camera_task = None
 
+        # Per-stage latency histograms (µs) and counters; served over HTTP on metrics_port
+        # and/or dumped to metrics_file as JSON while running
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+        self.metrics = {
+            "capture": REGISTRY.histogram("camera.capture_us"),
+            "classify": REGISTRY.histogram("camera.classify_us"),
+            "encode": REGISTRY.histogram("camera.encode_us"),
+            "send": REGISTRY.histogram("camera.send_us"),
+            "collect": REGISTRY.histogram("sensor.collect_us"),
+            "control": REGISTRY.histogram("control.handle_us"),
+            "frames": REGISTRY.counter("tx.frames"),
+            "datagrams": REGISTRY.counter("tx.datagrams"),
+            "bytes": REGISTRY.counter("tx.bytes"),
+            "level": REGISTRY.gauge("stream.level"),
+            "loss": REGISTRY.gauge("stream.loss"),
+        }
+        # Per-frame stage times (JSON lines) for offline end-to-end latency analysis
+        self.trace_file = trace_file
 
-        
-        # Start control command listener
-        self.control_thread = threading.Thread(target=self.receive_control_commands)
-        self.control_thread.daemon = True
-        self.control_thread.start()
-
-    def receive_control_commands(self):
-        while self.running:
-            try:
-                data, addr = self.udp_socket.recvfrom(1024)
-                self.logger.log(f"Raw data received from {addr}: {data.decode()}")
-                control_data = json.loads(data.decode())
-                self.thruster_speeds = control_data.get("thruster_speeds", [0.0] * 6)
-                self.logger.log(f"Received control: {self.thruster_speeds}")
-                self.apply_thruster_speeds(self.thruster_speeds)
-            except json.JSONDecodeError as e:
-                self.logger.log(f"JSON decode error: {e}")
-            except Exception as e:
-                self.logger.log(f"Control error: {e}")
+    def handle_control(self, data, addr):
+        """Control datagram from the ground station; runs on the event loop as soon as it arrives."""
+        try:
+            received = time.time()
+            start = time.perf_counter()
+            self.logger.packet("control_rx", "Raw data received from %s: %r", addr, data, size=len(data))
+            control_data = json.loads(data.decode())
+            if control_data.get("type") == protocol.PING:
+                self.send_pong(control_data, received)
+                return
+            if "formats" in control_data:
+                wire_format = protocol.negotiate(control_data["formats"])
+                if wire_format != self.wire_format:
+                    self.logger.log("Wire format negotiated: %s", wire_format)
+                    self.wire_format = wire_format
+            if control_data.get("type") == "hello":
+                return
+            if control_data.get("type") == protocol.LINK_STATS:
+                self.stream.update(control_data)
+                self.apply_stream_fps()
+                self.metrics["level"].set(self.stream.level)
+                self.metrics["loss"].set(self.stream.stats["last_loss"])
+                return
+            if control_data.get("type") == protocol.NACK:
+                self.resend_chunks(control_data.get("frames", []))
+                return
+            self.thruster_speeds = control_data.get("thruster_speeds", [0.0] * 6)
+            self.apply_thruster_speeds(self.thruster_speeds)
+            self.metrics["control"].record_seconds(time.perf_counter() - start)
+        except json.JSONDecodeError as e:
+            self.logger.limited("control-json", 5.0, "JSON decode error: %s", e)
+        except Exception as e:
+            self.logger.limited("control", 5.0, "Control error: %s", e)
+
+    def send_pong(self, ping, received):
+        """Answer a clock-sync ping with our receive and send times."""
+        pong = {"type": protocol.PONG, "id": ping.get("id"), "t0": ping.get("t0"), "t1": received}
+        pong["t2"] = time.time()
+        self.send_datagrams([json.dumps(pong).encode()])
+
+    def on_socket_error(self, exc):
+        if isinstance(exc, ConnectionRefusedError):
+            # Nothing listening on the ground side yet (ICMP port unreachable)
+            self.send_stats["refused"] += 1
+        else:
+            self.logger.limited("socket", 5.0, "Socket error: %s", exc)
+
+    def sensor_error(self, message):
+        self.logger.limited("sensor-read", 5.0, "%s", message)
 
     def apply_thruster_speeds(self, speeds):
-        self.logger.log(f"Applying thruster speeds: {speeds}")
         dt = 0.1
         velocity = np.array([speeds[0], speeds[1], speeds[4]])
-        self.drone_position += velocity * dt
-        self.logger.log(f"Updated position: {self.drone_position}")
+        # A new array rather than in-place: sonar reads in the executor see either the old
+        # position or the new one, never a half-updated array
+        self.drone_position = self.drone_position + velocity * dt
+        self.logger.packet("thrust", "Applied thruster speeds %s, position %s", speeds, self.drone_position)
 
-    def classify_terrain(self, frame_base64):
+    def classify_terrain(self, frame):
+        """Classify the raw BGR frame (before JPEG encoding)."""
         try:
-            if not frame_base64:
-                raise ValueError("Empty frame_base64")
-            img_data = base64.b64decode(frame_base64)
-            nparr = np.frombuffer(img_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if frame is None:
-                raise ValueError("Failed to decode image")
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            mean_hsv = np.mean(hsv, axis=(0, 1))
-            for terrain, (lower, upper) in self.color_map.items():
-                lower = np.array(lower, dtype=np.uint8)
-                upper = np.array(upper, dtype=np.uint8)
-                if (lower[0] <= mean_hsv[0] <= upper[0] and
-                    lower[1] <= mean_hsv[1] <= upper[1] and
-                    lower[2] <= mean_hsv[2] <= upper[2]):
-                    return terrain
-            return "empty"
+            if frame is None or frame.size == 0:
+                raise ValueError("Empty frame")
+            return self.terrain_classifier.classify(frame)
         except Exception as e:
-            self.logger.log(f"Terrain classification error: {e}")
+            self.logger.limited("terrain", 5.0, "Terrain classification error: %s", e)
             return "empty"
 
-    def send_image_chunks(self, frame_base64, dest_ip="127.0.0.1"):
-        # chunk_size = 4000 для MTU ≥ 4000 (оптоволокно). Якщо MTU = 1500 (Ethernet), використовуйте 1472.
-        chunk_size = 4000
-        frame_id = self.frame_id
-        total_chunks = (len(frame_base64) + chunk_size - 1) // chunk_size
-        
-        for i in range(total_chunks):
-            start = i * chunk_size
-            end = min(start + chunk_size, len(frame_base64))
-            chunk = frame_base64[start:end]
-            chunk_data = {
-                "type": "image_chunk",
-                "frame_id": frame_id,
-                "chunk_index": i,
-                "total_chunks": total_chunks,
-                "data": chunk
-            }
-            try:
-                message = json.dumps(chunk_data)
-                if len(message) > 4000:
-                    self.logger.log(f"Warning: Chunk size {len(message)} exceeds 4000 bytes")
-                self.udp_socket.sendto(message.encode(), (dest_ip, self.udp_send_port))
-                self.logger.log(f"Sent chunk {i+1}/{total_chunks} for frame {frame_id} (size: {len(message)} bytes)")
-            except Exception as e:
-                self.logger.log(f"Chunk send error: {e}")
-
-    def collect_sensor_data(self):
+    def latest_sample(self, name, read):
+        """Newest buffered sample of a sensor, or a direct read if nothing is buffered yet."""
+        latest = self.sensors[name].buffer.latest()
+        return latest[2] if latest is not None else read()
+
+    def read_sonar(self):
+        quat = self.latest_sample("imu", self.imu.get_data)["quaternion"]
+        return self.sonar.get_data(self.drone_position, quat)
+
+    def read_camera(self):
+        """Capture once, classify the raw frame and encode it for the stream."""
+        # Wall-clock capture time goes out in the chunk headers as the frame's timestamp
+        captured_at = time.time()
+        start = time.perf_counter()
+        frame = self.camera.get_raw_frame()
+        captured = time.perf_counter()
+        object_type = self.classify_terrain(frame)
+        classified = time.perf_counter()
+        jpeg = self.stream.encode(frame)
+        encoded = time.perf_counter()
+        self.metrics["capture"].record_seconds(captured - start)
+        self.metrics["classify"].record_seconds(classified - captured)
+        self.metrics["encode"].record_seconds(encoded - classified)
+        trace = {"capture": captured_at, "capture_ms": (captured - start) * 1000,
+                 "classify_ms": (classified - captured) * 1000, "encode_ms": (encoded - classified) * 1000,
+                 "encoded": captured_at + (encoded - start)}
+        return {"jpeg": jpeg, "object_type": object_type, "trace": trace}
+
+    def apply_stream_fps(self):
+        """Capture, classify/encode and send at the stream controller's current frame rate."""
+        if self.camera_task is None or self.camera_task.period == 1.0 / self.stream.fps:
+            return
+        self.camera_task.set_rate(self.stream.fps)
+        self.sensors["camera"].set_rate(self.stream.fps)
+
+    def send_camera_frame(self):
+        """Send the newest captured frame, unless it has already been sent."""
+        latest = self.sensors["camera"].buffer.latest()
+        if latest is None or latest[1] == self.last_sent_frame:
+            return
+        _, seq, sample = latest
+        self.last_sent_frame = seq
+        trace = sample["trace"]
+        sent = time.time()
+        start = time.perf_counter()
+        self.send_image_chunks(sample["jpeg"], frame_id=seq, timestamp=trace["capture"])
+        send_time = time.perf_counter() - start
+        self.metrics["send"].record_seconds(send_time)
+        self.metrics["frames"].inc()
+        TRACE.record("camera_tx", seq, capture=trace["capture"], capture_ms=trace["capture_ms"],
+                     classify_ms=trace["classify_ms"], encode_ms=trace["encode_ms"],
+                     queue_ms=(sent - trace["encoded"]) * 1000, send_ms=send_time * 1000, sent=sent,
+                     bytes=len(sample["jpeg"]))
+
+    def send_sensor_packet(self):
+        with self.metrics["collect"].time():
+            data = self.collect_sensor_data()
+        self.send_sensor_data(data)
+
+    def send_datagrams(self, messages):
+        """Queue a burst of datagrams on the telemetry endpoint in one pass, without yielding."""
+        if self.telemetry is None or self.telemetry.transport is None:
+            return 0
+        if self.telemetry.paused:
+            # The kernel send buffer is full; skip the burst rather than queue stale data
+            self.send_stats["skipped"] += len(messages)
+            return 0
+        transport = self.telemetry.transport
+        for message in messages:
+            transport.sendto(message)
+        size = sum(len(message) for message in messages)
+        self.send_stats["datagrams"] += len(messages)
+        self.send_stats["bytes"] += size
+        self.metrics["datagrams"].inc(len(messages))
+        self.metrics["bytes"].inc(size)
+        return len(messages)
+
+    def send_image_chunks(self, jpeg_bytes, frame_id=None, timestamp=None):
+        # Datagram size follows the path MTU, shrunk by the stream controller under loss
+        max_datagram = self.stream.datagram_size
+        frame_id = self.frame_id if frame_id is None else frame_id
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.wire_format == protocol.FORMAT_BINARY:
+            # Raw JPEG bytes behind a fixed header
+            payload = memoryview(jpeg_bytes)
+            chunk_size = max_datagram - protocol.HEADER.size
+            encode = protocol.encode_image_chunk
+        else:
+            # JSON fallback: the base64 text is what gets chunked
+            payload = protocol.b64encode_frame(jpeg_bytes)
+            chunk_size = max_datagram - protocol.JSON_CHUNK_OVERHEAD
+            encode = protocol.encode_image_chunk_json
+        total_chunks = (len(payload) + chunk_size - 1) // chunk_size
+        messages = [encode(frame_id, i, total_chunks, payload[i * chunk_size:(i + 1) * chunk_size], timestamp)
+                    for i in range(total_chunks)]
+        self.chunk_cache.put(frame_id, messages)
+
+        for i, message in enumerate(messages):
+            if len(message) > max_datagram:
+                self.logger.limited("chunk-size", 10.0, "Chunk size %d exceeds %d bytes", len(message), max_datagram)
+            self.logger.packet("chunk_tx", "Sent chunk %d/%d for frame %d (size: %d bytes)",
+                               i + 1, total_chunks, frame_id, len(message), size=len(message))
+        try:
+            self.send_datagrams(messages)
+        except Exception as e:
+            self.logger.limited("chunk-send", 5.0, "Chunk send error: %s", e)
+
+    def resend_chunks(self, frames):
+        """Resend the cached chunks listed in a ground station NACK."""
+        messages = self.chunk_cache.lookup(frames)
         try:
-            camera_frame = self.camera.get_frame()
-            imu_data = self.imu.get_data()
-            quat = imu_data["quaternion"]
-            sonar_data = self.sonar.get_data(self.drone_position, quat)
-            sonar_data["object_type"] = self.classify_terrain(camera_frame)
+            self.send_datagrams(messages)
+        except Exception as e:
+            self.logger.limited("chunk-send", 5.0, "Chunk resend error: %s", e)
+        self.logger.packet("nack", "NACK: resent %d chunks, cache stats %s", len(messages), self.chunk_cache.stats,
+                           size=len(messages))
+
+    def collect_sensor_data(self, camera_frame=None):
+        try:
+            imu_data = self.latest_sample("imu", self.imu.get_data)
+            sonar_data = dict(self.latest_sample("sonar", self.read_sonar))
+            if camera_frame is not None:
+                sonar_data["object_type"] = self.classify_terrain(camera_frame)
+            else:
+                sonar_data["object_type"] = self.latest_sample("camera", self.read_camera)["object_type"]
             self.frame_id += 1
             
             return {
@@ -134,7 +321,7 @@ class UnderwaterDrone:
                 "frame_id": self.frame_id
             }
         except Exception as e:
-            self.logger.log(f"Error collecting sensor data: {e}")
+            self.logger.limited("collect", 5.0, "Error collecting sensor data: %s", e)
             return {
                 "timestamp": time.time(),
                 "imu": {"quaternion": [0.0, 0.0, 0.0, 1.0]},
@@ -143,31 +330,107 @@ class UnderwaterDrone:
                 "frame_id": self.frame_id
             }
 
-    def send_sensor_data(self, data, dest_ip="127.0.0.1"):
+    def send_sensor_data(self, data):
         try:
-            message = json.dumps(data)
+            if self.wire_format == protocol.FORMAT_BINARY:
+                message = protocol.encode_sensor(data)
+            else:
+                message = protocol.encode_sensor_json(data)
             if len(message) > 1500:
-                self.logger.log(f"Warning: Message size {len(message)} exceeds 1500 bytes")
-            self.udp_socket.sendto(message.encode(), (dest_ip, self.udp_send_port))
-            self.logger.log(f"Sent sensor data to {dest_ip}:{self.udp_send_port} (size: {len(message)} bytes)")
+                self.logger.limited("sensor-size", 10.0, "Message size %d exceeds 1500 bytes", len(message))
+            self.send_datagrams([message])
+            self.logger.packet("sensor_tx", "Sent sensor data to %s:%d (size: %d bytes)",
+                               self.udp_host, self.udp_send_port, len(message), size=len(message))
         except Exception as e:
-            self.logger.log(f"Send error: {e}")
+            self.logger.limited("sensor-send", 5.0, "Send error: %s", e)
+
+    async def main(self):
+        """Event loop body: endpoints, sensor tasks and the fixed-rate send tasks until stop()."""
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        if not self.running:
+            return
+        _, self.control = await self.loop.create_datagram_endpoint(
+            lambda: DroneProtocol(self.handle_control, self.on_socket_error),
+            local_addr=(self.udp_host, self.udp_recv_port))
+        telemetry_transport, self.telemetry = await self.loop.create_datagram_endpoint(
+            lambda: DroneProtocol(on_error=self.on_socket_error),
+            remote_addr=(self.udp_host, self.udp_send_port))
+        # Room for whole chunk bursts, so a frame rarely hits back-pressure mid-burst
+        telemetry_transport.get_extra_info("socket").setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+
+        for sensor in self.sensors.values():
+            sensor.start()
+        self.camera_task = PeriodicTask("camera-send", self.stream.fps, self.send_camera_frame)
+        sender = PeriodicTask("sensor-send", self.sensor_rate, self.send_sensor_packet)
+        http_server = start_http_server(self.metrics_port) if self.metrics_port else None
+        if self.trace_file:
+            TRACE.open(self.trace_file)
+        reporter = MetricsReporter(self.metrics_file).start() if self.metrics_file else None
+        tasks = [self.loop.create_task(sender.run(), name="sensor-send"),
+                 self.loop.create_task(self.camera_task.run(), name="camera-send"),
+                 self.loop.create_task(report_stats(
+                     [sender.stats, self.camera_task.stats] + [s.stats for s in self.sensors.values()],
+                     10.0, self.logger.log), name="stats")]
+        try:
+            await self.stopped.wait()
+        finally:
+            self.running = False
+            for sensor in self.sensors.values():
+                sensor.stop()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.control.transport.close()
+            self.telemetry.transport.close()
+            self.executor.shutdown(wait=False)
+            if http_server is not None:
+                http_server.shutdown()
+            if reporter is not None:
+                reporter.stop()
+            TRACE.close()
+            self.logger.log("Send stats: %s", self.send_stats)
 
     def run(self):
         self.logger.log("Starting underwater drone...")
-        while self.running:
-            try:
-                sensor_data = self.collect_sensor_data()
-                camera_frame = self.camera.get_frame()
-                self.send_sensor_data(sensor_data)
-                self.send_image_chunks(camera_frame)
-                time.sleep(0.1)
-            except KeyboardInterrupt:
-                self.running = False
-                self.logger.log("Shutting down...")
-                break
-        self.udp_socket.close()
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            self.logger.log("Shutting down...")
+        finally:
+            self.logger.close()
+
+    def stop(self):
+        """Stop the event loop; safe to call from any thread."""
+        self.running = False
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.stopped.set)
 
 if __name__ == "__main__":
-    drone = UnderwaterDrone()
+    import argparse
+    parser = argparse.ArgumentParser(description="Underwater drone simulator")
+    parser.add_argument("--width", type=int, default=160, help="camera frame width")
+    parser.add_argument("--height", type=int, default=120, help="camera frame height")
+    parser.add_argument("--fps", type=float, default=10, help="camera frame rate")
+    parser.add_argument("--jpeg-quality", type=int, default=20, help="JPEG quality (0-100)")
+    parser.add_argument("--sensor-rate", type=float, default=20.0, help="sensor packet send rate (Hz)")
+    parser.add_argument("--imu-rate", type=float, default=50.0, help="IMU sampling rate (Hz)")
+    parser.add_argument("--sonar-rate", type=float, default=20.0, help="sonar sampling rate (Hz)")
+    parser.add_argument("--mtu", type=int, default=None, help="path MTU in bytes (probed when omitted)")
+    parser.add_argument("--target-bitrate", type=int, default=2000000, help="camera stream budget (bit/s)")
+    parser.add_argument("--max-loss", type=float, default=0.05, help="tolerated dropped-frame ratio")
+    parser.add_argument("--cache-frames", type=int, default=8, help="frames kept for chunk retransmission")
+    parser.add_argument("--per-packet-log", action="store_true", help="log every packet instead of summaries")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve metrics JSON on this local HTTP port")
+    parser.add_argument("--metrics-file", default=None, help="dump metrics JSON to this file every 5 s")
+    parser.add_argument("--trace-file", default=None, help="append per-frame latency traces (JSON lines) to this file")
+    args = parser.parse_args()
+
+    camera = MockCamera(width=args.width, height=args.height, fps=args.fps, jpeg_quality=args.jpeg_quality)
+    drone = UnderwaterDrone(camera=camera, sensor_rate=args.sensor_rate, imu_rate=args.imu_rate,
+                            sonar_rate=args.sonar_rate, mtu=args.mtu, target_bitrate=args.target_bitrate,
+                            max_loss=args.max_loss, cache_frames=args.cache_frames,
+                            per_packet_log=args.per_packet_log, metrics_port=args.metrics_port,
+                            metrics_file=args.metrics_file, trace_file=args.trace_file)
     drone.run()
@@ -1,39 +1,79 @@
 # mock/camera.py
+import time
 import numpy as np
 import cv2
 import base64
 
 class MockCamera:
-    def __init__(self):
-        self.width = 160
-        self.height = 120
+    def __init__(self, width=160, height=120, fps=10, jpeg_quality=20, realtime=False, noise_pool_size=8, seed=None):
+        """
+        :param width, height: frame resolution in pixels
+        :param fps: nominal frame rate; with realtime=True get_raw_frame() blocks to keep it
+        :param jpeg_quality: JPEG quality (0-100) used by encode()
+        :param noise_pool_size: number of precomputed noise fields cycled between frames
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.jpeg_quality = jpeg_quality
+        self.realtime = realtime
         self.frame_count = 0
+        self.next_frame_time = None
+        self.rng = np.random.default_rng(seed)
+
+        # Blue-green gradient for depth effect (darker at bottom), BGR
+        depth = np.arange(self.height) / self.height
+        self.base = np.empty((self.height, self.width, 3), dtype=np.int16)
+        self.base[:, :, 0] = (50 + 100 * depth).astype(np.int16)[:, None]
+        self.base[:, :, 1] = (70 + 80 * depth).astype(np.int16)[:, None]
+        self.base[:, :, 2] = 20
+
+        # Sea floor texture: drawing fresh normal noise per frame dominates the cost at 720p,
+        # so a few noise fields are generated once and picked at random
+        self.noise_pool = [
+            self.rng.normal(0, 25, (self.height, self.width, 3)).astype(np.int16)
+            for _ in range(max(1, noise_pool_size))
+        ]
+
+        # Wave pattern is separable: cos over rows times sin over (shifted) columns
+        self.wave_rows = 10 * np.cos(np.arange(self.height) / 30.0)
+        self.wave_cols = np.arange(self.width)
+        self.work = np.empty((self.height, self.width, 3), dtype=np.int16)
 
     def get_frame(self):
-        """Simulate a camera frame resembling a sea floor and encode as JPEG."""
+        """Return a simulated frame as a base64-encoded JPEG string."""
+        return base64.b64encode(self.get_jpeg()).decode('utf-8')
+
+    def get_jpeg(self):
+        """Simulate a camera frame resembling a sea floor and encode as JPEG bytes."""
+        return self.encode(self.get_raw_frame())
+
+    def encode(self, frame):
+        """Encode a BGR frame as JPEG bytes with the configured quality."""
+        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        return buffer.tobytes()
+
+    def get_raw_frame(self):
+        """Simulate a camera frame resembling a sea floor as a BGR uint8 ndarray."""
+        if self.realtime:
+            self._wait_next_frame()
         self.frame_count += 1
 
-        # Create a base blue-green gradient for sea floor effect
-        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-        
-        # Generate a smooth gradient for depth effect (darker at bottom)
-        for i in range(self.height):
-            blue = int(50 + 100 * (i / self.height))
-            green = int(70 + 80 * (i / self.height))
-            frame[i, :] = [blue, green, 20]
-
-        # Add noise to simulate sea floor texture
-        noise = np.random.normal(0, 25, (self.height, self.width, 3)).astype(np.int16)
-        frame = frame.astype(np.int16) + noise
-        frame = np.clip(frame, 0, 255).astype(np.uint8)
-
-        # Add subtle wave-like patterns
-        for i in range(self.height):
-            for j in range(self.width):
-                wave = int(10 * np.sin((j + self.frame_count) / 20.0) * np.cos(i / 30.0))
-                temp = frame[i, j].astype(np.int16) + wave
-                frame[i, j] = np.clip(temp, 0, 255).astype(np.uint8)
-
-        # Encode as JPEG with very low quality to reduce size
-        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 20])
-        return base64.b64encode(buffer).decode('utf-8')
+        # Gradient plus noise to simulate sea floor texture
+        noise = self.noise_pool[self.rng.integers(len(self.noise_pool))]
+        np.add(self.base, noise, out=self.work)
+        np.clip(self.work, 0, 255, out=self.work)
+
+        # Add subtle wave-like patterns (truncated towards zero like int())
+        wave = np.outer(self.wave_rows, np.sin((self.wave_cols + self.frame_count) / 20.0)).astype(np.int16)
+        self.work += wave[:, :, None]
+        np.clip(self.work, 0, 255, out=self.work)
+        return self.work.astype(np.uint8)
+
+    def _wait_next_frame(self):
+        now = time.monotonic()
+        if self.next_frame_time is None or now - self.next_frame_time > 1.0:
+            self.next_frame_time = now
+        elif self.next_frame_time > now:
+            time.sleep(self.next_frame_time - now)
+        self.next_frame_time += 1.0 / self.fps
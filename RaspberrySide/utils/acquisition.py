@@ -0,0 +1,162 @@
+# utils/acquisition.py
+# Опитування сенсорів із фіксованою частотою в циклі подій asyncio: задача кожного сенсора
+# заповнює кільцевий буфер вибірками з мітками часу (блокуючі читання — в executor), а задачі
+# надсилання працюють зі своїми частотами в тому ж циклі.
+#
+# Кожна періодична задача тримає дедлайни на абсолютній сітці (наступний = попередній + період),
+# тож час обробки не накопичується в дрейф. Запуск, запізнілий більше ніж на період, — це
+# перевантаження (overrun): пропущені періоди відкидаються, а не виконуються підряд.
+import time
+import asyncio
+import inspect
+import threading
+from collections import deque
+
+
+class RingBuffer:
+    """Буфер (timestamp, seq, sample) сталої місткості; найстаріші вибірки перезаписуються."""
+
+    def __init__(self, capacity=64):
+        self.items = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.overwritten = 0
+
+    def push(self, sample, timestamp=None):
+        with self.lock:
+            self.seq += 1
+            if len(self.items) == self.items.maxlen:
+                self.overwritten += 1
+            self.items.append((time.time() if timestamp is None else timestamp, self.seq, sample))
+            return self.seq
+
+    def latest(self):
+        """Найновіший (timestamp, seq, sample) або None."""
+        with self.lock:
+            return self.items[-1] if self.items else None
+
+    def since(self, seq):
+        """Усі записи, новіші за seq, від найстарішого."""
+        with self.lock:
+            return [item for item in self.items if item[1] > seq]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+
+class RateStats:
+    """Джитер запуску та лічильники перевантажень періодичної задачі."""
+
+    def __init__(self, name, period):
+        self.name = name
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+        self.busy = 0.0
+        self.window_start = time.monotonic()
+
+    def record(self, lateness, duration, skipped):
+        self.runs += 1
+        self.jitter_sum += lateness
+        self.jitter_max = max(self.jitter_max, lateness)
+        self.busy += duration
+        if skipped:
+            self.overruns += 1
+            self.skipped += skipped
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.window_start, 1e-9)
+        mean_jitter = self.jitter_sum / self.runs if self.runs else 0.0
+        return (f"{self.name}: {self.runs / elapsed:.1f}/{1.0 / self.period:.1f} Hz, "
+                f"jitter mean {mean_jitter * 1000:.2f} ms max {self.jitter_max * 1000:.2f} ms, "
+                f"overruns {self.overruns} (skipped {self.skipped}), load {self.busy / elapsed:.0%}")
+
+
+class PeriodicTask:
+    """Функція (звичайна або корутина), що запускається кожні period секунд за абсолютною сіткою дедлайнів."""
+
+    def __init__(self, name, rate_hz, func):
+        self.name = name
+        self.period = 1.0 / rate_hz
+        self.func = func
+        self.deadline = None
+        self.stats = RateStats(name, self.period)
+
+    def set_rate(self, rate_hz):
+        """Зміна частоти: найближчий дедлайн лишається за старим періодом, наступні — за новим."""
+        self.period = 1.0 / rate_hz
+        self.stats.period = self.period
+
+    async def run_due(self, now):
+        lateness = now - self.deadline
+        start = time.monotonic()
+        result = self.func()
+        if inspect.isawaitable(result):
+            await result
+        duration = time.monotonic() - start
+        # Пропущені періоди відкидаються: наступний дедлайн лишається на сітці, після now
+        skipped = int(lateness // self.period)
+        self.deadline += (skipped + 1) * self.period
+        self.stats.record(lateness, duration, skipped)
+
+    async def run(self):
+        """Виконання до скасування."""
+        self.deadline = time.monotonic()
+        while True:
+            delay = self.deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.run_due(time.monotonic())
+
+
+class SensorTask:
+    """Опитування read() із фіксованою частотою в RingBuffer; блокуюче читання — в executor."""
+
+    def __init__(self, name, read, rate_hz, buffer=None, on_error=None, executor=None):
+        self.task = PeriodicTask(name, rate_hz, self._sample)
+        self.read = read
+        self.buffer = buffer if buffer is not None else RingBuffer()
+        self.on_error = on_error
+        self.executor = executor
+        self.handle = None
+
+    @property
+    def stats(self):
+        return self.task.stats
+
+    def set_rate(self, rate_hz):
+        self.task.set_rate(rate_hz)
+
+    async def _sample(self):
+        try:
+            sample = await asyncio.get_running_loop().run_in_executor(self.executor, self.read)
+            self.buffer.push(sample)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(f"{self.task.name} read error: {e}")
+
+    def start(self):
+        """Запуск опитування в поточному циклі подій."""
+        if self.handle is None:
+            self.handle = asyncio.get_running_loop().create_task(self.task.run(), name=f"sensor-{self.task.name}")
+
+    def stop(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+
+async def report_stats(stats, interval, report):
+    """Звіт і скидання RateStats кожні interval секунд до скасування."""
+    while True:
+        await asyncio.sleep(interval)
+        for item in stats:
+            report(item.summary())
+            item.reset()
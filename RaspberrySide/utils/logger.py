@@ -1,15 +1,35 @@
 # Logger utility
 
 import logging
+from utils.log_tools import PacketLog, start_queue_logging
 
 class Logger:
-    def __init__(self, log_file):
+    def __init__(self, log_file, per_packet=None, summary_interval=10.0):
+        """
+        :param per_packet: write every packet-level line instead of periodic summaries
+        """
         self.logger = logging.getLogger("UnderwaterDrone")
         self.logger.setLevel(logging.INFO)
         handler = logging.FileHandler(log_file)
         formatter = logging.Formatter("%(asctime)s - %(message)s")
         handler.setFormatter(formatter)
         self.logger.addHandler(handler)
+        # The file is written by a background thread; callers only enqueue records
+        self.listener = start_queue_logging(self.logger)
+        self.packets = PacketLog(self.logger, per_packet, summary_interval)
 
-    def log(self, message):
-        self.logger.info(message)
+    def log(self, message, *args):
+        """Log a line; %-style args are only formatted when the line is written."""
+        self.logger.info(message, *args)
+
+    def packet(self, key, message=None, *args, size=0):
+        """Packet-level event: logged per packet or counted into the periodic summary."""
+        self.packets.event(key, message, *args, size=size)
+
+    def limited(self, key, interval, message, *args):
+        """Warning written at most once per interval seconds for key."""
+        self.packets.limited(key, interval, logging.WARNING, message, *args)
+
+    def close(self):
+        self.packets.flush()
+        self.listener.stop()
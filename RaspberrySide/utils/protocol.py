@@ -0,0 +1,138 @@
+# protocol.py
+# Бінарний формат пакетів, спільний для дрона й наземної станції.
+# Дзеркальна копія: ComputerSide/src/protocol.py — зміни вносити в обидві.
+import base64
+import json
+import struct
+
+MAGIC = b"UD"
+VERSION = 1
+
+# magic, version, type, frame_id, chunk_index, total_chunks, timestamp
+# (timestamp — час дрона: захоплення кадру для чанків зображення, збирання даних для пакетів сенсорів)
+HEADER = struct.Struct("!2sBBIHHd")
+
+TYPE_SENSOR = 1
+TYPE_IMAGE_CHUNK = 2
+
+# quaternion[4], point[3], distance, код object_type, thruster_speeds[6]
+SENSOR_PAYLOAD = struct.Struct("!4f3dfB6f")
+
+OBJECT_TYPES = ("sand", "rock", "coral", "reef", "empty")
+OBJECT_CODES = {name: code for code, name in enumerate(OBJECT_TYPES)}
+
+FORMAT_BINARY = "binary"
+FORMAT_JSON = "json"
+SUPPORTED_FORMATS = (FORMAT_BINARY, FORMAT_JSON)
+# Верхня межа розміру JSON-обгортки навколо base64-даних чанка зображення
+JSON_CHUNK_OVERHEAD = 160
+# Повідомлення каналу керування зі статистикою каналу камери від наземної станції
+LINK_STATS = "link_stats"
+# Запит каналу керування на повторне надсилання втрачених чанків зображення:
+# {"type": "nack", "frames": [[frame_id, [chunk_index, ...]], ...]}
+NACK = "nack"
+# Індексів чанків на одне повідомлення NACK, щоб воно вмістилося в 1024-байтовий буфер прийому керування дрона
+MAX_NACK_CHUNKS = 100
+# Синхронізація годинників каналом керування: станція надсилає {"type": "ping", "id", "t0"},
+# дрон відповідає каналом телеметрії {"type": "pong", "id", "t0", "t1", "t2"}
+# (t1 — прибуття ping, t2 — відправлення pong, обидва за годинником дрона)
+PING = "ping"
+PONG = "pong"
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def negotiate(offered):
+    """Перший запропонований співрозмовником формат, який ми підтримуємо; інакше JSON."""
+    for fmt in offered or ():
+        if fmt in SUPPORTED_FORMATS:
+            return fmt
+    return FORMAT_JSON
+
+
+def is_binary(datagram):
+    return datagram[:2] == MAGIC
+
+
+def encode_sensor(data):
+    imu = data["imu"]
+    sonar = data["sonar"]
+    header = HEADER.pack(MAGIC, VERSION, TYPE_SENSOR, data["frame_id"], 0, 1, data["timestamp"])
+    payload = SENSOR_PAYLOAD.pack(
+        *imu["quaternion"],
+        *sonar["point"],
+        sonar["distance"],
+        OBJECT_CODES.get(sonar["object_type"], OBJECT_CODES["empty"]),
+        *data["thruster_speeds"]
+    )
+    return header + payload
+
+
+def encode_image_chunk(frame_id, chunk_index, total_chunks, payload, timestamp):
+    return HEADER.pack(MAGIC, VERSION, TYPE_IMAGE_CHUNK, frame_id, chunk_index, total_chunks, timestamp) + payload
+
+
+def decode(datagram):
+    """Декодування бінарної датаграми в словник тієї ж форми, що й у JSON-форматі."""
+    if len(datagram) < HEADER.size:
+        raise ProtocolError(f"Datagram too short: {len(datagram)} bytes")
+    magic, version, ptype, frame_id, chunk_index, total_chunks, timestamp = HEADER.unpack_from(datagram)
+    if magic != MAGIC:
+        raise ProtocolError("Bad magic")
+    if version != VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+
+    if ptype == TYPE_IMAGE_CHUNK:
+        return {
+            "type": "image_chunk",
+            "frame_id": frame_id,
+            "chunk_index": chunk_index,
+            "total_chunks": total_chunks,
+            "timestamp": timestamp,
+            "data": memoryview(datagram)[HEADER.size:]
+        }
+
+    if ptype == TYPE_SENSOR:
+        if len(datagram) != HEADER.size + SENSOR_PAYLOAD.size:
+            raise ProtocolError(f"Bad sensor payload size: {len(datagram) - HEADER.size}")
+        values = SENSOR_PAYLOAD.unpack_from(datagram, HEADER.size)
+        code = values[8]
+        return {
+            "timestamp": timestamp,
+            "imu": {"quaternion": list(values[0:4])},
+            "sonar": {
+                "point": list(values[4:7]),
+                "distance": values[7],
+                "object_type": OBJECT_TYPES[code] if code < len(OBJECT_TYPES) else "empty"
+            },
+            "thruster_speeds": list(values[9:15]),
+            "frame_id": frame_id
+        }
+
+    raise ProtocolError(f"Unknown packet type {ptype}")
+
+
+def encode_sensor_json(data):
+    return json.dumps(data).encode()
+
+
+def encode_image_chunk_json(frame_id, chunk_index, total_chunks, payload, timestamp):
+    """Резервний JSON-формат: вміст чанка — шматок кадру в base64."""
+    return json.dumps({
+        "type": "image_chunk",
+        "frame_id": frame_id,
+        "chunk_index": chunk_index,
+        "total_chunks": total_chunks,
+        "timestamp": timestamp,
+        "data": payload
+    }).encode()
+
+
+def decode_json(datagram):
+    return json.loads(bytes(datagram).decode())
+
+
+def b64encode_frame(jpeg_bytes):
+    return base64.b64encode(jpeg_bytes).decode("ascii")
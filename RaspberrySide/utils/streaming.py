@@ -0,0 +1,161 @@
+# utils/streaming.py
+# Адаптивний потік камери за статистикою каналу, яку надсилає наземна станція.
+#
+# Станція приблизно раз на секунду надсилає {"type": "link_stats", "interval", "frames", "dropped",
+# "late", "bytes", "sensor_packets", "sensor_lost"}. Частка втрат — більша з часток відкинутих
+# або запізнілих кадрів і втрачених датаграм сенсорів (пакети сенсорів пронумеровані, тож пропуски
+# видно, навіть коли кадр уміщується в одну датаграму). StreamController рухається драбиною якості,
+# побудованою з налаштувань камери: крок униз, коли втрати чи бітрейт перевищують ціль, і крок
+# угору після кількох чистих звітів поспіль із запасом бітрейту.
+# Розмір датаграми визначає MTU шляху (виміряний або заданий); під втратами він зменшується вдвічі
+# до MIN_DATAGRAM і відновлюється, коли канал одужує.
+#
+# ChunkCache тримає закодовані датаграми чанків кількох останніх кадрів, тож чанки, про втрату
+# яких станція повідомила в NACK, надсилаються повторно без змін.
+import socket
+import threading
+from collections import OrderedDict
+import cv2
+
+UDP_IP_OVERHEAD = 28  # Заголовки IPv4 (20) + UDP (8) у байтах
+MAX_UDP_PAYLOAD = 65507
+DEFAULT_MTU = 1500
+MIN_DATAGRAM = 512
+MIN_QUALITY = 10
+MIN_WIDTH = 80
+UPGRADE_AFTER = 3  # Чистих звітів поспіль перед кроком угору
+
+
+def probe_mtu(dest_ip, default=DEFAULT_MTU):
+    """MTU шляху до dest_ip за даними ядра (Linux IP_MTU), інакше default."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.connect((dest_ip, 9))
+            return probe.getsockopt(socket.IPPROTO_IP, getattr(socket, "IP_MTU", 14))
+    except OSError:
+        return default
+
+
+def build_ladder(width, height, fps, jpeg_quality):
+    """Налаштування потоку (width, height, jpeg_quality, fps) від найкращих (заданих) до найгірших."""
+    steps = [(1.0, 1.0, 1.0), (1.0, 0.7, 1.0), (0.75, 0.7, 1.0), (0.5, 0.7, 1.0),
+             (0.5, 0.5, 0.75), (0.25, 0.5, 0.5)]
+    ladder = []
+    for scale, quality, rate in steps:
+        scale = max(scale, min(1.0, MIN_WIDTH / width))
+        level = (int(width * scale) // 2 * 2, int(height * scale) // 2 * 2,
+                 max(MIN_QUALITY, int(jpeg_quality * quality)), max(1.0, fps * rate))
+        if not ladder or level != ladder[-1]:
+            ladder.append(level)
+    return ladder
+
+
+class StreamController:
+    def __init__(self, width, height, fps, jpeg_quality, target_bitrate=2000000, max_loss=0.05,
+                 mtu=None, dest_ip="127.0.0.1", log=None):
+        """
+        :param width, height, fps, jpeg_quality: задані (найкращі) налаштування потоку камери
+        :param target_bitrate: бюджет потоку камери, біт/с
+        :param max_loss: допустима частка втрачених кадрів
+        :param mtu: MTU шляху в байтах; None — виміряти в напрямку dest_ip
+        """
+        self.ladder = build_ladder(width, height, fps, jpeg_quality)
+        self.level = 0
+        self.target_bitrate = target_bitrate
+        self.max_loss = max_loss
+        self.mtu = mtu if mtu is not None else probe_mtu(dest_ip)
+        self.max_datagram = max(MIN_DATAGRAM, min(self.mtu - UDP_IP_OVERHEAD, MAX_UDP_PAYLOAD))
+        self.datagram_size = self.max_datagram
+        self.clean_reports = 0
+        self.log = log
+        self.stats = {"reports": 0, "downgrades": 0, "upgrades": 0, "last_loss": 0.0, "last_bitrate": 0.0}
+
+    @property
+    def settings(self):
+        return self.ladder[self.level]
+
+    @property
+    def fps(self):
+        return self.settings[3]
+
+    def encode(self, frame):
+        """JPEG-байти BGR-кадру з поточною роздільністю та якістю."""
+        width, height, quality, _ = self.settings
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return buffer.tobytes()
+
+    def update(self, report):
+        """Адаптація потоку до одного звіту link_stats від наземної станції."""
+        interval = max(float(report.get("interval", 1.0)), 1e-3)
+        frames = int(report.get("frames", 0))
+        dropped = int(report.get("dropped", 0))
+        late = int(report.get("late", 0))
+        sensor_lost = int(report.get("sensor_lost", 0))
+        sensor_offered = int(report.get("sensor_packets", 0)) + sensor_lost
+        frame_loss = (dropped + late) / (frames + dropped) if frames + dropped else 0.0
+        loss = max(frame_loss, sensor_lost / sensor_offered if sensor_offered else 0.0)
+        bitrate = int(report.get("bytes", 0)) * 8 / interval
+        self.stats["reports"] += 1
+        self.stats["last_loss"] = loss
+        self.stats["last_bitrate"] = bitrate
+
+        if loss > self.max_loss or bitrate > self.target_bitrate:
+            self.clean_reports = 0
+            if loss > self.max_loss:
+                # Менші датаграми: менше втрат на один пропуск і без фрагментації, якщо MTU оцінено хибно
+                self.datagram_size = max(MIN_DATAGRAM, self.datagram_size // 2)
+            self._set_level(self.level + 1, f"loss {loss:.1%}, bitrate {bitrate / 1000:.0f} kbit/s")
+        elif loss <= self.max_loss / 2 and bitrate < 0.6 * self.target_bitrate:
+            self.clean_reports += 1
+            if self.clean_reports >= UPGRADE_AFTER:
+                self.clean_reports = 0
+                self.datagram_size = min(self.max_datagram, self.datagram_size * 2)
+                self._set_level(self.level - 1, f"loss {loss:.1%}, bitrate {bitrate / 1000:.0f} kbit/s")
+        else:
+            self.clean_reports = 0
+
+    def _set_level(self, level, reason):
+        level = max(0, min(level, len(self.ladder) - 1))
+        if level == self.level:
+            return
+        self.stats["downgrades" if level > self.level else "upgrades"] += 1
+        self.level = level
+        if self.log is not None:
+            width, height, quality, fps = self.settings
+            self.log("Stream level %d: %dx%d q%d %g fps, datagram %d B (%s)",
+                     level, width, height, quality, fps, self.datagram_size, reason)
+
+
+class ChunkCache:
+    """Закодовані датаграми чанків останніх кадрів для вибіркового повторного надсилання."""
+
+    def __init__(self, frames=8):
+        self.frames = frames
+        self.items = OrderedDict()  # frame_id -> [datagram, ...]
+        self.lock = threading.Lock()
+        self.stats = {"nacks": 0, "requested": 0, "resent": 0, "expired": 0}
+
+    def put(self, frame_id, datagrams):
+        with self.lock:
+            self.items[frame_id] = datagrams
+            self.items.move_to_end(frame_id)
+            while len(self.items) > self.frames:
+                self.items.popitem(last=False)
+
+    def lookup(self, frames):
+        """Збережені датаграми для NACK [[frame_id, [chunk_index, ...]], ...]; невідомі пропускаються."""
+        found = []
+        with self.lock:
+            self.stats["nacks"] += 1
+            for frame_id, indices in frames:
+                datagrams = self.items.get(frame_id)
+                for index in indices:
+                    self.stats["requested"] += 1
+                    if datagrams is not None and 0 <= index < len(datagrams):
+                        found.append(datagrams[index])
+                    else:
+                        self.stats["expired"] += 1
+            self.stats["resent"] += len(found)
+        return found
@@ -0,0 +1,93 @@
+# utils/terrain.py
+# Векторизована класифікація рельєфу на сирих BGR-кадрах.
+#
+# Кожен піксель маркується через таблиці пошуку по каналах: для кожного каналу HSV таблиця на
+# 256 значень містить по біту на кожен клас рельєфу, діапазон якого включає це значення, тож
+# класи-кандидати пікселя — h_lut[H] & s_lut[S] & v_lut[V]. Перемагає перший клас у порядку
+# TERRAIN_RANGES; пікселі без жодного класу — "empty". Мітки рахуються по плитках сітки, кожна
+# плитка голосує за свій домінантний клас, а кадр отримує найчастіший голос плиток.
+import cv2
+import numpy as np
+
+# Одиниці HSV в OpenCV: H 0-179, S 0-255, V 0-255. Діапазон тону може переходити через нуль (low > high).
+TERRAIN_RANGES = [
+    ("coral", (140, 10), (70, 255), (110, 255)),  # рожевий / пурпуровий
+    ("reef", (35, 85), (70, 255), (40, 255)),     # зелена рослинність
+    ("sand", (10, 35), (25, 160), (140, 255)),    # бежевий
+    ("rock", (0, 179), (0, 50), (50, 200)),       # малонасичений сірий
+]
+TERRAIN_TYPES = tuple(name for name, *_ in TERRAIN_RANGES) + ("empty",)
+EMPTY_LABEL = len(TERRAIN_TYPES) - 1
+
+
+def _range_mask(low, high, size=256):
+    values = np.arange(size)
+    if low <= high:
+        return (values >= low) & (values <= high)
+    return (values >= low) | (values <= high)
+
+
+def build_luts(ranges=TERRAIN_RANGES):
+    """Бітові таблиці каналів (3×256, uint8) і таблиця біти -> мітка (256, uint8)."""
+    if len(ranges) > 8:
+        raise ValueError(f"At most 8 terrain classes fit in the bit tables, got {len(ranges)}")
+    luts = np.zeros((3, 256), dtype=np.uint8)
+    for bit, (_, *channel_ranges) in enumerate(ranges):
+        for channel, (low, high) in enumerate(channel_ranges):
+            luts[channel, _range_mask(low, high)] |= np.uint8(1 << bit)
+    # Наймолодший встановлений біт — клас із найвищим пріоритетом; без бітів — empty
+    bits = np.arange(256)
+    first_label = np.full(256, len(ranges), dtype=np.uint8)
+    for bit in reversed(range(len(ranges))):
+        first_label[(bits >> bit) & 1 == 1] = bit
+    return luts, first_label
+
+
+class TerrainClassifier:
+    def __init__(self, grid=(4, 4), subsample=2, ranges=TERRAIN_RANGES):
+        """
+        :param grid: сітка плиток (rows, cols) для гістограм по ділянках
+        :param subsample: крок по пікселях; для кольору рельєфу повна роздільність не потрібна
+        """
+        self.grid = grid
+        self.subsample = max(1, subsample)
+        self.luts, self.first_label = build_luts(ranges)
+        # Ті самі таблиці в розкладці, яку cv2.LUT очікує для 3-канального зображення
+        self.lut3 = np.ascontiguousarray(self.luts.T.reshape(1, 256, 3))
+        self.types = tuple(name for name, *_ in ranges) + ("empty",)
+        self._tile_index = None
+
+    def _tiles_for(self, shape):
+        # Номер плитки кожного пікселя, кешований для розміру кадру
+        if self._tile_index is None or self._tile_index.shape != shape:
+            rows, cols = self.grid
+            row_tile = np.arange(shape[0]) * rows // shape[0]
+            col_tile = np.arange(shape[1]) * cols // shape[1]
+            # Уже помножений на кількість класів, тож кошик гістограми — tile_index + label
+            self._tile_index = ((row_tile[:, None] * cols + col_tile[None, :]) * len(self.types)).astype(np.int32)
+        return self._tile_index
+
+    def label(self, frame):
+        """Мітки класів (uint8) для кожного пікселя прорідженого BGR-кадру."""
+        step = self.subsample
+        hsv = cv2.cvtColor(np.ascontiguousarray(frame[::step, ::step]), cv2.COLOR_BGR2HSV)
+        h_bits, s_bits, v_bits = cv2.split(cv2.LUT(hsv, self.lut3))
+        bits = cv2.bitwise_and(cv2.bitwise_and(h_bits, s_bits), v_bits)
+        return cv2.LUT(bits, self.first_label)
+
+    def histograms(self, frame):
+        """Кількість міток по плитках: масив (rows*cols, len(types))."""
+        labels = self.label(frame)
+        tiles = self._tiles_for(labels.shape)
+        classes = len(self.types)
+        counts = np.bincount((tiles + labels).ravel(), minlength=self.grid[0] * self.grid[1] * classes)
+        return counts.reshape(-1, classes)
+
+    def classify_tiles(self, frame):
+        """Мітка домінантного класу кожної плитки, форма grid."""
+        return np.argmax(self.histograms(frame), axis=1).reshape(self.grid)
+
+    def classify(self, frame):
+        """Тип рельєфу для всього кадру: найчастіший голос плиток."""
+        votes = np.bincount(self.classify_tiles(frame).ravel(), minlength=len(self.types))
+        return self.types[int(np.argmax(votes))]
@@ -0,0 +1,198 @@
+# tracing.py
+# Наскрізне трасування затримок, спільне для дрона й наземної станції.
+# Дзеркальна копія: ComputerSide/src/tracing.py — зміни вносити в обидві.
+#
+# Ідентифікатор трасування кадру — пара (потік, frame_id), яка й так їде в кожній датаграмі;
+# мітка часу в заголовку чанка зображення — момент захоплення кадру на дроні, тож станція може
+# віднести кожен етап до моменту захоплення. Кожна сторона дописує по JSON-рядку на кадр у свій
+# файл трасування (TraceWriter, запис у фоновому потоці):
+#   camera_tx  дрон: час захоплення і тривалості capture/classify/encode/queue/send
+#   camera     станція: час першого чанка, збирання, декодування та показу
+#   sensor     станція: час надсилання на дроні, отримання, обробки та додавання до карти
+#   clock      станція: зсув годинника дрона і RTT за ping/pong каналом керування
+# Часи дрона — за годинником дрона; записи станції містять актуальну на той момент оцінку зсуву,
+# тож обидва файли об'єднуються офлайн за (frame_id, час захоплення):
+#   python ComputerSide/src/tracing.py trace_ground.jsonl [trace_drone.jsonl] [--json]
+import sys
+import json
+import queue
+import threading
+from collections import deque, defaultdict
+
+
+class TraceWriter:
+    """Файл трасування JSON-рядками; record() ніколи не блокує викликача і до open() нічого не робить."""
+
+    def __init__(self, path=None, max_queue=10000):
+        self.queue = queue.Queue(max_queue)
+        self.file = None
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+        if path:
+            self.open(path)
+
+    @property
+    def enabled(self):
+        return self.thread is not None
+
+    def open(self, path):
+        """Початок дописування записів у path."""
+        self.close()
+        self.file = open(path, "a")
+        self.thread = threading.Thread(target=self._run, name="TraceWriter", daemon=True)
+        self.thread.start()
+
+    def record(self, kind, trace_id, **fields):
+        if self.thread is None:
+            return
+        fields["kind"] = kind
+        fields["id"] = trace_id
+        try:
+            self.queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.written += 1
+            if self.queue.empty():
+                self.file.flush()
+
+    def close(self):
+        """Запис записів із черги і закриття файлу."""
+        if self.thread is None:
+            return
+        thread, self.thread = self.thread, None
+        self.queue.put(None)
+        thread.join(timeout=2.0)
+        self.file.close()
+        self.file = None
+
+
+# Спільний файл трасування процесу для інструментованих модулів; відкривається з командного рядка
+TRACE = TraceWriter()
+
+
+class ClockSync:
+    """Зсув віддаленого годинника і RTT за мітками часу ping/pong, як у NTP.
+
+    t0 — локальне надсилання, t1 — віддалене отримання, t2 — віддалене надсилання, t3 — локальне
+    отримання. offset — віддалений час мінус локальний; оцінка береться з вибірки з найменшим RTT
+    в останньому вікні, похибка зсуву якої не більша за половину її RTT.
+    """
+
+    def __init__(self, window=16):
+        self.samples = deque(maxlen=window)
+        self.offset = None
+        self.rtt = None
+
+    def add(self, t0, t1, t2, t3):
+        """Додавання одного обміну; повертає його (offset, rtt) у секундах."""
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.samples.append((rtt, offset))
+        self.rtt, self.offset = min(self.samples)
+        return offset, rtt
+
+    def to_local(self, remote_time):
+        """Віддалена мітка часу за локальним годинником або None без оцінки."""
+        if self.offset is None or remote_time is None:
+            return None
+        return remote_time - self.offset
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def read_records(paths):
+    records = defaultdict(list)
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Останній рядок файлу, що ще записується
+                records[record.get("kind")].append(record)
+    return records
+
+
+def summarize(paths):
+    """Статистика затримок по етапах (мс) з одного чи кількох файлів трасування."""
+    records = read_records(paths)
+    sent = {(r["id"], r["capture"]): r for r in records["camera_tx"]}
+    stages = defaultdict(list)
+
+    def add(stage, end, start):
+        if end is not None and start is not None:
+            stages[stage].append((end - start) * 1000)
+
+    for r in records["camera_tx"]:
+        for stage in ("capture", "classify", "encode", "queue", "send"):
+            stages[f"camera.{stage}"].append(r[f"{stage}_ms"])
+    displayed = 0
+    for r in records["camera"]:
+        tx = sent.get((r["id"], r["capture"]))
+        offset = r.get("offset")
+        if tx is not None and offset is not None:
+            add("camera.network", r["first_chunk"], tx["sent"] - offset)
+        add("camera.assembly", r["assembled"], r["first_chunk"])
+        add("camera.decode", r["decoded"], r["assembled"])
+        add("camera.display", r["displayed"], r["decoded"])
+        if offset is not None and r["capture"] is not None:
+            add("camera.glass_to_glass", r["displayed"], r["capture"] - offset)
+        displayed += 1
+    mapped = 0
+    for r in records["sensor"]:
+        origin = r["sent"] - r["offset"] if r.get("offset") is not None else None
+        add("sensor.network", r["received"], origin)
+        add("sensor.queue", r["processed"], r["received"])
+        if r.get("mapped") is not None:
+            add("sensor.sonar_to_map", r["mapped"], origin)
+            mapped += 1
+
+    summary = {"frames_sent": len(sent), "frames_displayed": displayed, "sensor_packets": len(records["sensor"]),
+               "sensor_mapped": mapped, "stages": {}}
+    for stage, values in stages.items():
+        summary["stages"][stage] = {"count": len(values), "mean": sum(values) / len(values),
+                                    "p50": percentile(values, 50), "p90": percentile(values, 90),
+                                    "p99": percentile(values, 99), "max": max(values)}
+    clock = records["clock"]
+    if clock:
+        rtts = [r["rtt"] * 1000 for r in clock]
+        summary["clock"] = {"samples": len(clock), "offset_ms": clock[-1]["offset"] * 1000,
+                            "rtt_min_ms": min(rtts), "rtt_p50_ms": percentile(rtts, 50)}
+    return summary
+
+
+def main(argv):
+    paths = [arg for arg in argv if not arg.startswith("--")]
+    if not paths:
+        print("Usage: tracing.py TRACE_FILE [TRACE_FILE ...] [--json]")
+        return 1
+    summary = summarize(paths)
+    if "--json" in argv:
+        print(json.dumps(summary, indent=1))
+        return 0
+    print(f"Frames: {summary['frames_sent']} sent, {summary['frames_displayed']} displayed; "
+          f"sensor packets: {summary['sensor_packets']}, {summary['sensor_mapped']} added to the map")
+    if "clock" in summary:
+        clock = summary["clock"]
+        print(f"Clock: offset {clock['offset_ms']:.3f} ms, RTT min {clock['rtt_min_ms']:.3f} ms, "
+              f"p50 {clock['rtt_p50_ms']:.3f} ms ({clock['samples']} pings)")
+    print(f"{'stage, ms':<24}{'count':>7}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for stage, s in summary["stages"].items():
+        print(f"{stage:<24}{s['count']:>7}{s['mean']:>9.2f}{s['p50']:>9.2f}{s['p90']:>9.2f}"
+              f"{s['p99']:>9.2f}{s['max']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,36 @@
+# bench_camera.py
+# MockCamera synthesis throughput (raw ndarray and JPEG) at typical stream resolutions.
+# Run from the repository root: python benchmarks/bench_camera.py
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "RaspberrySide"))
+
+from mock.camera import MockCamera  # noqa: E402
+
+RESOLUTIONS = [(160, 120), (640, 480), (1280, 720)]
+DURATION = 1.0
+
+
+def frames_per_second(func):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        func()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'resolution':<12} {'raw fps':>9} {'jpeg fps':>9} {'jpeg bytes':>11}")
+    for width, height in RESOLUTIONS:
+        camera = MockCamera(width=width, height=height, jpeg_quality=50, seed=0)
+        raw_fps = frames_per_second(camera.get_raw_frame)
+        jpeg_fps = frames_per_second(camera.get_jpeg)
+        print(f"{width}x{height:<7} {raw_fps:>9.1f} {jpeg_fps:>9.1f} {len(camera.get_jpeg()):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# bench_capture.py
+# Cost of getting an 800x600 render into a Qt-ready RGB buffer: the old PNG round-trip
+# through a temp file versus scaling Open3D's float buffer into a reused uint8 buffer.
+# Run from the repository root: python benchmarks/bench_capture.py
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+WIDTH, HEIGHT = 800, 600
+ITERATIONS = 200
+
+
+def png_round_trip(frame, path):
+    cv2.imwrite(path, cv2.cvtColor((frame * 255).astype(np.uint8), cv2.COLOR_RGB2BGR))
+    return cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+
+
+def in_memory(frame, scratch, rgb):
+    np.multiply(frame, 255.0, out=scratch)
+    np.copyto(rgb, scratch, casting='unsafe')
+    return rgb
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(*args)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    # Grey background with scattered coloured points, like the sonar view
+    frame = np.full((HEIGHT, WIDTH, 3), 0.8, dtype=np.float32)
+    ys, xs = rng.integers(0, HEIGHT, 20000), rng.integers(0, WIDTH, 20000)
+    frame[ys, xs] = rng.uniform(0.0, 1.0, (20000, 3))
+    scratch = np.empty_like(frame)
+    rgb = np.empty(frame.shape, dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp:
+        png_ms = measure(png_round_trip, frame, os.path.join(tmp, "open3d_temp.png"))
+    memory_ms = measure(in_memory, frame, scratch, rgb)
+    print(f"PNG round-trip: {png_ms:6.2f} ms/frame")
+    print(f"In-memory:      {memory_ms:6.2f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
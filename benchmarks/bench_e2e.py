@@ -0,0 +1,246 @@
+# bench_e2e.py
+# Headless end-to-end load test: the drone simulator (UnderwaterDrone with the mock sensors) streams
+# over loopback to the ground-side NetworkHandler, DataProcessor and MapUtils, with no Qt window and
+# no rendering. Reports sustained datagrams/s, completed frames/s, map points/s, CPU and RSS as JSON,
+# so runs can be compared across commits. Both sides share this process, so CPU and RSS are totals.
+# Run from the repository root: python benchmarks/bench_e2e.py [--fps 30 --width 1280 --height 720
+#     --loss 0.05 --duration 20 --output results.json]
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "RaspberrySide"))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from mock.camera import MockCamera  # noqa: E402
+from utils.metrics import REGISTRY as DRONE_REGISTRY  # noqa: E402
+from src.network import NetworkHandler  # noqa: E402
+from src.data_processor import DataProcessor  # noqa: E402
+from src.map_utils import MapUtils  # noqa: E402
+from src.point_store import PointStore  # noqa: E402
+from src.metrics import REGISTRY  # noqa: E402
+
+# Both sides have a main.py; the drone's is loaded under its own name
+_spec = importlib.util.spec_from_file_location("drone_main", os.path.join(ROOT, "RaspberrySide", "main.py"))
+drone_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(drone_main)
+
+# The GUI timer period of DroneVisualizer
+GUI_INTERVAL = 0.03
+GROUND_HISTOGRAMS = ("net.receive_us", "net.frame_assembly_us", "camera.decode_us", "map.ingest_us",
+                     "gui.update_us", "link.rtt_us")
+DRONE_HISTOGRAMS = ("camera.capture_us", "camera.classify_us", "camera.encode_us", "camera.send_us",
+                    "sensor.collect_us", "control.handle_us")
+
+
+class LossyDrone(drone_main.UnderwaterDrone):
+    """Drone whose outgoing datagrams are dropped with probability loss before they reach the socket."""
+
+    def __init__(self, loss=0.0, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.injected_drops = 0
+
+    def send_datagrams(self, messages):
+        if self.loss:
+            kept = [message for message in messages if self.rng.random() >= self.loss]
+            self.injected_drops += len(messages) - len(kept)
+            messages = kept
+        return super().send_datagrams(messages)
+
+
+def make_ground(map_path, voxel_size, wire_format):
+    """NetworkHandler + DataProcessor + MapUtils behind a stand-in for DroneVisualizer."""
+    visualization = SimpleNamespace(geometry_mode="points", invalidate_cloud=lambda store: None,
+                                    grow_axes=lambda points: None, reset_axes=lambda extent=None: None)
+    parent = SimpleNamespace(network=NetworkHandler(wire_formats=[wire_format]),
+                             map_utils=MapUtils(map_path, voxel_size=voxel_size),
+                             point_store=PointStore(max_points=1000000), visualization=visualization,
+                             drone_position=np.zeros(3), last_thruster_speeds=[0.0] * 6, display_mode="sonar")
+    # Sonar mode: frames are decoded but not painted
+    return parent, DataProcessor(parent)
+
+
+def rss_bytes():
+    """Current resident set size (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def counters(parent, processor, drone):
+    net = parent.network
+    return {
+        "wall": time.monotonic(),
+        "cpu": time.process_time(),
+        "datagrams": net.stats["datagrams"],
+        "bytes": REGISTRY.counter("net.bytes").value,
+        "frames": net.stats["frames"],
+        "frames_lost": net.stats["frames_lost"],
+        "frames_decoded": processor.frame_decoder.stats["decoded"],
+        "sensor_packets": net.stats["sensor_packets"],
+        "samples": REGISTRY.counter("map.samples").value,
+        "points": REGISTRY.counter("map.points").value,
+        "drone_datagrams": drone.send_stats["datagrams"],
+        "drone_frames": DRONE_REGISTRY.counter("tx.frames").value,
+        "injected_drops": drone.injected_drops,
+    }
+
+
+def run_ground(parent, processor, until, command_interval, speeds):
+    """What the Qt timers would do: process received data every GUI_INTERVAL and steer the drone."""
+    next_command = 0.0
+    while time.monotonic() < until:
+        if time.monotonic() >= next_command:
+            parent.network.send_command(speeds)
+            next_command = time.monotonic() + command_interval
+        processor.update_data()
+        time.sleep(GUI_INTERVAL)
+
+
+def histograms(registry, names):
+    result = {}
+    for name in names:
+        snapshot = registry.histogram(name).snapshot()
+        if snapshot["count"]:
+            result[name] = {key: snapshot[key] for key in ("count", "mean", "p50", "p99", "max")}
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        # drone_log.txt goes to the working directory
+        os.chdir(tmp)
+        parent, processor = make_ground(os.path.join(tmp, "terrain_map.udmap"), args.voxel_size, args.wire_format)
+        camera = MockCamera(width=args.width, height=args.height, fps=args.fps, jpeg_quality=args.jpeg_quality,
+                            seed=args.seed)
+        # Without --adapt the stream controller never steps down, so the configured stream holds
+        drone = LossyDrone(loss=args.loss, seed=args.seed, wire_format=args.wire_format, camera=camera,
+                           sensor_rate=args.sensor_rate, imu_rate=args.imu_rate, sonar_rate=args.sonar_rate,
+                           mtu=args.mtu, target_bitrate=args.target_bitrate if args.adapt else 10 ** 12,
+                           max_loss=args.max_loss if args.adapt else 1.0)
+        parent.network.start()
+        drone_thread = threading.Thread(target=drone.run, name="Drone", daemon=True)
+        drone_thread.start()
+        speeds = [args.speed, args.speed / 2, 0.0, 0.0, 0.0, 0.0]
+        command_interval = 1.0 / args.command_rate
+        try:
+            run_ground(parent, processor, time.monotonic() + args.warmup, command_interval, speeds)
+            # Latency histograms restart after the warm-up; counters are diffed instead
+            for registry in (REGISTRY, DRONE_REGISTRY):
+                for metric in list(registry.metrics.values()):
+                    if hasattr(metric, "reset"):
+                        metric.reset()
+            start = counters(parent, processor, drone)
+            run_ground(parent, processor, time.monotonic() + args.duration, command_interval, speeds)
+            end = counters(parent, processor, drone)
+            rss = rss_bytes()
+        finally:
+            drone.stop()
+            drone_thread.join(timeout=2.0)
+            processor.close()
+            parent.network.close()
+            parent.map_utils.close()
+            os.chdir(ROOT)
+
+    delta = {key: end[key] - start[key] for key in start}
+    elapsed = delta.pop("wall")
+    frames_total = delta["frames"] + delta["frames_lost"]
+    results = {
+        "duration_s": elapsed,
+        "datagrams_per_s": delta["datagrams"] / elapsed,
+        "mbit_per_s": delta["bytes"] * 8 / elapsed / 1e6,
+        "frames_per_s": delta["frames"] / elapsed,
+        "frames_decoded_per_s": delta["frames_decoded"] / elapsed,
+        "frame_loss": delta["frames_lost"] / frames_total if frames_total else 0.0,
+        "drone_frames_per_s": delta["drone_frames"] / elapsed,
+        "sensor_packets_per_s": delta["sensor_packets"] / elapsed,
+        "points_ingested_per_s": delta["samples"] / elapsed,
+        "points_added_per_s": delta["points"] / elapsed,
+        "datagram_loss_injected": delta["injected_drops"] / delta["drone_datagrams"] if delta["drone_datagrams"] else 0.0,
+        "cpu_percent": delta.pop("cpu") / elapsed * 100,
+        "rss_mb": rss / 1e6 if rss is not None else None,
+        # Linux reports ru_maxrss in kilobytes
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 / 1e6,
+    }
+    return {
+        "benchmark": "e2e",
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "config": vars(args),
+        "results": results,
+        "counters": delta,
+        "ground": {"network": parent.network.stats, "reassembly": parent.network.reassembler.stats,
+                   "decoder": processor.frame_decoder.stats, "histograms": histograms(REGISTRY, GROUND_HISTOGRAMS)},
+        "drone": {"send": drone.send_stats, "cache": drone.chunk_cache.stats, "stream": drone.stream.stats,
+                  "stream_level": drone.stream.level, "histograms": histograms(DRONE_REGISTRY, DRONE_HISTOGRAMS)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless drone-to-map load benchmark over loopback")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before measuring")
+    parser.add_argument("--width", type=int, default=640, help="camera frame width")
+    parser.add_argument("--height", type=int, default=480, help="camera frame height")
+    parser.add_argument("--fps", type=float, default=10.0, help="camera frame rate")
+    parser.add_argument("--jpeg-quality", type=int, default=80, help="JPEG quality (0-100)")
+    parser.add_argument("--sensor-rate", type=float, default=20.0, help="sensor packet send rate (Hz)")
+    parser.add_argument("--imu-rate", type=float, default=50.0, help="IMU sampling rate (Hz)")
+    parser.add_argument("--sonar-rate", type=float, default=20.0, help="sonar sampling rate (Hz)")
+    parser.add_argument("--loss", type=float, default=0.0, help="ratio of drone datagrams dropped before sending")
+    parser.add_argument("--mtu", type=int, default=1500, help="path MTU in bytes")
+    parser.add_argument("--wire-format", choices=("binary", "json"), default="binary", help="packet format")
+    parser.add_argument("--adapt", action="store_true", help="let the stream controller adapt to loss/bitrate")
+    parser.add_argument("--target-bitrate", type=int, default=2000000, help="camera budget with --adapt (bit/s)")
+    parser.add_argument("--max-loss", type=float, default=0.05, help="tolerated frame loss with --adapt")
+    parser.add_argument("--command-rate", type=float, default=10.0, help="thruster command rate (Hz)")
+    parser.add_argument("--speed", type=float, default=0.5, help="thruster speed, so the drone maps new ground")
+    parser.add_argument("--voxel-size", type=float, default=0.05, help="map voxel size in metres (0: off)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the camera noise and loss injection")
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep INFO logging from both sides")
+    args = parser.parse_args()
+    if not args.verbose:
+        # The drone logger also propagates to the console handler set up by the ground modules
+        for handler in logging.getLogger().handlers:
+            handler.setLevel(logging.WARNING)
+
+    report = run(args)
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    results = report["results"]
+    print(f"{results['datagrams_per_s']:.0f} datagrams/s, {results['frames_per_s']:.1f} frames/s "
+          f"(loss {results['frame_loss']:.1%}), {results['points_ingested_per_s']:.0f} points/s, "
+          f"CPU {results['cpu_percent']:.0f}%, RSS {results['rss_mb']:.0f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench_ingest.py
+# Sonar ingestion throughput of MapUtils.ingest_batch for batches of 1, 100 and 10,000 samples.
+# Run from the repository root: python benchmarks/bench_ingest.py
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from src.map_utils import MapUtils  # noqa: E402
+from src.point_store import OBJECT_TYPES, PointStore  # noqa: E402
+
+BATCH_SIZES = [1, 100, 10000]
+TOTAL_POINTS = 20000
+
+
+def make_visualizer():
+    # The cloud rebuild runs on the render tick, not per batch, so it is not part of ingestion
+    visualization = SimpleNamespace(invalidate_cloud=lambda store: None, grow_axes=lambda points: None,
+                                    reset_axes=lambda extent=None: None)
+    return SimpleNamespace(point_store=PointStore(), drone_position=np.zeros(3), visualization=visualization)
+
+
+def make_samples(count, rng):
+    quaternions = rng.normal(size=(count, 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    positions = np.cumsum(rng.uniform(-0.5, 0.5, (count, 3)), axis=0)
+    distances = rng.uniform(1.0, 20.0, count)
+    object_types = rng.choice(OBJECT_TYPES, count).tolist()
+    return distances, quaternions, positions, object_types
+
+
+def main():
+    rng = np.random.default_rng(0)
+    distances, quaternions, positions, object_types = make_samples(TOTAL_POINTS, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'batch':>6} {'points/s':>12}")
+        for batch in BATCH_SIZES:
+            map_utils = MapUtils(map_path=os.path.join(tmp, f"terrain_map_{batch}.csv"))
+            visualizer = make_visualizer()
+            added = 0
+            start = time.perf_counter()
+            for i in range(0, TOTAL_POINTS, batch):
+                added += map_utils.ingest_batch(visualizer, distances[i:i + batch], quaternions[i:i + batch],
+                                                positions[i:i + batch], object_types[i:i + batch])
+            elapsed = time.perf_counter() - start
+            map_utils.close()
+            print(f"{batch:>6} {added / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
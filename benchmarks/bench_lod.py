@@ -0,0 +1,41 @@
+# bench_lod.py
+# Level-of-detail pyramid for a large seabed cloud: build time, level sizes and the level
+# picked for interactive rendering at several zoom factors.
+# Run from the repository root: python benchmarks/bench_lod.py [num_points]
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from src.lod import LevelOfDetail  # noqa: E402
+
+ZOOM_FACTORS = [0.5, 1.0, 2.0, 3.0]
+
+
+def make_seabed(count, rng):
+    xy = rng.uniform(-200.0, 200.0, (count, 2))
+    depth = 10.0 + 2.0 * np.sin(xy[:, 0] / 15.0) * np.cos(xy[:, 1] / 20.0) + rng.normal(0.0, 0.05, count)
+    return np.column_stack([xy, depth]), rng.uniform(0.0, 1.0, (count, 3))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    points, colors = make_seabed(count, np.random.default_rng(0))
+    lod = LevelOfDetail()
+    start = time.perf_counter()
+    lod.update(points, colors)
+    lod.build_thread.join()
+    print(f"{count} points, LOD build {time.perf_counter() - start:.2f} s")
+    for voxel, level_points, _ in lod.levels:
+        print(f"  voxel {voxel:8.3f} m: {len(level_points):>9} points")
+    for zoom in ZOOM_FACTORS:
+        selected, _ = lod.select(zoom)
+        print(f"zoom {zoom:3.1f}: {len(selected)} points while interacting")
+
+
+if __name__ == "__main__":
+    main()
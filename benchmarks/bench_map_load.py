@@ -0,0 +1,62 @@
+# bench_map_load.py
+# Map load time: terrain_map.csv through pandas vs the binary .udmap format (memmap).
+# Run from the repository root: python benchmarks/bench_map_load.py [num_points]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from src import map_format  # noqa: E402
+from src.map_utils import MapUtils  # noqa: E402
+from src.point_store import OBJECT_TYPES, PointStore  # noqa: E402
+
+REPEAT = 3
+
+
+def load_seconds(path, num_points):
+    """Best-of-N time to read the map and fill a PointStore (what load_map does before Open3D)."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        map_utils = MapUtils(map_path=path)
+        store = PointStore(max_points=num_points)
+        start = time.perf_counter()
+        points, codes, hits, votes = map_utils.read_map()
+        store.replace(points, codes, hits, votes)
+        best = min(best, time.perf_counter() - start)
+        map_utils.close()
+    return best
+
+
+def main():
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "terrain_map.csv")
+        bin_path = os.path.join(tmp, "survey" + map_format.EXTENSION)
+        pd.DataFrame({
+            "x": rng.uniform(0, 1000, num_points),
+            "y": rng.uniform(0, 1000, num_points),
+            "depth": rng.uniform(0, 500, num_points),
+            "object_type": rng.choice(OBJECT_TYPES, num_points)
+        }).to_csv(csv_path, index=False)
+        start = time.perf_counter()
+        map_format.csv_to_binary(csv_path, bin_path)
+        convert = time.perf_counter() - start
+
+        csv_time = load_seconds(csv_path, num_points)
+        bin_time = load_seconds(bin_path, num_points)
+        print(f"{num_points} points")
+        print(f"{'format':<8} {'file MB':>8} {'load ms':>9}")
+        print(f"{'csv':<8} {os.path.getsize(csv_path) / 1e6:>8.1f} {csv_time * 1000:>9.1f}")
+        print(f"{'udmap':<8} {os.path.getsize(bin_path) / 1e6:>8.1f} {bin_time * 1000:>9.1f}")
+        print(f"csv -> udmap conversion: {convert * 1000:.1f} ms, speedup {csv_time / bin_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
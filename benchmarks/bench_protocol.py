@@ -0,0 +1,85 @@
+# bench_protocol.py
+# Bytes per frame and encode/decode time: JSON + base64 (old format) vs binary framing.
+# Run from the repository root: python benchmarks/bench_protocol.py
+import base64
+import os
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "RaspberrySide"))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from mock.camera import MockCamera  # noqa: E402
+from utils import protocol as drone_protocol  # noqa: E402
+from src import protocol as ground_protocol  # noqa: E402
+
+MAX_DATAGRAM = 4000
+REPEAT = 200
+
+
+def sample_sensor(frame_id):
+    return {
+        "timestamp": time.time(),
+        "imu": {"quaternion": [0.0, 0.0, 0.0, 1.0]},
+        "sonar": {"point": [1.5, 0.25, -3.75], "distance": 1.5, "object_type": "rock"},
+        "thruster_speeds": [0.5, 0.5, 0.0, 0.0, 0.0, 0.0],
+        "frame_id": frame_id
+    }
+
+
+def encode_json(jpeg, sensor):
+    datagrams = [drone_protocol.encode_sensor_json(sensor)]
+    payload = drone_protocol.b64encode_frame(jpeg)
+    total = (len(payload) + MAX_DATAGRAM - 1) // MAX_DATAGRAM
+    for i in range(total):
+        chunk = payload[i * MAX_DATAGRAM:(i + 1) * MAX_DATAGRAM]
+        datagrams.append(drone_protocol.encode_image_chunk_json(sensor["frame_id"], i, total, chunk, sensor["timestamp"]))
+    return datagrams
+
+
+def encode_binary(jpeg, sensor):
+    datagrams = [drone_protocol.encode_sensor(sensor)]
+    payload = memoryview(jpeg)
+    chunk_size = MAX_DATAGRAM - drone_protocol.HEADER.size
+    total = (len(payload) + chunk_size - 1) // chunk_size
+    for i in range(total):
+        chunk = payload[i * chunk_size:(i + 1) * chunk_size]
+        datagrams.append(drone_protocol.encode_image_chunk(sensor["frame_id"], i, total, chunk, sensor["timestamp"]))
+    return datagrams
+
+
+def decode_json(datagrams):
+    sensor = ground_protocol.decode_json(datagrams[0])
+    chunks = [ground_protocol.decode_json(d)["data"] for d in datagrams[1:]]
+    return sensor, base64.b64decode("".join(chunks))
+
+
+def decode_binary(datagrams):
+    sensor = ground_protocol.decode(datagrams[0])
+    chunks = [ground_protocol.decode(d)["data"] for d in datagrams[1:]]
+    return sensor, b"".join(chunks)
+
+
+def measure_us(func, *args):
+    return min(timeit.repeat(lambda: func(*args), number=REPEAT, repeat=5)) / REPEAT * 1e6
+
+
+def main():
+    camera = MockCamera()
+    jpeg = camera.get_jpeg()
+    sensor = sample_sensor(1)
+
+    print(f"JPEG frame: {len(jpeg)} bytes ({camera.width}x{camera.height})")
+    print(f"{'format':<8} {'datagrams':>9} {'bytes/frame':>12} {'encode us':>10} {'decode us':>10}")
+    for name, encode, decode in (("json", encode_json, decode_json), ("binary", encode_binary, decode_binary)):
+        datagrams = encode(jpeg, sensor)
+        _, frame = decode(datagrams)
+        assert frame == jpeg, f"{name}: round trip mismatch"
+        size = sum(len(d) for d in datagrams)
+        print(f"{name:<8} {len(datagrams):>9} {size:>12} {measure_us(encode, jpeg, sensor):>10.1f} {measure_us(decode, datagrams):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# bench_reassembly.py
+# Frame reassembly cost: the old per-frame chunk list (all() completion check on every chunk,
+# join at the end) vs FrameReassembler (one preallocated buffer, bitmask, memoryview copies).
+# Run from the repository root: python benchmarks/bench_reassembly.py
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from src import protocol  # noqa: E402
+from src.reassembly import FrameReassembler  # noqa: E402
+
+CHUNK_SIZE = 1472 - protocol.HEADER.size
+FRAME_SIZES = (20000, 200000, 2000000)
+REPEAT = 20
+
+
+def make_chunks(size, shuffle):
+    payload = os.urandom(size)
+    chunks = [memoryview(payload)[i:i + CHUNK_SIZE] for i in range(0, size, CHUNK_SIZE)]
+    order = list(range(len(chunks)))
+    if shuffle:
+        random.Random(size).shuffle(order)
+    return payload, [(i, chunks[i]) for i in order]
+
+
+def reassemble_list(chunks):
+    total = len(chunks)
+    buffer = {}
+    for index, data in chunks:
+        if 1 not in buffer:
+            buffer[1] = [None] * total
+        buffer[1][index] = data
+        if all(chunk is not None for chunk in buffer[1]):
+            return b"".join(buffer.pop(1))
+
+
+def reassemble_buffer(chunks):
+    reassembler = FrameReassembler(memory_budget=64 * 1024 * 1024)
+    total = len(chunks)
+    for index, data in chunks:
+        frame = reassembler.add(1, index, total, data)
+        if frame is not None:
+            return reassembler.frame_bytes(frame)
+
+
+def measure_ms(func, chunks):
+    return min(timeit.repeat(lambda: func(chunks), number=REPEAT, repeat=3)) / REPEAT * 1000
+
+
+def main():
+    print(f"Chunk payload: {CHUNK_SIZE} bytes")
+    print(f"{'frame bytes':>11} {'chunks':>7} {'order':>8} {'list ms':>9} {'buffer ms':>10}")
+    for size in FRAME_SIZES:
+        for shuffle in (False, True):
+            payload, chunks = make_chunks(size, shuffle)
+            assert reassemble_list(chunks) == payload
+            assert bytes(reassemble_buffer(chunks)) == payload
+            order = "shuffled" if shuffle else "in order"
+            print(f"{size:>11} {len(chunks):>7} {order:>8} {measure_ms(reassemble_list, chunks):>9.3f} "
+                  f"{measure_ms(reassemble_buffer, chunks):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench_terrain.py
+# Terrain classification cost per frame: the old path (base64 JPEG -> imdecode -> HSV mean)
+# versus the tiled LUT classifier on the raw frame, in microseconds.
+# Run from the repository root: python benchmarks/bench_terrain.py
+import base64
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "RaspberrySide"))
+
+from mock.camera import MockCamera  # noqa: E402
+from utils.terrain import TerrainClassifier  # noqa: E402
+
+RESOLUTIONS = [(160, 120), (640, 480), (1280, 720)]
+ITERATIONS = 200
+
+
+def legacy_classify(frame_base64):
+    frame = cv2.imdecode(np.frombuffer(base64.b64decode(frame_base64), np.uint8), cv2.IMREAD_COLOR)
+    return np.mean(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV), axis=(0, 1))
+
+
+def microseconds(func, arg):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(arg)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    print(f"{'resolution':<12} {'legacy us':>10} {'lut us':>8} {'lut full-res us':>16}")
+    for width, height in RESOLUTIONS:
+        camera = MockCamera(width=width, height=height, seed=0)
+        frame = camera.get_raw_frame()
+        # The legacy path also paid for a second capture + encode to get its input
+        legacy = microseconds(legacy_classify, base64.b64encode(camera.encode(frame)).decode('utf-8'))
+        subsampled = microseconds(TerrainClassifier().classify, frame)
+        full = microseconds(TerrainClassifier(subsample=1).classify, frame)
+        print(f"{width}x{height:<7} {legacy:>10.0f} {subsampled:>8.0f} {full:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
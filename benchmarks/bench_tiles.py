@@ -0,0 +1,51 @@
+# bench_tiles.py
+# Tiled map: import throughput, tile load latency and points handed to the map as the drone
+# flies across a survey larger than the tile cache.
+# Run from the repository root: python benchmarks/bench_tiles.py [num_points]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "ComputerSide"))
+
+from src.tile_map import TiledMap  # noqa: E402
+
+SURVEY_SIZE = 1000.0  # metres
+BATCH = 1000000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "survey.tiles")
+        tiles = TiledMap(root)
+        start = time.perf_counter()
+        for offset in range(0, count, BATCH):
+            size = min(BATCH, count - offset)
+            points = np.column_stack([rng.uniform(0.0, SURVEY_SIZE, (size, 2)), rng.uniform(5.0, 15.0, size)])
+            tiles.append(points, rng.integers(0, 5, size))
+        elapsed = time.perf_counter() - start
+        print(f"Imported {count} points into {len(tiles.counts)} tiles: {count / elapsed:.0f} points/s")
+        tiles.close()
+
+        # Reopened map: tiles appended in this session would count as already handed out
+        tiles = TiledMap(root)
+        tiles.start()
+        for x in np.linspace(0.0, SURVEY_SIZE, 11):
+            start = time.perf_counter()
+            tiles.focus([x, SURVEY_SIZE / 2, 0.0], block=True)
+            focus_ms = (time.perf_counter() - start) * 1000
+            loaded = tiles.take_loaded()
+            print(f"drone x={x:6.0f} m: {len(tiles.cache):3} tiles, {len(loaded):3} loaded "
+                  f"({sum(len(tile[1]) for tile in loaded):>9} points), refocus {focus_ms:7.1f} ms")
+        tiles.close()
+        print(f"Tile stats: {tiles.stats}")
+
+
+if __name__ == "__main__":
+    main()